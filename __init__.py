@@ -1 +1,3 @@
-from . import arxiv
\ No newline at end of file
+from . import arxiv
+from . import csrgraph
+from . import vocabulary
@@ -1,3 +1,7 @@
-import graphsAPS
-import parseAPS
-import processAPSXML
\ No newline at end of file
+from . import citationStatsAPS
+from . import citationsAPS
+from . import graphsAPS
+from . import indexAPS
+from . import pacsAPS
+from . import parseAPS
+from . import processAPSXML
\ No newline at end of file
@@ -0,0 +1,132 @@
+'''Citation statistics of the APS papers, for all papers at once.
+The citations (citationsAPS.CitationGraph) are joined to the rows of the data frame (indexAPS.DOIIndex),
+and combined with the year of every row (indexAPS.APSIndex.years), its PACS codes (pacsAPS.PACSTable)
+and its authors (parseAPS.authorTable) with bincount and sparse matrix products instead of loops over papers.'''
+import numpy as np
+
+
+def citationRows(graph, doiIndex):
+	'''Arrays (citing, cited) of the row positions of all citations in graph (a citationsAPS.CitationGraph)
+		between papers of the data frame of doiIndex (an indexAPS.DOIIndex); other citations are dropped.'''
+	rowOf = doiIndex.lookup(graph.dois.labels)
+	citing, cited = graph.edges()
+	citing = rowOf[citing]
+	cited = rowOf[cited]
+	keep = (citing >= 0) & (cited >= 0)
+	return citing[keep], cited[keep]
+
+
+def _aggregate(papers, groups, numGroups, values):
+	'''Sums values (one entry, or sparse row, per paper) over the groups of the (paper, group) pairs,
+		counting every group once per paper.'''
+	import scipy.sparse as sparse
+	numPapers = values.shape[0]
+	pairs = np.unique(groups.astype(np.int64) * numPapers + papers)
+	groups = pairs // numPapers
+	papers = pairs % numPapers
+	if isinstance(values, np.ndarray) and values.ndim == 1:
+		return np.bincount(groups, weights=values[papers], minlength=numGroups).astype(values.dtype)
+	membership = sparse.csr_matrix((np.ones(len(pairs), dtype=values.dtype), (groups, papers)),
+		shape=(numGroups, numPapers))
+	return membership.dot(values)
+
+
+class CitationStats(object):
+	'''The citations between the rows of an APS data frame.
+	citing, cited: int32 arrays with the row positions of the citing and cited paper of every citation.
+	years: the year of every row (0 if unknown), e.g. APSIndex.years.'''
+
+	def __init__(self, citing, cited, years):
+		self.citing = citing
+		self.cited = cited
+		self.years = np.asarray(years)
+
+	@classmethod
+	def fromStore(cls, graph, doiIndex, years):
+		'''Joins the citations of graph to the rows of doiIndex, see citationRows.'''
+		citing, cited = citationRows(graph, doiIndex)
+		return cls(citing, cited, years)
+
+	def __len__(self):
+		return len(self.citing)
+
+	def lags(self):
+		'''Years between the publication of the cited paper and every citation of it.'''
+		return self.years[self.citing].astype(np.int32) - self.years[self.cited]
+
+	def _within(self, window):
+		'''Mask of the citations within window years of the publication of the cited paper (all if window is None).'''
+		if window is None:
+			return np.ones(len(self.citing), dtype=bool)
+		lags = self.lags()
+		known = (self.years[self.citing] > 0) & (self.years[self.cited] > 0)
+		return known & (lags >= 0) & (lags <= window)
+
+	def counts(self, window=None):
+		'''Number of citations received by every row, only counting those within window years
+			of its publication if window is given (window=0: in the year of publication).'''
+		cited = self.cited[self._within(window)]
+		return np.bincount(cited, minlength=len(self.years))
+
+	def yearRange(self):
+		'''The (first, last) year with citations.'''
+		years = self.years[self.citing]
+		years = years[years > 0]
+		return int(years.min()), int(years.max())
+
+	def yearly(self, startYear=None, endYear=None):
+		'''Sparse matrix (scipy.sparse CSR) of the citations received by every row (rows) in every year
+			from startYear to endYear (columns, the year of the citing paper); the years default to yearRange.'''
+		import scipy.sparse as sparse
+		if startYear is None or endYear is None:
+			first, last = self.yearRange()
+			startYear = first if startYear is None else startYear
+			endYear = last if endYear is None else endYear
+		years = self.years[self.citing].astype(np.int32)
+		keep = (years >= startYear) & (years <= endYear)
+		counts = sparse.coo_matrix((np.ones(np.count_nonzero(keep), dtype=np.int32),
+			(self.cited[keep], years[keep] - startYear)), shape=(len(self.years), endYear - startYear + 1))
+		return counts.tocsr()
+
+	def perYear(self, startYear=None, endYear=None):
+		'''Total number of citations made in every year from startYear to endYear, see yearly.'''
+		return np.asarray(self.yearly(startYear, endYear).sum(axis=0)).ravel()
+
+	def authors(self, table, values=None, authorInitialsOnly=False, vocabulary=None):
+		'''Sums values (default: counts()), an array or a sparse matrix like yearly() with a row per paper,
+			over the authors of each paper in table (parseAPS.authorTable of the same data frame).
+		Returns the sums, indexed by author id, and the vocabulary.Vocabulary of the author tuples
+			(with the initials only if authorInitialsOnly), which is created unless given.'''
+		import pandas as pd
+		from ..vocabulary import Vocabulary
+		if values is None:
+			values = self.counts()
+		if vocabulary is None:
+			vocabulary = Vocabulary()
+		if authorInitialsOnly:
+			columns = ['givenInitial', 'middleInitial', 'surname', 'suffix']
+		else:
+			columns = ['given', 'middle', 'surname', 'suffix']
+		names = pd.Series(list(zip(*[table[c].tolist() for c in columns])), dtype=object)
+		authors = vocabulary.encode(names)
+		papers = table['paper'].values
+		return _aggregate(papers, authors, len(vocabulary), values), vocabulary
+
+	def fields(self, pacsTable, values=None, pacsLevel=2):
+		'''Sums values (default: counts()), an array or a sparse matrix like yearly() with a row per paper,
+			over the PACS codes at pacsLevel of each paper in pacsTable (pacsAPS.PACSTable of the same data frame).
+		Returns a dictionary from code (an int for levels 1 and 2, the code string for level 3) to its sum.'''
+		if values is None:
+			values = self.counts()
+		codes = pacsTable.values(pacsLevel)
+		papers = pacsTable.papers()
+		keep = codes != -1
+		codes = codes[keep].astype(np.int64)
+		papers = papers[keep]
+		sums = _aggregate(papers, codes, int(codes.max()) + 1 if len(codes) else 0, values)
+		if not isinstance(sums, np.ndarray):
+			sums = sums.toarray()  # a row of yearly sums per code
+		present = np.unique(codes)
+		if pacsLevel == 3:
+			return dict((pacsTable.codec.codes[c], sums[c]) for c in present)
+		return dict((int(c), sums[c]) for c in present)
@@ -0,0 +1,135 @@
+'''Binary store for the APS citation data (the citing_doi,cited_doi CSV file).
+DOIs are interned once as dense integer ids (a vocabulary.Vocabulary), and the citation graph is kept
+as CSR arrays in both directions, saved as .npy files and memory-mapped on loading:
+	the papers cited by paper i are citesIndices[citesIndptr[i]:citesIndptr[i+1]],
+	the papers citing paper i are citedByIndices[citedByIndptr[i]:citedByIndptr[i+1]].'''
+import os
+import numpy as np
+
+ARRAYS = ('citesIndptr', 'citesIndices', 'citedByIndptr', 'citedByIndices')
+DOIS = 'dois.pkl'
+
+
+def readCitations(infile, vocabulary=None, chunkSize=1000000, header=True):
+	'''Reads an APS citation CSV file (citing,cited pairs) in blocks of chunkSize lines.
+	Returns the int32 arrays (citing, cited) of DOI ids and the vocabulary.Vocabulary of the DOIs,
+		adding new DOIs to vocabulary if one is given.
+	header: whether the first line of infile is a header (citing_doi,cited_doi).'''
+	import pandas as pd
+	from ..vocabulary import Vocabulary
+
+	if vocabulary is None:
+		vocabulary = Vocabulary()
+	citing = []
+	cited = []
+	chunks = pd.read_csv(infile, names=['citing', 'cited'], header=0 if header else None, usecols=[0, 1],
+		dtype=str, chunksize=chunkSize)
+	for chunk in chunks:
+		chunk = chunk.dropna()
+		citing.append(vocabulary.encode(chunk['citing'].str.strip()))
+		cited.append(vocabulary.encode(chunk['cited'].str.strip()))
+	if citing:
+		return np.concatenate(citing), np.concatenate(cited), vocabulary
+	return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), vocabulary
+
+
+def _csr(sources, targets, n):
+	'''CSR arrays (indptr, indices) of the edges sources -> targets between n nodes,
+		with the targets of every node in the order they were read.'''
+	order = np.argsort(sources, kind='mergesort')
+	indptr = np.zeros(n + 1, dtype=np.int64)
+	np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+	return indptr, targets[order].astype(np.int32)
+
+
+class CitationGraph(object):
+	'''The APS citation graph between the papers with ids 0..n-1 (see readCitations).
+	dois: the vocabulary.Vocabulary of the DOIs; when loaded, it is read the first time it is used.'''
+
+	def __init__(self, citesIndptr, citesIndices, citedByIndptr, citedByIndices, dois=None, path=None):
+		self.citesIndptr = citesIndptr
+		self.citesIndices = citesIndices
+		self.citedByIndptr = citedByIndptr
+		self.citedByIndices = citedByIndices
+		self._dois = dois
+		self._path = path
+
+	@classmethod
+	def fromEdges(cls, citing, cited, dois):
+		'''Builds the graph from arrays of citing and cited ids.'''
+		n = len(dois)
+		citesIndptr, citesIndices = _csr(citing, cited, n)
+		citedByIndptr, citedByIndices = _csr(cited, citing, n)
+		return cls(citesIndptr, citesIndices, citedByIndptr, citedByIndices, dois)
+
+	@classmethod
+	def fromCSV(cls, infile, vocabulary=None, chunkSize=1000000, header=True):
+		'''Reads an APS citation CSV file, see readCitations.'''
+		citing, cited, dois = readCitations(infile, vocabulary, chunkSize, header)
+		return cls.fromEdges(citing, cited, dois)
+
+	@property
+	def dois(self):
+		if self._dois is None and self._path is not None:
+			from ..vocabulary import Vocabulary
+			self._dois = Vocabulary.load(os.path.join(self._path, DOIS))
+		return self._dois
+
+	def __len__(self):
+		return len(self.citesIndptr) - 1
+
+	def numCitations(self):
+		'''Number of citing/cited pairs.'''
+		return len(self.citesIndices)
+
+	def references(self, i):
+		'''Ids of the papers cited by paper i.'''
+		return self.citesIndices[self.citesIndptr[i]:self.citesIndptr[i + 1]]
+
+	def citations(self, i):
+		'''Ids of the papers citing paper i.'''
+		return self.citedByIndices[self.citedByIndptr[i]:self.citedByIndptr[i + 1]]
+
+	def inDegree(self):
+		'''Number of citations received by every paper.'''
+		return np.diff(self.citedByIndptr)
+
+	def outDegree(self):
+		'''Number of references of every paper.'''
+		return np.diff(self.citesIndptr)
+
+	def edges(self):
+		'''Arrays (citing, cited) of the ids of all citations, grouped by citing paper.'''
+		citing = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.citesIndptr))
+		return citing, np.asarray(self.citesIndices)
+
+	def reversed(self):
+		'''The graph with every citation reversed (cited -> citing), sharing the arrays; see also reverseCitingCited.'''
+		return CitationGraph(self.citedByIndptr, self.citedByIndices, self.citesIndptr, self.citesIndices,
+			self._dois, self._path)
+
+	def ids(self, dois):
+		'''Ids of an array of DOIs, -1 for DOIs without citation data.'''
+		return self.dois.lookup(dois)
+
+	def save(self, path):
+		'''Saves the arrays and the DOIs as files in the directory path.'''
+		if not os.path.isdir(path):
+			os.makedirs(path)
+		for name in ARRAYS:
+			np.save(os.path.join(path, name + '.npy'), np.asarray(getattr(self, name)))
+		self.dois.save(os.path.join(path, DOIS))
+
+	@classmethod
+	def load(cls, path, mmap=True):
+		'''Loads a graph saved with save; the arrays are memory-mapped unless mmap is False.'''
+		mode = 'r' if mmap else None
+		arrays = [np.load(os.path.join(path, name + '.npy'), mmap_mode=mode) for name in ARRAYS]
+		return cls(*arrays, path=path)
+
+
+def citations2store(infile, path, vocabulary=None, chunkSize=1000000, header=True):
+	'''Converts an APS citation CSV file into a CitationGraph saved in the directory path, and returns it.'''
+	graph = CitationGraph.fromCSV(infile, vocabulary, chunkSize, header)
+	graph.save(path)
+	return graph
@@ -1,7 +1,8 @@
-import parseAPS
+import multiprocessing
+from . import parseAPS
 import networkx as nx
 
-def getAdjListSimple(df, what='authors', authorInitialsOnly=False, subsetPACS=None, subsetYears=None):
+def getAdjListSimple(df, what='authors', authorInitialsOnly=False, subsetPACS=None, subsetYears=None, vocabulary=None):
 	'''Builds a dictionary of edges (and a list of node weights) from a given data frame df.
 	Helper function.
 	what: the nodes you want to look at.  If what = 'authors', the nodes are authors.  If what = 'pacs', the nodes are PACS codes.
@@ -9,7 +10,9 @@ def getAdjListSimple(df, what='authors', authorInitialsOnly=False, subsetPACS=No
 	subsetPACS: an integer list of PACS codes you want to look at (only consider papers in that subject range)
 		Looks at all subjects if subsetPACS is None.
 	subsetYears: an integer list of years you want to consider.
-		Looks at all years if subsetYears is None.'''
+		Looks at all years if subsetYears is None.
+	vocabulary: a vocabulary.Vocabulary for the authors (see parseAPS.authorVocabulary).
+		If given, author nodes are interned integer ids instead of name tuples.'''
 	resultDict = {}
 	nodeWeights = {}
 	aio = authorInitialsOnly
@@ -18,6 +21,8 @@ def getAdjListSimple(df, what='authors', authorInitialsOnly=False, subsetPACS=No
 	for index, row in df.iterrows():
 		if what == 'authors':
 			items = parseAPS.getAuthors(row, authorInitialsOnly=aio, subsetPACS=sp, subsetYears=sy)
+			if vocabulary is not None:
+				items = vocabulary.encode_list(items)
 		elif what == 'pacs':
 			items = parseAPS.getPACS(row, subsetPACS=sp, subsetYears=sy)
 		if items:  # Skip this row if items is None
@@ -40,7 +45,7 @@ def getAdjListSimple(df, what='authors', authorInitialsOnly=False, subsetPACS=No
 	return resultDict, nodeWeights
 
 
-def getAdjListBipartite(df, authorInitialsOnly=False, subsetPACS=None, subsetYears=None):
+def getAdjListBipartite(df, authorInitialsOnly=False, subsetPACS=None, subsetYears=None, vocabulary=None):
 	'''As above, but for a bipartite authors->PACS graph.
 	Builds a dictionary of edges (and a list of node weights, and a list of authors) from a given data frame df.
 	Helper function.
@@ -49,7 +54,9 @@ def getAdjListBipartite(df, authorInitialsOnly=False, subsetPACS=None, subsetYea
 	subsetPACS: an integer list of PACS codes you want to look at (only consider papers in that subject range)
 		Looks at all subjects if subsetPACS is None.
 	subsetYears: an integer list of years you want to consider.
-		Looks at all years if subsetYears is None.'''
+		Looks at all years if subsetYears is None.
+	vocabulary: a vocabulary.Vocabulary for the authors; if given, author nodes are ('author', id) tuples,
+		so that they do not clash with the integer PACS codes.'''
 	resultDict = {}
 	aio = authorInitialsOnly
 	sp = subsetPACS
@@ -59,6 +66,8 @@ def getAdjListBipartite(df, authorInitialsOnly=False, subsetPACS=None, subsetYea
 	for index, row in df.iterrows():
 		auths = parseAPS.getAuthors(row, authorInitialsOnly=aio, subsetPACS=sp, subsetYears=sy)
 		pacs = parseAPS.getPACS(row, subsetPACS=sp, subsetYears=sy)
+		if vocabulary is not None and auths:
+			auths = [('author', i) for i in vocabulary.encode_list(auths)]
 		if auths and pacs:
 			for a in auths:
 				if a not in resultDict:
@@ -116,7 +125,7 @@ def getAuthorPacsInfo(bipartiteDict, authorList):
 	return authorInfo 
 
 
-def makeGraph(df, authorInitialsOnly=False, subsetPACS=None, subsetYears=None, what=['authors']):
+def makeGraph(df, authorInitialsOnly=False, subsetPACS=None, subsetYears=None, what=['authors'], vocabulary=None, compact=False, index=None):
 	'''Actually builds a networkx graph, using the helper functions.
 	what: the nodes you want to look at.
 		If what = ['authors'], the nodes are authors.
@@ -126,82 +135,201 @@ def makeGraph(df, authorInitialsOnly=False, subsetPACS=None, subsetYears=None, w
 	subsetPACS: an integer list of PACS codes you want to look at (only consider papers in that subject range)
 		Looks at all subjects if subsetPACS is None.
 	subsetYears: an integer list of years you want to consider.
-		Looks at all years if subsetYears is None.'''
+		Looks at all years if subsetYears is None.
+	vocabulary: a vocabulary.Vocabulary for the authors.
+		If given, author nodes are integer ids; use vocabulary.decode to get the names back.
+		In bipartite graphs, they are ('author', id) tuples, apart from the integer PACS nodes.
+	compact: return a csrgraph.CSRGraph, with the same edges and weights, instead of a networkx graph.
+	index: an indexAPS.APSIndex of df. If given, the rows for subsetPACS and subsetYears are selected
+		by intersecting its postings first, and only those rows are processed.'''
 	aio = authorInitialsOnly
 	sp = subsetPACS
 	sy = subsetYears
 	w = what
+	v = vocabulary
+	if index is not None and (sp or sy):
+		df = df.iloc[index.rows(subsetPACS=sp, subsetYears=sy)]
+		sy = None  # all selected rows are in subsetYears
+		if w == ['authors']:
+			sp = None  # and have a code in subsetPACS; only PACS nodes still need filtering
 	if len(what) == 1:
-		adjList, nodeWeights = getAdjListSimple(df, authorInitialsOnly=aio, subsetPACS=sp, subsetYears=sy, what=w[0])
+		adjList, nodeWeights = getAdjListSimple(df, authorInitialsOnly=aio, subsetPACS=sp, subsetYears=sy, what=w[0], vocabulary=v)
 	elif len(what) == 2:
-		adjList, nodeWeights = getAdjListBipartite(df, authorInitialsOnly=aio, subsetYears=sy, subsetPACS=sp)
+		adjList, nodeWeights, authorList = getAdjListBipartite(df, authorInitialsOnly=aio, subsetYears=sy, subsetPACS=sp, vocabulary=v)
 
 	if adjList:
+		if compact:
+			from ..csrgraph import CSRGraph
+			return CSRGraph.from_dict_of_dicts(adjList, nodeWeights)
 		G = nx.from_dict_of_dicts(adjList)
-		nx.set_node_attributes(G,'weight',nodeWeights)
+		nx.set_node_attributes(G,name='weight',values=nodeWeights)
 		return G
 	else:
 		return None
 
 
-def getDynamicNetwork(df, what='authors', authorInitialsOnly=False, subsetPACS=None, startYear=1982, endYear=2007, window=5):
-	'''Creates a dictionary of dictionaries in order to make graphs, where each dictionary is made using getAdjListSimple.
-	The keys of the dictionary are years from startYear to endYear, and the values are the graph dictionaries.
-	If window=1, the graph only considers papers from a single year.
-	If window=3, the graph considers papers from year-1, year, and year+1.
-	If window=5, the graph considers papers from year-2,year-1,year,year+1,year+2.
-	Make sure that startYear and endYear are set appropriately for the window; the bottom limit is 1980, and the top is 2010.'''
-	diam = window/2
-	yearSet = {y:range(y-diam,y+diam+1) for y in range(startYear,endYear+1)}
-	print yearSet
-	resultsDict = {y:{} for y in yearSet}
-	nodeWeights = {y:{} for y in yearSet}
+def getYearItems(df, what='authors', authorInitialsOnly=False, subsetPACS=None, vocabulary=None):
+	'''Parses every row of df once, returning a list of [year, items] pairs, where items are authors or PACS codes.
+	Rows without items are left out.
+	See getDynamicNetwork for an explanation of arguments.'''
 	aio = authorInitialsOnly
 	sp = subsetPACS
+	yearItems = []
 	for index, row in df.iterrows():
 		if what == 'authors':
 			ret = parseAPS.getAuthorsYears(row, authorInitialsOnly=aio, subsetPACS=sp)
+			if vocabulary is not None:
+				ret[1] = vocabulary.encode_list(ret[1])
 		elif what == 'pacs':
 			ret = parseAPS.getPACSYears(row, subsetPACS=sp)
-		[year, items] = ret
-		if items:  # Skip this row if items is None
-			for yearKey in yearSet.keys():
-				yearRange = yearSet[yearKey]
-				if year in yearRange:
-					lead = items[0]
-					if lead not in resultsDict[yearKey]:
-						resultsDict[yearKey][lead] = {}
-						for follow in items[1:]:
-							resultsDict[yearKey][lead][follow] = {'weight': 1}
-					else:
-						for follow in items[1:]:
-							if follow not in resultsDict[yearKey][lead]:
-								resultsDict[yearKey][lead][follow] = {'weight': 1}
-							else:
-								resultsDict[yearKey][lead][follow]['weight'] += 1
-					for i in items:
-						if i in nodeWeights[yearKey]:
-							nodeWeights[yearKey][i] += 1
-						else:
-							nodeWeights[yearKey][i] = 1
+		if ret[1]:  # Skip this row if items is None
+			yearItems.append(ret)
+	return yearItems
+
+
+def addItems(adjList, nodeWeights, items):
+	'''Adds the items of one paper to an adjacency dictionary and node weights dictionary, linking the lead item to the others.
+	Helper function.'''
+	lead = items[0]
+	if lead not in adjList:
+		adjList[lead] = {}
+		for follow in items[1:]:
+			adjList[lead][follow] = {'weight': 1}
+	else:
+		for follow in items[1:]:
+			if follow not in adjList[lead]:
+				adjList[lead][follow] = {'weight': 1}
+			else:
+				adjList[lead][follow]['weight'] += 1
+	for i in items:
+		if i in nodeWeights:
+			nodeWeights[i] += 1
+		else:
+			nodeWeights[i] = 1
+
+
+def getYearBuckets(yearItems):
+	'''Accumulates the [year, items] pairs of getYearItems once per single year.
+	Returns a dictionary from year to a tuple (edges, leads, nodeWeights) of dictionaries, as addItems would build them:
+		edges maps (lead, follow) pairs to their weight, leads maps each lead item to its number of papers,
+		and nodeWeights maps each item to its number of papers.'''
+	buckets = {}
+	for [year, items] in yearItems:
+		if year not in buckets:
+			buckets[year] = ({}, {}, {})
+		edges, leads, nodeWeights = buckets[year]
+		lead = items[0]
+		leads[lead] = leads.get(lead, 0) + 1
+		for follow in items[1:]:
+			edges[(lead, follow)] = edges.get((lead, follow), 0) + 1
+		for i in items:
+			nodeWeights[i] = nodeWeights.get(i, 0) + 1
+	return buckets
+
+
+def addCounts(totals, counts, sign=1):
+	'''Adds (sign=1) or subtracts (sign=-1) a dictionary of counts to a dictionary of totals, dropping totals that become 0.
+	Helper function.'''
+	for key, c in counts.items():
+		c = totals.get(key, 0) + sign*c
+		if c:
+			totals[key] = c
+		else:
+			del totals[key]
+
+
+def bucketAdjList(edges, leads):
+	'''Turns summed edges and leads of getYearBuckets into the adjacency dictionary addItems builds.
+	Helper function.'''
+	adjList = dict((lead, {}) for lead in leads)
+	for (lead, follow), w in edges.items():
+		adjList[lead][follow] = {'weight': w}
+	return adjList
+
+
+def getDynamicNetwork(df, what='authors', authorInitialsOnly=False, subsetPACS=None, startYear=1982, endYear=2007, window=5, vocabulary=None):
+	'''Creates a dictionary of dictionaries in order to make graphs, where each dictionary is made using getAdjListSimple.
+	The keys of the dictionary are years from startYear to endYear, and the values are the graph dictionaries.
+	If window=1, the graph only considers papers from a single year.
+	If window=3, the graph considers papers from year-1, year, and year+1.
+	If window=5, the graph considers papers from year-2,year-1,year,year+1,year+2.
+	Make sure that startYear and endYear are set appropriately for the window; the bottom limit is 1980, and the top is 2010.
+	vocabulary: a vocabulary.Vocabulary for the authors; if given, author nodes are integer ids.
+	The rows are accumulated once per single year (getYearBuckets), and each window is the previous one
+		plus its newest year and minus the year that dropped out.'''
+	diam = window//2
+	buckets = getYearBuckets(getYearItems(df, what=what, authorInitialsOnly=authorInitialsOnly, subsetPACS=subsetPACS, vocabulary=vocabulary))
+	empty = ({}, {}, {})
+	edges = {}
+	leads = {}
+	weights = {}
+	resultsDict = {}
+	nodeWeights = {}
+	for year in range(startYear-diam, startYear+diam):
+		for totals, counts in zip((edges, leads, weights), buckets.get(year, empty)):
+			addCounts(totals, counts)
+	for yearKey in range(startYear,endYear+1):
+		for totals, counts in zip((edges, leads, weights), buckets.get(yearKey+diam, empty)):
+			addCounts(totals, counts)
+		if yearKey > startYear:
+			for totals, counts in zip((edges, leads, weights), buckets.get(yearKey-diam-1, empty)):
+				addCounts(totals, counts, -1)
+		resultsDict[yearKey] = bucketAdjList(edges, leads)
+		nodeWeights[yearKey] = dict(weights)
 	return resultsDict, nodeWeights
 
 
-def makeDynamicGraphs(df, what='authors', authorInitialsOnly=False, subsetPACS=None, startYear=1982, endYear=2008, window=5):
+# Yearly buckets shared by the processes of makeDynamicGraphs, set once per process
+_workerBuckets = {}
+
+
+def _initWorker(buckets):
+	global _workerBuckets
+	_workerBuckets = buckets
+
+
+def _makeWindowGraph(job):
+	'''Builds the graph of one window from the shared yearly buckets; runs in a worker process.'''
+	yearKey, yearRange = job
+	edges = {}
+	leads = {}
+	weights = {}
+	for year in yearRange:
+		if year in _workerBuckets:
+			for totals, counts in zip((edges, leads, weights), _workerBuckets[year]):
+				addCounts(totals, counts)
+	G = nx.from_dict_of_dicts(bucketAdjList(edges, leads))
+	nx.set_node_attributes(G,name='weight',values=weights)
+	return yearKey, G
+
+
+def makeDynamicGraphs(df, what='authors', authorInitialsOnly=False, subsetPACS=None, startYear=1982, endYear=2008, window=5, vocabulary=None, workers=1):
 	'''Actually makes the graphs - this is what you run if you want a list of graphs.
 	Produces a dictionary where the keys are years and the values are graphs.
-	See getDynamicNetwork for an explanation of arguments.'''
+	See getDynamicNetwork for an explanation of arguments.
+	workers: number of processes building the graphs of the windows in parallel.
+		The rows are parsed and summed per year once, in this process, and sent to each worker process once.'''
 	aio = authorInitialsOnly
 	sp = subsetPACS
 	sy = startYear
 	ey = endYear
 	wi = window
 	w = what
-	adjLists, nodeWeights = getDynamicNetwork(df, what=w, authorInitialsOnly=aio, subsetPACS=sp, startYear=sy, endYear=ey, window=wi)
+	if workers > 1:
+		buckets = getYearBuckets(getYearItems(df, what=w, authorInitialsOnly=aio, subsetPACS=sp, vocabulary=vocabulary))
+		diam = window//2
+		jobs = [(y, range(y-diam,y+diam+1)) for y in range(sy,ey+1)]
+		pool = multiprocessing.Pool(min(workers, len(jobs)), initializer=_initWorker, initargs=(buckets,))
+		try:
+			return dict(pool.map(_makeWindowGraph, jobs))
+		finally:
+			pool.close()
+			pool.join()
+	adjLists, nodeWeights = getDynamicNetwork(df, what=w, authorInitialsOnly=aio, subsetPACS=sp, startYear=sy, endYear=ey, window=wi, vocabulary=vocabulary)
 	graphsList = {y:None for y in adjLists.keys()}
 	for yearKey in sorted(adjLists.keys()):
 		graphDict = adjLists[yearKey]
 		G = nx.from_dict_of_dicts(graphDict)
-		nx.set_node_attributes(G,'weight',nodeWeights[yearKey])
+		nx.set_node_attributes(G,name='weight',values=nodeWeights[yearKey])
 		graphsList[yearKey] = G
 	return graphsList
\ No newline at end of file
@@ -0,0 +1,134 @@
+'''Index layer for the APS data frame, computed once and saved next to the data:
+	an int16 year per row and an inverted index from PACS codes (at all three levels) to row positions,
+	and a sorted DOI array for joining DOIs (e.g. of the citation data) to row positions.
+Graph builders use it to select the rows for subsetYears/subsetPACS before any per-row work.'''
+import numpy as np
+from . import pacsAPS
+from . import parseAPS
+from .pacsAPS import rowPACS
+
+PACS_LEVELS = (1, 2, 3)
+
+
+def rowYear(row):
+	'''The year of a row: the year column of parseAPS.readArticles if present, otherwise parseAPS.getYear.'''
+	if 'year' in row.index:
+		return int(row['year'])
+	return parseAPS.getYear(row)
+
+
+class APSIndex(object):
+	'''Years and PACS postings of every row of an APS data frame.
+	years: int16 numpy array with the year of each row (0 if unknown), as from parseAPS.getYear.
+	pacs: dictionary from PACS level (1, 2 or 3, see parseAPS.convertPACS) to a dictionary
+		from code to the sorted int32 array of the positions of the rows with that code.'''
+
+	def __init__(self, years, pacs):
+		self.years = years
+		self.pacs = pacs
+
+	@classmethod
+	def build(cls, df):
+		'''Walks df once, reading the year and PACS codes of each row.'''
+		years = np.zeros(len(df), dtype=np.int16)
+		codeLists = []
+		for i, (index, row) in enumerate(df.iterrows()):
+			years[i] = rowYear(row)
+			codeLists.append(rowPACS(row))
+		table = pacsAPS.PACSTable.fromLists(codeLists)
+		pacs = {level: table.postings(level) for level in PACS_LEVELS}
+		return cls(years, pacs)
+
+	def __len__(self):
+		return len(self.years)
+
+	def rows(self, subsetPACS=None, subsetYears=None, pacsLevel=2):
+		'''Sorted array of the positions of the rows with a year in subsetYears
+			and at least one PACS code (at pacsLevel) in subsetPACS.
+		Either subset may be None (or empty) to not filter on it.'''
+		selected = None
+		if subsetYears:
+			selected = np.flatnonzero(np.isin(self.years, list(subsetYears)))
+		if subsetPACS:
+			postings = self.pacs[pacsLevel]
+			lists = [postings[p] for p in subsetPACS if p in postings]
+			if lists:
+				withPACS = np.unique(np.concatenate(lists))
+			else:
+				withPACS = np.zeros(0, dtype=np.int32)
+			if selected is None:
+				selected = withPACS
+			else:
+				selected = np.intersect1d(selected, withPACS, assume_unique=True)
+		if selected is None:
+			selected = np.arange(len(self.years))
+		return selected
+
+	def save(self, path):
+		'''Saves the index to path, e.g. next to the pickled data frame.'''
+		try:
+			import cPickle as pickle
+		except ImportError:
+			import pickle
+		with open(path, 'wb') as f:
+			pickle.dump({'years': self.years, 'pacs': self.pacs}, f, protocol=2)
+
+	@classmethod
+	def load(cls, path):
+		'''Loads an index saved with save.'''
+		try:
+			import cPickle as pickle
+		except ImportError:
+			import pickle
+		with open(path, 'rb') as f:
+			d = pickle.load(f)
+		return cls(d['years'], d['pacs'])
+
+
+class DOIIndex(object):
+	'''Index from DOI to row position of an APS data frame, built once and saved next to the data.
+	dois: the sorted numpy string array of the distinct DOIs.
+	rows: int32 numpy array with the row position of each DOI in dois, for df.iloc (or df.index[rows] for the labels);
+		parseAPS.dois2ilocs gives index labels instead, which are the same only if df has a RangeIndex.
+	Lookups go through a hash table (a pandas Index) built from dois the first time it is needed.'''
+
+	def __init__(self, dois, rows):
+		self.dois = dois
+		self.rows = rows
+		self._hash = None
+
+	@classmethod
+	def build(cls, df, column='doi'):
+		'''Sorts the DOIs of df; if a DOI occurs more than once, its last row is used, as in parseAPS.dois2ilocs.
+		Rows without a DOI (None, NaN or empty) are left out.'''
+		values = df[column]
+		present = np.flatnonzero((values.notnull() & (values != '')).values)
+		dois = np.array([values.iat[i] for i in present], dtype=np.str_)
+		order = np.argsort(dois, kind='mergesort')
+		dois = dois[order]
+		last = np.ones(len(dois), dtype=bool)
+		last[:-1] = dois[1:] != dois[:-1]
+		return cls(dois[last], present[order][last].astype(np.int32))
+
+	def __len__(self):
+		return len(self.dois)
+
+	def lookup(self, dois):
+		'''Row positions (not index labels) of an array of DOIs, -1 for unknown DOIs, in one vectorized call.'''
+		import pandas as pd
+		if self._hash is None:
+			self._hash = pd.Index(self.dois)
+		positions = self._hash.get_indexer(np.asarray(dois, dtype=object))
+		if len(self.rows) == 0:
+			return np.full(len(positions), -1, dtype=np.int32)
+		return np.where(positions >= 0, self.rows[positions], -1).astype(np.int32)
+
+	def save(self, path):
+		'''Saves the index to path as an .npz file, e.g. next to the pickled data frame.'''
+		np.savez(path, dois=self.dois, rows=self.rows)
+
+	@classmethod
+	def load(cls, path):
+		'''Loads an index saved with save.'''
+		with np.load(path) as f:
+			return cls(f['dois'], f['rows'])
@@ -0,0 +1,164 @@
+'''PACS code encoding, computed once per distinct code string.
+Each raw code (e.g. "45.10.Db") gets a dense integer id and its level-1 and level-2 values (4 and 45, see _parseLevel),
+and the codes of every paper are stored as a ragged array of ids, so any level is picked with array indexing.'''
+import numpy as np
+
+
+def _parseLevel(code, pacsLevel):
+	'''The level-1 or level-2 value of a raw code, or -1 if it has none.
+	Level 2 is parsed as parseAPS.convertPACS always did: 45.10.Db goes to 45.
+	Level 1 is the tens digit of level 2, the one convention of every APS function: 45.10.Db goes to 4, and a malformed 4.1 goes to 0.'''
+	try:
+		value = int(code.split(".")[0][-2:2])
+	except:
+		return -1
+	if pacsLevel == 1 and value >= 0:
+		return value // 10
+	return value
+
+
+def rowPACS(row):
+	'''The raw PACS code strings of a row, from the xmltodict pacs column or the list column of parseAPS.readArticles.'''
+	pacs = row['pacs']
+	if isinstance(pacs, dict):
+		pacs = pacs['pacscode']
+	if type(pacs) is not list:
+		pacs = [pacs]
+	return pacs
+
+
+class PACSCodec(object):
+	'''Interns raw PACS code strings as dense ids, parsing each distinct string once.
+	codes: list of the code strings, indexed by id.
+	ids: dictionary from code string to id.'''
+
+	def __init__(self):
+		self.codes = []
+		self.ids = {}
+		self._level1 = []
+		self._level2 = []
+		self._arrays = {}
+
+	def __len__(self):
+		return len(self.codes)
+
+	def add(self, code):
+		'''Returns the id of code, parsing it if it is new.'''
+		try:
+			return self.ids[code]
+		except KeyError:
+			i = len(self.codes)
+			self.ids[code] = i
+			self.codes.append(code)
+			self._level1.append(_parseLevel(code, 1))
+			self._level2.append(_parseLevel(code, 2))
+			self._arrays = {}
+			return i
+
+	def encode(self, codes):
+		'''Returns the list of ids of a list of codes (or of a single code).'''
+		if type(codes) is not list:
+			codes = [codes]
+		return [self.add(c) for c in codes]
+
+	def levels(self, pacsLevel):
+		'''Array with the value at pacsLevel (1 or 2, int8, -1 if none) of every id; for level 3, the ids themselves.'''
+		if pacsLevel not in self._arrays:
+			if pacsLevel == 1:
+				self._arrays[1] = np.array(self._level1, dtype=np.int8)
+			elif pacsLevel == 2:
+				self._arrays[2] = np.array(self._level2, dtype=np.int8)
+			else:
+				self._arrays[pacsLevel] = np.arange(len(self.codes), dtype=np.int32)
+		return self._arrays[pacsLevel]
+
+	def convert(self, codes, pacsLevel=2):
+		'''The distinct values at pacsLevel (1 or 2) of a list of codes, or the codes themselves for level 3.
+		This is what parseAPS.convertPACS and processAPSXML.pacsXML return, without parsing codes that were seen before.'''
+		if type(codes) is not list:
+			codes = [codes]
+		if pacsLevel == 1:
+			values = self._level1
+		elif pacsLevel == 2:
+			values = self._level2
+		else:
+			return codes
+		return list(set(v for v in (values[self.add(c)] for c in codes) if v != -1))
+
+
+_defaultCodec = []
+
+
+def defaultCodec():
+	'''The PACSCodec shared by parseAPS.convertPACS and the other functions parsing codes.'''
+	if not _defaultCodec:
+		_defaultCodec.append(PACSCodec())
+	return _defaultCodec[0]
+
+
+class PACSTable(object):
+	'''PACS codes of every paper as a ragged array: the code ids of paper i are ids[indptr[i]:indptr[i+1]].
+	codec: the PACSCodec of the ids.'''
+
+	def __init__(self, indptr, ids, codec):
+		self.indptr = indptr
+		self.ids = ids
+		self.codec = codec
+
+	@classmethod
+	def fromLists(cls, codeLists, codec=None):
+		'''Builds the table from a list of lists of raw code strings, one per paper.'''
+		if codec is None:
+			codec = defaultCodec()
+		lengths = np.zeros(len(codeLists) + 1, dtype=np.int64)
+		ids = []
+		for i, codes in enumerate(codeLists):
+			encoded = codec.encode(codes)
+			ids.extend(encoded)
+			lengths[i + 1] = len(encoded)
+		return cls(np.cumsum(lengths), np.array(ids, dtype=np.int32), codec)
+
+	@classmethod
+	def fromDataFrame(cls, df, codec=None):
+		'''Builds the table from the pacs column of an APS data frame.'''
+		return cls.fromLists([rowPACS(row) for index, row in df.iterrows()], codec)
+
+	def __len__(self):
+		return len(self.indptr) - 1
+
+	def papers(self):
+		'''Array with the paper (position in the data frame) of every entry of ids.'''
+		return np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.indptr))
+
+	def values(self, pacsLevel=2):
+		'''Array with the value at pacsLevel of every entry of ids (-1 if it has none); level 3 gives the ids.'''
+		return self.codec.levels(pacsLevel)[self.ids]
+
+	def paperCodes(self, i, pacsLevel=2):
+		'''The codes of paper i at pacsLevel, like parseAPS.convertPACS: distinct ints for levels 1 and 2, code strings for level 3.'''
+		ids = self.ids[self.indptr[i]:self.indptr[i + 1]]
+		if pacsLevel == 3:
+			return [self.codec.codes[j] for j in ids]
+		values = self.codec.levels(pacsLevel)[ids]
+		return list(set(int(v) for v in values if v != -1))
+
+	def postings(self, pacsLevel=2):
+		'''Inverted index: dictionary from code at pacsLevel (int, or code string for level 3)
+			to the sorted int32 array of the papers having it.'''
+		values = self.values(pacsLevel)
+		papers = self.papers()
+		keep = values != -1
+		values = values[keep]
+		papers = papers[keep]
+		order = np.lexsort((papers, values))
+		values = values[order]
+		papers = papers[order]
+		starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]]) if len(values) else np.zeros(0, dtype=np.int64)
+		ends = np.r_[starts[1:], len(values)]
+		result = {}
+		for start, end in zip(starts, ends):
+			code = int(values[start])
+			if pacsLevel == 3:
+				code = self.codec.codes[code]
+			result[code] = np.unique(papers[start:end])
+		return result
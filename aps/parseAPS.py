@@ -1,20 +1,210 @@
-from collections import OrderedDict
+from . import pacsAPS
 
 def xml2pickle(infile,outfile):
 	'''Takes an APS metadata xml file (infile),
-	and writes a Pandas DataFrame to outfile'''
-	import pandas as pd
-	import xmltodict
-	import cPickle as pickle
-
-	# read and process infile
-	f = open(infile,'r')
-	d = xmltodict.parse(f) #parse xml file as a dictionary
-	df = pd.DataFrame(d['articles']['article']) # turns it into a Data Frame
-	df = df.dropna(subset=['authgrp','pacs']) # drops useless rows
+	and writes a Pandas DataFrame to outfile.
+	The data frame has the columns of readArticles (see readXML), and only articles with authors and PACS codes.'''
+	try:
+		import cPickle as pickle
+	except ImportError:
+		import pickle
+
+	df = readXML(infile)
 	pickle.dump(df,open(outfile,'wb')) # saves it
 
 
+def _localName(tag):
+	'''Tag name without a {namespace} prefix.'''
+	return tag.rsplit('}', 1)[-1]
+
+
+def _childText(elem, name):
+	for child in elem:
+		if _localName(child.tag) == name:
+			return (child.text or '').strip()
+	return None
+
+
+def _nameParts(part):
+	'''The non-empty names of a name part given as a string, a list or tuple of strings (several elements), or None.'''
+	if part is None:
+		return []
+	if type(part) not in (list, tuple):
+		part = [part]
+	return [p.strip() for p in part if p and p.strip() and p.strip() != '-']
+
+
+def authorName(given, middle, surname, suffix, authorInitialsOnly=False):
+	'''The (givenname, middlename, surname, suffix) tuple of an author, the key used for authors everywhere:
+		missing parts are "-", several given names or suffixes are joined with spaces,
+		and several middle names form a tuple (one middle name stays a string).
+	The parts may be strings, lists or tuples of strings, or None, as they come from xmltodict or from iterArticles.
+	If authorInitialsOnly, the given and middle names are replaced by their first letters (see _initial).'''
+	middles = _nameParts(middle)
+	if len(middles) > 1:
+		middle = tuple(middles)
+	else:
+		middle = middles[0] if middles else '-'
+	name = (' '.join(_nameParts(given)) or '-', middle, surname, ' '.join(_nameParts(suffix)) or '-')
+	if authorInitialsOnly:
+		return (_initial(name[0]), _initial(name[1])) + name[2:]
+	return name
+
+
+def articleRecord(article):
+	'''Flattens one <article> element into a dictionary with the fields
+		doi: the DOI of the article
+		year: the year it was received, or else published, or else revised (like getYear), 0 if unknown
+		authors: list of (givenname, middlename, surname, suffix) tuples (see authorName)
+		pacs: list of PACS code strings
+		journal: journal code (or name) of the article'''
+	record = {'doi': article.get('doi'), 'year': 0, 'authors': [], 'pacs': [], 'journal': None}
+	dates = {}
+	for elem in article.iter():
+		name = _localName(elem.tag)
+		if name == 'author':
+			surname = _childText(elem, 'surname')
+			if surname is None:
+				continue
+			parts = {'givenname': [], 'middlename': [], 'suffix': []}
+			for child in elem:
+				childName = _localName(child.tag)
+				if childName in parts and child.text:
+					parts[childName].append(child.text.strip())
+			record['authors'].append(authorName(parts['givenname'], parts['middlename'], surname, parts['suffix']))
+		elif name == 'pacscode' and elem.text:
+			record['pacs'].append(elem.text.strip())
+		elif name in ('received', 'published', 'revised') and elem.get('date'):
+			dates.setdefault(name, elem.get('date'))
+		elif name == 'journal' and record['journal'] is None:
+			record['journal'] = elem.get('jcode') or (elem.text or '').strip() or None
+		elif name == 'doi' and record['doi'] is None:
+			record['doi'] = (elem.text or '').strip() or None
+	for key in ('received', 'published', 'revised'):
+		if key in dates:
+			record['year'] = int(dates[key].split("-")[0])
+			break
+	return record
+
+
+def iterArticles(infile, dropIncomplete=True):
+	'''Yields the flat record (see articleRecord) of every <article> in an APS metadata xml file, one at a time.
+	Uses incremental parsing and frees each article after use, so memory does not grow with the file size.
+	dropIncomplete: skip articles without authors or PACS codes, like xml2pickle.'''
+	try:
+		from xml.etree import cElementTree as ElementTree
+	except ImportError:
+		from xml.etree import ElementTree
+
+	context = ElementTree.iterparse(infile, events=('start', 'end'))
+	root = None
+	for event, elem in context:
+		if root is None:
+			root = elem
+		if event == 'end' and _localName(elem.tag) == 'article':
+			record = articleRecord(elem)
+			root.clear()  # drop the article (and earlier ones) from the tree
+			if dropIncomplete and not (record['authors'] and record['pacs']):
+				continue
+			yield record
+
+
+ARTICLE_COLUMNS = ('doi', 'year', 'authors', 'pacs', 'journal')
+
+
+def readXML(infile, dropIncomplete=True):
+	'''Reads an APS metadata xml file into a Pandas DataFrame with one row per article,
+		and the same columns as readArticles (doi, year, authors, pacs, journal).
+	The file is parsed incrementally with iterArticles, so only the flat records are kept in memory, never the whole document.
+	dropIncomplete: skip articles without authors or PACS codes.'''
+	import pandas as pd
+
+	columns = dict((c, []) for c in ARTICLE_COLUMNS)
+	for record in iterArticles(infile, dropIncomplete):
+		for c in ARTICLE_COLUMNS:
+			columns[c].append(record[c])
+	return pd.DataFrame(columns, columns=list(ARTICLE_COLUMNS))
+
+
+AUTHOR_COLUMNS = ('givennames', 'middlenames', 'surnames', 'suffixes')
+
+
+def _middleList(middle):
+	'''The middle names of an author tuple as a list (see authorName for the inverse).'''
+	if middle == '-':
+		return []
+	if type(middle) is tuple:
+		return list(middle)
+	return [middle]
+
+
+def xml2parquet(infile, outfile, batchSize=10000, dropIncomplete=True):
+	'''Streams an APS metadata xml file (infile) into a Parquet file (outfile) with the columns
+	doi, year, authors, pacs and journal (see articleRecord), writing batchSize articles at a time,
+	so memory stays flat however large the input is. Needs pyarrow.
+	The authors are stored as the parallel list columns givennames, middlenames (a list of lists), surnames and suffixes,
+		which readArticles turns back into tuples; older pyarrow versions cannot write lists of structs.
+	Returns the number of articles written.'''
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+
+	names = pa.list_(pa.string())
+	schema = pa.schema([('doi', pa.string()), ('year', pa.int16()),
+		('givennames', names), ('middlenames', pa.list_(names)), ('surnames', names), ('suffixes', names),
+		('pacs', names), ('journal', pa.string())])
+
+	def writeBatch(writer, batch):
+		columns = {
+			'doi': [r['doi'] for r in batch],
+			'year': [r['year'] for r in batch],
+			'givennames': [[a[0] for a in r['authors']] for r in batch],
+			'middlenames': [[_middleList(a[1]) for a in r['authors']] for r in batch],
+			'surnames': [[a[2] for a in r['authors']] for r in batch],
+			'suffixes': [[a[3] for a in r['authors']] for r in batch],
+			'pacs': [r['pacs'] for r in batch],
+			'journal': [r['journal'] for r in batch]}
+		arrays = [pa.array(columns[f.name], type=f.type) for f in schema]
+		writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+	writer = pq.ParquetWriter(outfile, schema)
+	count = 0
+	try:
+		batch = []
+		for record in iterArticles(infile, dropIncomplete):
+			batch.append(record)
+			if len(batch) >= batchSize:
+				writeBatch(writer, batch)
+				count += len(batch)
+				batch = []
+		if batch:
+			writeBatch(writer, batch)
+			count += len(batch)
+	finally:
+		writer.close()
+	return count
+
+
+def readArticles(infile, columns=None):
+	'''Reads a Parquet file written by xml2parquet into a Pandas DataFrame, with one row per article
+		and the columns doi, year, authors, pacs and journal, as from readXML.
+	Authors become lists of (givenname, middlename, surname, suffix) tuples.
+	columns: list of columns to read (all if None).'''
+	import pyarrow.parquet as pq
+
+	if columns is None:
+		columns = list(ARTICLE_COLUMNS)
+	fileColumns = []
+	for c in columns:
+		fileColumns.extend(AUTHOR_COLUMNS if c == 'authors' else [c])
+	df = pq.read_table(infile, columns=fileColumns).to_pandas()
+	if 'authors' in columns:
+		parts = [df.pop(c) for c in AUTHOR_COLUMNS]
+		df['authors'] = [[authorName(g, list(m), s, x) for g, m, s, x in zip(*names)] for names in zip(*parts)]
+	if 'pacs' in columns:
+		df['pacs'] = [list(p) for p in df['pacs']]
+	return df[list(columns)]
+
+
 def getAuthors(row, authorInitialsOnly=False, subsetPACS=None, subsetYears=None):
 	'''Returns author information for an input row
 	If authorInitialsOnly = True, then store first and middle initials instead of full names
@@ -22,8 +212,6 @@ def getAuthors(row, authorInitialsOnly=False, subsetPACS=None, subsetYears=None)
 		if the row doesn't contain any of the PACS codes we care about, then we return nothing.
 	subsetYears, if not None, is a list of years we care about.'''
 
-	authgrp = row['authgrp'] # get author information
-
 	# check to see if we want this row, given subsetPACS and subsetYears
 	goodP = 0
 	goodY = 0
@@ -35,8 +223,8 @@ def getAuthors(row, authorInitialsOnly=False, subsetPACS=None, subsetYears=None)
 		goodY = 1
 	if subsetPACS and goodY:
 		numGood = 0
-		subsetPACS = row['pacs']['pacscode']
-		for pp in subsetPACS:
+		myPACS = convertPACS(pacsAPS.rowPACS(row))
+		for pp in myPACS:
 			if pp in subsetPACS:
 				numGood += 1
 		if numGood:
@@ -46,7 +234,7 @@ def getAuthors(row, authorInitialsOnly=False, subsetPACS=None, subsetYears=None)
 
 	# if the row is good, then we process the authors and return them
 	if goodP and goodY:
-		authorList = processAuthors(authgrp, authorInitialsOnly)
+		authorList = rowAuthors(row, authorInitialsOnly)
 	else:
 		authorList = []
 	return authorList
@@ -55,13 +243,12 @@ def getAuthors(row, authorInitialsOnly=False, subsetPACS=None, subsetYears=None)
 def getAuthorsYears(row, authorInitialsOnly=False, subsetPACS=None):
 	'''Like getAuthors, but also returns the year'''
 
-	authgrp = row['authgrp'] # get info
 	# check if the row is good accoring to subsetPACS
 	goodP = 0
 	year = getYear(row)
 	if subsetPACS:
 		numGood = 0
-		myPACS = convertPACS(row['pacs']['pacscode'])
+		myPACS = convertPACS(pacsAPS.rowPACS(row))
 		for pp in myPACS:
 			if pp in subsetPACS:
 				numGood += 1
@@ -72,7 +259,7 @@ def getAuthorsYears(row, authorInitialsOnly=False, subsetPACS=None):
 
 	# if good, return information
 	if goodP:
-		authorList = processAuthors(authgrp, authorInitialsOnly)
+		authorList = rowAuthors(row, authorInitialsOnly)
 	else:
 		authorList = []
 	return [year, authorList]
@@ -80,55 +267,130 @@ def getAuthorsYears(row, authorInitialsOnly=False, subsetPACS=None):
 
 def processAuthors(authgrp, authorInitialsOnly=False):
 	'''Process the authgrp value from the DF row.  Massive pain, do not try to read.'''
-	from collections import OrderedDict
 	authorList = []
-	if type(authgrp) is OrderedDict:
+	if isinstance(authgrp, dict):
 		if 'author' in authgrp.keys():
 			author = authgrp['author']
 		else:
 			author = authgrp
-		if type(author) is OrderedDict:
+		if isinstance(author, dict):
 			if 'surname' in author.keys():
-				if 'givenname' in author.keys():
-					gname = author['givenname']
-					if authorInitialsOnly:
-						gname = gname[0]
-				else:
-					gname = "-"
-				if 'middlename' in author.keys():
-					mname = author['middlename']
-					if type(mname) is list and not authorInitialsOnly:
-						mname = tuple(mname)
-					elif authorInitialsOnly:
-						mname = mname[0]
-				else:
-					mname = "-"
-				if 'suffix' in author.keys():
-					suff = author['suffix']
-				else:
-					suff = "-"
-				name = (gname,mname,author['surname'],suff)
+				name = authorName(author.get('givenname'), author.get('middlename'), author['surname'],
+					author.get('suffix'), authorInitialsOnly)
 				authorList.append(name)
 		else:
 			for a in author:
-				alist = processAuthors(a)
+				alist = processAuthors(a, authorInitialsOnly)
 				for al in alist:
 					authorList.append(al)
 	else:
 		for a in authgrp:
-			alist = processAuthors(a)
+			alist = processAuthors(a, authorInitialsOnly)
 			for al in alist:
 				authorList.append(al)
 	return authorList
 
 
+def _authorDicts(authgrp):
+	'''The author dictionaries (those with a surname) in an authgrp value, in order, found the same way as in processAuthors.'''
+	if isinstance(authgrp, dict):
+		if 'author' in authgrp:
+			author = authgrp['author']
+		else:
+			author = authgrp
+		if isinstance(author, dict):
+			if 'surname' in author:
+				return [author]
+			return []
+		authgrp = author
+	if isinstance(authgrp, list):
+		return [d for a in authgrp for d in _authorDicts(a)]
+	return []
+
+
+def _initial(name):
+	'''The first letter of a name part (of the first one, for a tuple of middle names), "-" if missing.'''
+	if type(name) is tuple:
+		name = name[0]
+	if name == '-' or not name:
+		return '-'
+	return name[0]
+
+
+def authorTable(df):
+	'''Flattens the authors of every row of df once into a paper-author DataFrame with the columns
+		paper: position of the row in df
+		position: position of the author in the author list of the paper
+		given, middle, surname, suffix: the name parts, as from authorName
+		givenInitial, middleInitial: the first letters of the given and (first) middle name, "-" if missing
+	df may have an authgrp column (from xml2pickle) or an authors column of name tuples (from readArticles).'''
+	import pandas as pd
+
+	rows = []
+	if 'authgrp' in df.columns:
+		for paper, authgrp in enumerate(df['authgrp']):
+			for position, author in enumerate(_authorDicts(authgrp)):
+				rows.append((paper, position) + authorName(author.get('givenname'), author.get('middlename'),
+					author['surname'], author.get('suffix')))
+	else:
+		for paper, authors in enumerate(df['authors']):
+			for position, name in enumerate(authors):
+				rows.append((paper, position) + authorName(*name))
+	table = pd.DataFrame(rows, columns=['paper', 'position', 'given', 'middle', 'surname', 'suffix'])
+	table['givenInitial'] = [_initial(n) for n in table['given']]
+	table['middleInitial'] = [_initial(n) for n in table['middle']]
+	return table
+
+
+def normalizeAuthors(df, table=None):
+	'''Adds the columns authorList and authorListInitials to df (in place, and returns df):
+		the (given, middle, surname, suffix) tuples of the authors of each row, with full names or initials only.
+	They are built once from authorTable (or the given table), and getAuthors, getAuthorsYears
+		and the graph functions use them instead of walking authgrp again for every row.'''
+	if table is None:
+		table = authorTable(df)
+	fullNames = [[] for i in range(len(df))]
+	initialNames = [[] for i in range(len(df))]
+	for paper, given, middle, surname, suffix, gi, mi in zip(table['paper'], table['given'], table['middle'],
+			table['surname'], table['suffix'], table['givenInitial'], table['middleInitial']):
+		fullNames[paper].append((given, middle, surname, suffix))
+		initialNames[paper].append((gi, mi, surname, suffix))
+	df['authorList'] = fullNames
+	df['authorListInitials'] = initialNames
+	return df
+
+
+def rowAuthors(row, authorInitialsOnly=False):
+	'''The author tuples of a row: from the columns of normalizeAuthors if df has them, otherwise from processAuthors.'''
+	if authorInitialsOnly:
+		column = 'authorListInitials'
+	else:
+		column = 'authorList'
+	if column in row.index:
+		return list(row[column])
+	if 'authors' in row.index:  # from readXML or readArticles
+		return [authorName(*name, authorInitialsOnly=authorInitialsOnly) for name in row['authors']]
+	return processAuthors(row['authgrp'], authorInitialsOnly)
+
+
+def authorVocabulary(df, authorInitialsOnly=False):
+	'''Builds a vocabulary.Vocabulary that interns every author in df as a dense integer id.
+	Pass it to the graph builders in graphsAPS so that they work on ids instead of name tuples,
+		and save it next to the data with vocabulary.save(path) to keep the ids stable.'''
+	from ..vocabulary import Vocabulary
+	vocabulary = Vocabulary()
+	for index, row in df.iterrows():
+		vocabulary.encode_list(rowAuthors(row, authorInitialsOnly))
+	return vocabulary
+
+
 def getPACS(row, subsetPACS=None, subsetYears=None):
 	'''Get a list of PACS codes in a row.
 	If subsetPACS is None, return all PACS codes.
 		Otherwise, only return those codes in subsetPACS.
 	If subsetYears is None, return as usual.
 		Otherwise, only return the PACS codes if the year falls within subsetYears.'''
-	paperPacs = convertPACS(row['pacs']['pacscode'])
+	paperPacs = convertPACS(pacsAPS.rowPACS(row))
 	goodY = 0
 	if subsetYears:
 		year = getYear(row)
@@ -152,7 +414,7 @@ def getPACS(row, subsetPACS=None, subsetYears=None):
 
 def getPACSYears(row, subsetPACS=None):
 	'''Like getPACS, but returns PACS codes and year.'''
-	paperPacs = convertPACS(row['pacs']['pacscode'])
+	paperPacs = convertPACS(pacsAPS.rowPACS(row))
 	year = getYear(row)
 
 	if subsetPACS:
@@ -168,38 +430,23 @@ def getPACSYears(row, subsetPACS=None):
 
 def convertPACS(pacsList,pacsLevel=2):
 	'''Converts all codes in a given pacsList to the appropriate level of detail.
-	pacsLevel = 1 means that 45.10.Db will go to 40.
+	pacsLevel = 1 means that 45.10.Db will go to 4 (the tens digit of level 2, so 4.1 goes to 0).
 	pacsLevel = 2 means that 45.10.Db will go to 45.
-	pacsLevel = 3 means that 45.10.Db will stay the same.'''
+	pacsLevel = 3 means that 45.10.Db will stay the same.
+	Each distinct code string is only parsed once, see pacsAPS.PACSCodec.'''
 	if type(pacsList) is not list:
 		pacsList = [pacsList]
-	if pacsLevel == 1:
-		newList = []
-		for p in pacsList:
-			try:
-				np = int(p.split(".")[0][-2:1])
-				newList.append(np)
-			except:
-				pass
-		return list(set(newList))
-	elif pacsLevel == 2:
-		newList = []
-		for p in pacsList:
-			try:
-				np = int(p.split(".")[0][-2:2])
-				newList.append(np)
-			except:
-				pass
-		return list(set(newList))
-	else:
-		return pacsList
+	return pacsAPS.defaultCodec().convert(pacsList, pacsLevel)
 
 
 def getYear(row):
 	'''Return the year corresponding to a given row.
-	First checks for received date, then for published date, and finally revised date.'''
+	First checks for received date, then for published date, and finally revised date.
+	Rows from readXML or readArticles have no history, but the year column computed the same way.'''
+	if 'history' not in row.index:
+		return int(row['year'])
 	hist = row['history']
-	if type(hist) is OrderedDict:
+	if isinstance(hist, dict):
 		if 'received' in hist.keys():
 			year = int(hist['received']['@date'].split("-")[0])
 			return year
@@ -227,12 +474,9 @@ def reverseCitingCited(infile, outfile):
 
 
 def dois2ilocs(df):
-	'''Returns a dictionary where the key is the doi and the value is the articles location in the dataframe.'''
-	result = {}
-	for index, row in df.iterrows():
-		doi = row['doi']
-		result[doi] = index
-	return result
+	'''Returns a dictionary where the key is the doi and the value is the articles location in the dataframe (its index label).
+	To join many DOIs to rows, use indexAPS.DOIIndex, which is built once and resolves whole arrays of DOIs to row positions.'''
+	return dict(zip(df['doi'].tolist(), df.index.tolist()))
 
 
 def entropy(freqDict, log_base=10):
@@ -1,25 +1,19 @@
-def coAuthorsXML(infile, pacsCodes=[-1], years=[]):
+def coAuthorsXML(infile, pacsCodes=[-1], years=[], compact=False):
 	'''Usage: G = processXML(infile, <pacsCodes=[...], years=[...]>)
-		infile is a file name (with path as necessary) and must be an XML file.'''
+		infile is a file name (with path as necessary) and must be an XML file.
+		compact: return csrgraph.CSRGraph objects (with the same weights and numPapers) instead of networkx graphs.'''
 	# imports
-	import pandas as pd
-	import xmltodict
 	import networkx as nx
+	from . import pacsAPS
+	from . import parseAPS
 
-	# read and process infile
-	f = open(infile,'r')
-	d = xmltodict.parse(f)
-	df = pd.DataFrame(d['articles']['article'])
-	
-	# remove rows without required fields
-	#for rf in reqFields:
-	#	 df = df.dropna(subset=[rf])
-	
-	df = df.dropna(subset=['pacs'])
-	df = df.dropna(subset=['authgrp'])
+	# read and process infile, keeping articles with authors and PACS codes
+	df = parseAPS.readXML(infile)
+	df = parseAPS.normalizeAuthors(df)  # build the author lists once, not for every PACS code
 
 	# initialize graph
 	Graphs = [nx.Graph() for i in range(len(pacsCodes))]  # Undirected for the moment
+	paperAuthors = [[] for i in range(len(pacsCodes))]  # Author lists of the papers, if compact
 	
 	myPacsCodes = []
 	for p in pacsCodes: 
@@ -34,46 +28,76 @@ def coAuthorsXML(infile, pacsCodes=[-1], years=[]):
 	for x in range(len(myPacsCodes)):
 		G = Graphs[x]
 		p = myPacsCodes[x]
+		numPapers = {}
 		# iterate through data frame from infile
 		ilocs = range(len(df))
 		for i in ilocs:
 			r = df.iloc[i]
 			# print type(r)
-			pacs = r['pacs']['pacscode']
-			if len(years):
-				hist = r['history']
-				if 'received' in hist.keys():
-					year = int(hist['received'].split("-")[0])
-					if year not in years:
-						break
+			pacs = pacsAPS.rowPACS(r)
+			if len(years) and parseAPS.getYear(r) not in years:
+				continue
 			if p == [-1] or pacsMatch(pacs,p):
 				authorInfo = processAuthorLine(r)
+				if compact:
+					paperAuthors[x].append(authorInfo)
+					continue
 				for au in authorInfo:
-					if au not in G.nodes():
+					if au not in numPapers:
 						#print au
-						G.add_node(au,{'numPapers':0})
+						G.add_node(au)
+						numPapers[au] = 0
 						
 				for au in authorInfo:
 					for a in authorInfo:
 						if a != au:
-							if a in G.neighbors(au):
+							if G.has_edge(au,a):
 								G[au][a]['weight'] += 1
 							else:
 								G.add_edge(au,a, weight=1) 
 				
 				for au in authorInfo:
-					G.node[au]['numPapers'] += 1
+					numPapers[au] += 1
+		nx.set_node_attributes(G,name='numPapers',values=numPapers)
 	
 	#for node in G.nodes():
 	#	 if G.node[node]['numPapers'] > 50:
 	#		 print node, G.node[node]['numPapers']		
 				
 	#return G, articleDict
+	if compact:
+		return [coAuthorsCSR(pa) for pa in paperAuthors]
 	return Graphs
+
+
+def coAuthorsCSR(paperAuthors):
+	'''Builds the coauthor graph of coAuthorsXML as a csrgraph.CSRGraph from a list of author lists, one per paper.
+	Every pair of different authors of a paper adds 2 to the weight of their edge (once from each side, as in coAuthorsXML),
+		and every author gets a numPapers node weight.'''
+	import numpy as np
+	import scipy.sparse as sparse
+	from ..vocabulary import Vocabulary
+	from ..csrgraph import CSRGraph
+
+	vocabulary = Vocabulary()
+	papers = []
+	ids = []
+	for i, authorInfo in enumerate(paperAuthors):
+		authorIds = vocabulary.encode_list(authorInfo)
+		papers.extend([i]*len(authorIds))
+		ids.extend(authorIds)
+	n = len(vocabulary)
+	incidence = sparse.csr_matrix((np.ones(len(ids), dtype=np.int32), (papers, ids)), shape=(len(paperAuthors), n))
+	pairs = incidence.T.tocsr().dot(incidence)  # papers x ordered author pairs
+	pairs.setdiag(0)
+	numPapers = np.asarray(incidence.sum(axis=0)).ravel()
+	return CSRGraph.from_matrix(2 * pairs, vocabulary.labels, numPapers, node_attribute='numPapers')
 	
 
 def processAuthorLine(line):
 	#articleInfo = {field:line[field] for field in reqFields} # get all information
+	if 'authorList' in line.index:  # normalized once by parseAPS.normalizeAuthors
+		return list(line['authorList'])
 	authgrp = line['authgrp'] # since we're outputting a graph with authors as nodes
 	# print authgrp
 	authorList = processAuthors(authgrp)
@@ -81,30 +105,17 @@ def processAuthorLine(line):
 	
 
 def processAuthors(authgrp):
-	from collections import OrderedDict
+	from . import parseAPS
 	authorList = []
-	if type(authgrp) is OrderedDict:
+	if isinstance(authgrp, dict):
 		if 'author' in authgrp.keys():
 			author = authgrp['author']
 		else:
 			author = authgrp
-		if type(author) is OrderedDict:
+		if isinstance(author, dict):
 			if 'surname' in author.keys():
-				try:
-					gname = author['givenname']
-				except:
-					gname = "-"
-				try:
-					mname = author['middlename']
-					if type(mname) is list:
-						mname = tuple(mname)
-				except:
-					mname = "-"
-				try:
-					suff = author['suffix']
-				except:
-					suff = "-"
-				name = (gname,mname,author['surname'],suff)
+				name = parseAPS.authorName(author.get('givenname'), author.get('middlename'), author['surname'],
+					author.get('suffix'))
 				authorList.append(name)
 		else:
 			for a in author:
@@ -121,14 +132,11 @@ def processAuthors(authgrp):
 	
 
 def pacsMatch(paperPacs, pacsList):
-	#print paperPacs
-	for pp in paperPacs:
-		try:
-			p = pp.split(".")[0]
-			if int(p) in pacsList:
-				return 1
-		except:
-			pass
+	'''Whether any of the raw codes paperPacs is in pacsList at level 2 (e.g. 45 for 45.10.Db).'''
+	from . import pacsAPS
+	for pp in pacsAPS.defaultCodec().convert(paperPacs, 2):
+		if pp in pacsList:
+			return 1
 	return 0
 	
 
@@ -149,18 +157,17 @@ def addCoAuthorGraphs(Graphs):
 
 def pacsXML(infile, pacsLevel=2):
 	'''Usage: G = processXML(infile, reqFields)
-		infile is a file name (with path as necessary) and must be an XML file.'''
+		infile is a file name (with path as necessary) and must be an XML file.
+		Nodes are the PACS codes at pacsLevel, as from parseAPS.convertPACS.'''
 	# imports
-	import pandas as pd
-	import xmltodict
 	import networkx as nx
+	from . import pacsAPS
+	from . import parseAPS
 
-	# read and process infile
-	f = open(infile,'r')
-	d = xmltodict.parse(f)
-	df = pd.DataFrame(d['articles']['article'])
-	
-	df = df.dropna(subset=['pacs'])
+	# read and process infile, keeping articles with PACS codes
+	df = parseAPS.readXML(infile, dropIncomplete=False)
+	df = df[[len(p) > 0 for p in df['pacs']]]
+	codec = pacsAPS.defaultCodec()  # each distinct code is parsed once
 
 	# initialize graph
 	G = nx.Graph()	# Undirected for the moment
@@ -169,21 +176,8 @@ def pacsXML(infile, pacsLevel=2):
 	for i in ilocs:
 		r = df.iloc[i]
 		# print type(r)
-		properPacs = r['pacs']['pacscode']
-		pacsSet = set()
-		for p in properPacs:
-			try:
-				if pacsLevel == 1:
-					pacs = (int(p.split(".")[0])/10)*10
-				elif pacsLevel == 2:
-					pacs = int(p.split(".")[0])
-					#print pacs
-				else:
-					pacs = p
-				pacsSet.add(pacs)
-			except:
-				pass
-		pacsList = list(pacsSet)
+		properPacs = pacsAPS.rowPACS(r)
+		pacsList = list(set(codec.convert(properPacs, pacsLevel)))  # 45.10.Db goes to 4 at level 1
 		#print pacsList
 		for x in range(len(pacsList)):
 			for y in range(x):
@@ -202,17 +196,13 @@ def authors2Subjects(infile):
 	'''Usage: G = processXML(infile)
 		infile is a file name (with path as necessary) and must be an XML file.'''
 	# imports
-	import pandas as pd
-	import xmltodict
 	import networkx as nx
+	from . import pacsAPS
+	from . import parseAPS
 
-	# read and process infile
-	f = open(infile,'r')
-	d = xmltodict.parse(f)
-	df = pd.DataFrame(d['articles']['article'])
-	
-	df = df.dropna(subset=['pacs'])
-	df = df.dropna(subset=['authgrp'])
+	# read and process infile, keeping articles with authors and PACS codes
+	df = parseAPS.readXML(infile)
+	df = parseAPS.normalizeAuthors(df)  # build the author lists once, not once per graph
 
 	# initialize graph
 	G = nx.Graph()	# Undirected for the moment
@@ -222,7 +212,7 @@ def authors2Subjects(infile):
 	for i in ilocs:
 		r = df.iloc[i]
 		
-		pacs = r['pacs']['pacscode']
+		pacs = pacsAPS.rowPACS(r)
 		for p in pacs:
 			if p not in G.nodes():
 				G.add_node(p)
@@ -1,3 +1,2 @@
 from .arxiv import *
-from . import graph
-from . import scraping
\ No newline at end of file
+from . import graph
\ No newline at end of file
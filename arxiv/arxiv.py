@@ -9,15 +9,39 @@ from __future__ import unicode_literals
 
 import logging
 import glob
+import hashlib
+import multiprocessing
 import os
+import random
 import uuid
 
 import numpy as np
 import pandas as pd
 
+from .names import (unified_name, cached_unified_name,
+                    get_name_with_initials_only, names_with_initials_only,
+                    get_initials, unified_names)
 
-def read_all_arxiv_files(glob_pattern='arxiv/s-*.csv'):
+
+def read_all_arxiv_files(glob_pattern='arxiv/s-*.csv', cache_dir=None):
+    """
+    Read all cleaned arXiv files matching ``glob_pattern`` into one
+    dataframe indexed by arXiv id, with an added ``year`` column.
+
+    ``cache_dir``: if given, a Feather snapshot of the result is kept
+    in this directory and read instead of the CSV files, as long as
+    none of the files was added, removed or modified (needs pyarrow).
+    The result is then always read from the snapshot, see
+    ``read_snapshot`` for its dtypes.
+
+    """
     files = glob.glob(glob_pattern)
+    if cache_dir is not None:
+        path = snapshot_path(files, cache_dir)
+        if os.path.exists(path):
+            logging.debug('Reading snapshot: {}'.format(path))
+            return read_snapshot(path)
+
     dfs = []
     for f in files:
         logging.debug('Processing file: {}'.format(f))
@@ -26,35 +50,175 @@ def read_all_arxiv_files(glob_pattern='arxiv/s-*.csv'):
                          dtype={'id': object},
                          encoding='utf-8')
         df = df.set_index('id')
-        df['year'] = df.index.map(year_extractor)
+        df['year'] = year_array(df.index).astype(np.int64)
         dfs.append(df)
 
     df = pd.concat(dfs)
+    if cache_dir is not None and write_snapshot(df, path):
+        # Return what later, cached calls return, with the same dtypes
+        return read_snapshot(path)
     return df
 
 
-def unified_name(name, initials_only=True):
+def snapshot_path(files, cache_dir):
     """
-    Clean up a `name` string. If `initials_only` is False, full forenames
-    will be used.
+    Path of the snapshot for ``files`` in ``cache_dir``. The file name
+    contains a hash of the files' paths, sizes and modification times,
+    so that any change to the files points to a different snapshot.
 
     """
-    if len(name) <= 1:
-        return name
+    paths = sorted(os.path.abspath(f) for f in files)
+    state = ['{}|{}|{}'.format(f, os.stat(f).st_size, os.stat(f).st_mtime)
+             for f in paths]
+    paths = '\n'.join(paths)
+    state = '\n'.join(state)
+    name = 'arxiv-{}-{}.feather'.format(
+        hashlib.sha1(paths.encode('utf-8')).hexdigest()[0:12],
+        hashlib.sha1(state.encode('utf-8')).hexdigest())
+    return os.path.join(cache_dir, name)
+
+
+def write_snapshot(df, path):
+    """
+    Write ``df`` as an uncompressed Feather file at ``path``, which
+    can be memory-mapped. Snapshots of older states of the same files
+    are deleted. If the data can't be stored (e.g. columns with mixed
+    types), a warning is logged and nothing is written. Returns whether
+    the snapshot was written.
+
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    directory, name = os.path.split(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    # Write to a temporary file first, so that other processes never
+    # see a partially written snapshot
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
     try:
-        if initials_only:
-            l = [i[0] for i in name.rstrip(' .').split(' ')]
-        else:
-            l = [i for i in name.rstrip(' .').split(' ')]
-    except IndexError:
-        return name
-    initials = []
-    for i in l:
+        feather.write_feather(df.reset_index(), tmp_path,
+                              compression='uncompressed')
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        logging.warning('Could not write snapshot {}: {}'.format(path, e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    os.rename(tmp_path, path)
+
+    prefix = name.rsplit('-', 1)[0] + '-'
+    for old in glob.glob(os.path.join(directory, prefix + '*.feather')):
+        if old != path:
+            logging.debug('Removing stale snapshot: {}'.format(old))
+            os.remove(old)
+    return True
+
+
+def read_snapshot(path, columns=None, memory_map=True, as_table=False):
+    """
+    Read a snapshot written by ``write_snapshot``. With ``memory_map``,
+    the file is memory-mapped rather than read.
+
+    ``columns``: list of columns to read (all if None).
+
+    ``as_table``: return the pyarrow Table itself. Its buffers are the
+    memory-mapped pages of the file, so processes reading the same
+    snapshot share one copy through the OS page cache.
+
+    Otherwise a dataframe indexed by arXiv id is returned. With pandas
+    versions that have ``pd.ArrowDtype``, its string columns stay
+    Arrow arrays backed by the mapped file instead of being turned
+    into Python string objects; numeric and categorical columns are
+    converted to numpy, i.e. copied into each process, as are the
+    string columns with older pandas.
+
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    if columns is not None:
+        columns = ['id'] + [c for c in columns if c != 'id']
+    table = feather.read_table(path, columns=columns,
+                               memory_map=memory_map)
+    if as_table:
+        return table
+    kwargs = {}
+    if hasattr(pd, 'ArrowDtype'):
+        def types_mapper(t):
+            if pa.types.is_string(t) or pa.types.is_large_string(t):
+                return pd.ArrowDtype(t)
+        kwargs['types_mapper'] = types_mapper
+    return table.to_pandas(split_blocks=True, **kwargs).set_index('id')
+
+
+try:
+    _string_types = (str, unicode)
+except NameError:  # Python 3
+    _string_types = (str,)
+
+
+# Columns with few distinct, often repeated strings
+CATEGORICAL_COLUMNS = ('categories', 'license')
+
+
+def load_arxiv_files(glob_pattern='arxiv/s-*.csv', columns=None,
+                     categorical=CATEGORICAL_COLUMNS, workers=None):
+    """
+    Faster, leaner alternative to ``read_all_arxiv_files``, returning
+    a dataframe with the same index and ``year`` column.
+
+    ``columns``: list of columns to read (all if None). The ``id``
+    index and the derived ``year`` column are always included.
+
+    ``categorical``: columns to store as pandas categoricals, with
+    categories shared across all files.
+
+    ``workers``: number of processes reading files in parallel.
+    Defaults to the number of CPUs, 1 reads in this process.
+
+    """
+    files = sorted(glob.glob(glob_pattern))
+    jobs = [(f, columns, categorical) for f in files]
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers > 1 and len(files) > 1:
+        pool = multiprocessing.Pool(min(workers, len(files)))
         try:
-            initials.append(i.strip('-').strip('.'))
-        except IndexError:
-            pass
-    return ''.join(initials)
+            dfs = pool.map(_read_arxiv_file, jobs)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        dfs = [_read_arxiv_file(j) for j in jobs]
+
+    # Align categories so that concat keeps the categorical dtype
+    for c in categorical:
+        present = [d for d in dfs if c in d]
+        cats = sorted(set().union(*[d[c].cat.categories for d in present]))
+        for d in present:
+            d[c] = d[c].cat.set_categories(cats)
+
+    return pd.concat(dfs)
+
+
+def _read_arxiv_file(job):
+    """Read a single file for ``load_arxiv_files``"""
+    f, columns, categorical = job
+    logging.debug('Processing file: {}'.format(f))
+    header = pd.read_csv(f, nrows=0, encoding='utf-8').columns
+    if columns is None:
+        usecols = list(header)
+    else:
+        usecols = ['id'] + [c for c in columns if c in header and c != 'id']
+    # Force strings so that str('01') doesn't become int(1)
+    dtype = {'id': object}
+    for c in categorical:
+        if c in usecols:
+            dtype[c] = 'category'
+    df = pd.read_csv(f, usecols=usecols, dtype=dtype, encoding='utf-8')
+    df = df.set_index('id')
+    df['year'] = year_array(df.index)
+    return df
 
 
 def get_authors(row, initials_only=False, subset_categories=None,
@@ -69,7 +233,8 @@ def get_authors(row, initials_only=False, subset_categories=None,
     else:
         try:
             if unify_names:
-                forenames = [unified_name(i, initials_only=ino).replace(',', '')
+                forenames = [cached_unified_name(i, initials_only=ino)
+                             .replace(',', '')
                              for i in row.forenames.split('|')]
             else:
                 forenames = [i.replace(',', '')
@@ -96,6 +261,144 @@ def get_categories(row, subset_categories=None, toplevel=False):
     return cats
 
 
+def _split_pipes(values):
+    """
+    Split the '|'-separated strings in ``values`` into a Series indexed
+    by (paper, position), where paper is the integer position of the
+    string in ``values``. Non-string values are dropped, like the
+    AttributeError cases in ``get_authors`` and ``get_categories``.
+
+    """
+    s = pd.Series(np.asarray(values, dtype=object))
+    try:
+        s = s.str.split('|')
+    except AttributeError:  # no strings at all
+        s = s[:0]
+    s = s.dropna().explode()
+    papers = s.index.values
+    positions = s.groupby(level=0).cumcount().values
+    s.index = pd.MultiIndex.from_arrays([papers, positions],
+                                        names=['paper', 'position'])
+    return s
+
+
+def _paper_table(df, items, column, vocabulary=None):
+    """Turn an exploded (paper, position) Series into a long table"""
+    table = items.rename(column).reset_index()
+    table.insert(1, 'id', df.index.values[table['paper'].values])
+    if 'year' in df:
+        table['year'] = df['year'].values[table['paper'].values]
+    if vocabulary is not None:
+        table[column + '_id'] = vocabulary.encode(table[column])
+    return table
+
+
+def _papers_in_categories(df, subset_categories):
+    """Integer positions of papers with at least one of the categories"""
+    cats = _split_pipes(df['categories'])
+    cats = cats[cats.isin(list(subset_categories))]
+    return np.unique(cats.index.get_level_values('paper'))
+
+
+def get_author_table(df, initials_only=False, subset_categories=None,
+                     unify_names=False, vocabulary=None):
+    """
+    Return a long pandas DataFrame with one row per (paper, author),
+    built in one vectorized pass over ``forenames`` and ``keyname``.
+
+    Columns:
+        * paper: integer position of the paper in ``df``
+        * id: arXiv identifier of the paper (index of ``df``)
+        * position: position of the author in the paper's author list
+        * author: author name, formatted as by ``get_authors``
+        * year: year of the paper, if ``df`` has a ``year`` column
+
+    Papers for which ``get_authors`` would return None are left out.
+    If ``subset_categories`` is given, only papers with at least one
+    of those categories are kept.
+
+    If a ``vocabulary.Vocabulary`` is given, an ``author_id`` column
+    with the interned ids of the authors is added.
+
+    """
+    forenames = _split_pipes(df['forenames'])
+    keynames = _split_pipes(df['keyname'])
+    # Inner join on (paper, position) truncates to the shorter list,
+    # like the zip() in get_authors
+    names = pd.concat([keynames.rename('keyname'),
+                       forenames.rename('forenames')],
+                      axis=1, join='inner')
+    if subset_categories:
+        keep = _papers_in_categories(df, subset_categories)
+        names = names[names.index.get_level_values('paper').isin(keep)]
+    forenames = names['forenames']
+    if unify_names:
+        forenames = pd.Series(unified_names(forenames, initials_only),
+                              index=forenames.index)
+    authors = (names['keyname'].str.replace(',', '', regex=False)
+               + ', ' + forenames.str.replace(',', '', regex=False))
+    return _paper_table(df, authors, 'author', vocabulary)
+
+
+def get_category_table(df, subset_categories=None, toplevel=False,
+                       vocabulary=None):
+    """
+    Return a long pandas DataFrame with one row per (paper, category),
+    with the same columns as ``get_author_table`` but ``category``
+    (and ``category_id``) instead of ``author``. Categories are
+    filtered and collapsed like in ``get_categories``.
+
+    """
+    cats = _split_pipes(df['categories'])
+    if subset_categories:
+        cats = cats[cats.isin(list(subset_categories))]
+        # Renumber positions so that the first remaining category leads
+        papers = cats.index.get_level_values('paper')
+        positions = cats.groupby(level='paper').cumcount().values
+        cats.index = pd.MultiIndex.from_arrays([papers, positions],
+                                               names=['paper', 'position'])
+    if toplevel:
+        cats = cats.str.split('.').str[0]
+    return _paper_table(df, cats, 'category', vocabulary)
+
+
+def build_vocabularies(df):
+    """
+    Return a tuple of two ``vocabulary.Vocabulary`` objects interning
+    all authors and all categories in ``df``, in that order. Save them
+    next to the data with ``Vocabulary.save`` to reuse the same ids.
+
+    """
+    from ..vocabulary import Vocabulary
+
+    authors = Vocabulary(get_author_table(df)['author'])
+    categories = Vocabulary(get_category_table(df)['category'])
+    return (authors, categories)
+
+
+def _nested_counts(counts):
+    """
+    Turn a Series of counts with a two-level index into a dict of dicts,
+    ``{outer: {inner: count}}``
+
+    """
+    result = {}
+    for (outer, inner), n in zip(counts.index.tolist(), counts.tolist()):
+        if outer in result:
+            result[outer][inner] = n
+        else:
+            result[outer] = {inner: n}
+    return result
+
+
+def _value_counts(values):
+    """Like Series.value_counts, but sorted by value and without names"""
+    counts = pd.Series(values).value_counts().sort_index()
+    counts.name = None
+    counts.index.name = None
+    return counts
+
+
 def get_author_series(df, initials_only=False, extended_info=False):
     """
     Return a pandas Series with author names as the index, containing
@@ -110,78 +413,36 @@ def get_author_series(df, initials_only=False, extended_info=False):
           journals of all papers published by the author
 
     """
-    author_counter = {}
-    published = {}
-    sub_time = {}
-    ipp_curr = {}
-    sjr_curr = {}
-    snip_curr = {}
-    ipp_pub = {}
-    sjr_pub = {}
-    snip_pub = {}
+    table = get_author_table(df, initials_only=initials_only)
+    count = _value_counts(table['author'])
 
-    CURR = '2013'  # 'Current' year for IPP, SJR and SNIP metadata
+    if not extended_info:
+        return count
 
-    def _increase(d, a):
-        if a in d:
-            d[a] += 1
-        else:
-            d[a] = 1
-
-    def _add(d, s, what):
-        if a in d:
-            d[a].append(what)
-        else:
-            d[a] = [what]
-
-    for index, row in df.iterrows():
-        authors = get_authors(row, initials_only=initials_only)
-        if authors:
-            for a in authors:
-                _increase(author_counter, a)
-            if extended_info:
-                for a in authors:
-                    if not pd.isnull(row['doi']):
-                        _increase(published, a)
-                    _add(sub_time, a, row['till_published'])
-                    _add(ipp_curr, a, row[CURR + ' IPP'])
-                    _add(sjr_curr, a, row[CURR + ' SJR'])
-                    _add(snip_curr, a, row[CURR + ' SNIP'])
-                    _add(ipp_pub, a, row['Publication IPP'])
-                    _add(sjr_pub, a, row['Publication SJR'])
-                    _add(snip_pub, a, row['Publication SNIP'])
-
-
-    count = pd.Series(author_counter)
-
-    if extended_info:
-        result = pd.DataFrame({'total': count})
-        result['published'] = pd.Series(published)
-        result['published'] = result['published'].fillna(0)
-        result['till_published'] = pd.Series(sub_time).map(np.nanmean)
-        result[CURR + ' IPP'] = pd.Series(ipp_curr).map(np.nanmean)
-        result[CURR + ' SJR'] = pd.Series(sjr_curr).map(np.nanmean)
-        result[CURR + ' SNIP'] = pd.Series(snip_curr).map(np.nanmean)
-        result['Publication IPP'] = pd.Series(ipp_pub).map(np.nanmean)
-        result['Publication SJR'] = pd.Series(sjr_pub).map(np.nanmean)
-        result['Publication SNIP'] = pd.Series(snip_pub).map(np.nanmean)
-    else:
-        result = count
+    CURR = '2013'  # 'Current' year for IPP, SJR and SNIP metadata
+    metrics = ['till_published',
+               CURR + ' IPP', CURR + ' SJR', CURR + ' SNIP',
+               'Publication IPP', 'Publication SJR', 'Publication SNIP']
+
+    # Join the paper-level columns onto the (paper, author) table,
+    # then aggregate everything per author in one go
+    papers = table['paper'].values
+    data = pd.DataFrame({'author': table['author'].values,
+                         'published': df['doi'].notnull().values[papers]})
+    for m in metrics:
+        data[m] = df[m].values[papers]
+    grouped = data.groupby('author', sort=True)
+
+    result = pd.DataFrame({'total': count})
+    result['published'] = grouped['published'].sum().astype(float)
+    # mean() skips NaN, like np.nanmean
+    result = result.join(grouped[metrics].mean())
+    result.index.name = None
 
     return result
 
 
-def _add_paper(author_counter, author, item):
-        if author in author_counter:
-            if item in author_counter[author]:
-                author_counter[author][item] += 1
-            else:
-                author_counter[author][item] = 1
-        else:
-            author_counter[author] = {item: 1}
-
-
-def get_author_year_data(df):
+def get_author_year_data(df, sparse=False):
     """
     Return a pandas dataframe of paper counts, with dimensions:
         1) author names (raw from arxiv)
@@ -190,64 +451,56 @@ def get_author_year_data(df):
     Each (name, year) coordinate is either an integer (number of papers
     published by name in year) or NaN.
 
-    """
-    author_counter = {}  # Contains a dict per author with (cat, year) keys
+    If ``sparse`` is True, returns a ``matrices.CountMatrix`` instead:
+    a scipy.sparse CSR matrix with author and year label arrays, which
+    can be sliced with e.g. ``columns_between(first_year, last_year)``.
+    See also ``matrices.author_category_matrix``.
 
-    for index, row in df.iterrows():
-        authors = get_authors(row, initials_only=False)
-        y = row['year']
-        if authors:
-            for a in authors:
-                _add_paper(author_counter, a, y)
-
-    return author_counter
+    """
+    if sparse:
+        from . import matrices
+        return matrices.author_year_matrix(df)
+    table = get_author_table(df)
+    return _nested_counts(table.groupby(['author', 'year']).size())
 
 
-def get_author_metadata(df):
+def get_author_metadata(df, compact_coauthors=False):
     """
     Return a pandas dataframe with author name strings as index, and
     author categories, coauthors, and total publication counts.
 
+    If ``compact_coauthors`` is True, the coauthors of each author are
+    a read-only, set-like ``coauthors.CoauthorSet`` view into one
+    shared ``coauthors.CoauthorIndex`` instead of a set of names. This
+    uses much less memory for large collaborations; the views compare
+    equal to the sets.
+
     """
-    author_cats = {}
-    author_count = {}
-    author_coauthors = {}
-
-    for index, row in df.iterrows():
-        authors = get_authors(row, initials_only=False)
-        fields = row['categories'].split('|')
-        if authors:
-            for a in authors:
-                # Cats
-                for f in fields:
-                    _add_paper(author_cats, a, f)
-                # Total publications
-                if a in author_count:
-                    author_count[a] += 1
-                else:
-                    author_count[a] = 1
-                # Coauthors
-                if a in author_coauthors:
-                    author_coauthors[a] |= set(authors)
-                else:
-                    author_coauthors[a] = set(authors)
-
-    author_md = pd.DataFrame({'count': pd.Series(author_count),
+    table = get_author_table(df)[['paper', 'author']]
+    cats = get_category_table(df)[['paper', 'category']]
+
+    author_cats = table.merge(cats, on='paper')
+    author_cats = _nested_counts(author_cats.groupby(['author',
+                                                      'category']).size())
+
+    if compact_coauthors:
+        from . import coauthors
+        index = coauthors.CoauthorIndex.from_table(table)
+        author_coauthors = pd.Series(index.views(), index=index.authors)
+    else:
+        pairs = table.merge(table, on='paper', suffixes=('', '_co'))
+        author_coauthors = pairs.groupby('author')['author_co'].apply(set)
+
+    author_md = pd.DataFrame({'count': _value_counts(table['author']),
                               'categories': pd.Series(author_cats),
-                              'coauthors': pd.Series(author_coauthors)})
+                              'coauthors': author_coauthors})
 
     return author_md
 
 
 def get_all_authors(df, initials_only=False):
     """Returns the set of all authors found in `df`."""
-    authors = set()
-    for index, row in df.iterrows():
-        a = get_authors(row, initials_only=initials_only)
-        if a:
-            for i in a:
-                authors.add(i)
-    return authors
+    return set(get_author_table(df, initials_only=initials_only)['author'])
 
 
 def get_arxiv_categories():
@@ -257,7 +510,7 @@ def get_arxiv_categories():
 
 
 def year_extractor(identifier):
-    assert isinstance(identifier, basestring), 'ID must be string'
+    assert isinstance(identifier, _string_types), 'ID must be string'
     # if not isinstance(identifier, basestring):
     #     identifier = str(identifier)
     #     logging.debug('Forced id `{}` to string'.format(identifier))
@@ -272,27 +525,50 @@ def year_extractor(identifier):
     return year
 
 
+def year_array(identifiers):
+    """
+    Vectorized ``year_extractor``: return the years of an array of
+    arXiv identifiers as an int16 numpy array.
+
+    """
+    year = pd.Series(np.asarray(identifiers, dtype=object))
+    year = year.str.split('/').str[-1].str[0:2].astype(int).values
+    return np.where(year > 80, year + 1900, year + 2000).astype(np.int16)
+
+
 def get_uuid():
     """Generate a random unique identifier"""
     return str(uuid.uuid4())
 
 
-def get_name_with_initials_only(name):
-    n, f = name.split(',')
-    return ', '.join((n, f.strip()[0]))
+def uuid_generator(seed=None):
+    """
+    Return a function that, like ``get_uuid``, generates random UUID
+    strings, but from its own random generator seeded with ``seed``,
+    so that the sequence of UUIDs can be reproduced.
+
+    """
+    rng = random.Random(seed)
 
+    def _uuid():
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
 
-def get_initials(name):
-    return ''.join([i[0:1] for i in name.split(',')[1].strip().split(' ')])
+    return _uuid
+
+
+def get_name_matches(author_md, id_generator=None):
+    """
+    Warning: modifies author_md in-place! But also returns name_matches.
 
+    ``author_md`` is indexed by author name and sorted, as returned by
+    ``get_author_metadata``.
 
-def get_name_matches(author_md):
-    """Warning: modifies author_md in-place! But also returns name_matches."""
-    # Get "Forename, Initial" set of all names
-    name_match_keys = set(get_name_with_initials_only(i)
-                          for i in author_md.name.tolist())
+    ``id_generator``: function generating UUIDs, ``get_uuid`` if None.
 
-    name_match_keys = sorted(list(name_match_keys))
+    """
+    if id_generator is None:
+        id_generator = get_uuid
+    names = author_md.index.to_series()
 
     # Go through the match keys and get a list of dataframes grouping
     # potentially matching names
@@ -300,10 +576,11 @@ def get_name_matches(author_md):
 
     i = 0
     while i < len(author_md):
-        this_name = get_name_with_initials_only(author_md.iloc[i].name)
+        this_name = get_name_with_initials_only(names.iloc[i])
         # Look 200 names ahead, this covers also prolific Chinese names
         comparison_df = author_md.iloc[i:i+200]
-        match_df = comparison_df[comparison_df.name.str.startswith(this_name)]
+        match_df = comparison_df[
+            names.iloc[i:i+200].str.startswith(this_name).values]
         if len(match_df) > 1:
             name_matches.append(match_df)
             # Can skip the rest of this match df and move
@@ -314,24 +591,36 @@ def get_name_matches(author_md):
             # "Forename, Initial" variant of the name exists
             # We can therefore generate a UUID for the name and add it to
             # the name's metadata, and be done with this name
-            this_name_id = match_df.ix[0, 'name']
-            author_md.at[this_name_id, 'uuid'] = get_uuid()
+            author_md.loc[names.iloc[i], 'uuid'] = id_generator()
             i += 1
 
     return name_matches
 
 
-def process_match(match, author_md, cab_threshold=0.5):
-    """Try to find author names that point to the same person"""
+def process_match(match, author_md, cab_threshold=0.5, id_generator=None):
+    """
+    Try to find author names that point to the same person
+
+    ``id_generator``: function generating UUIDs, ``get_uuid`` if None.
+    See ``disambiguation.disambiguate`` for a faster, parallel version.
+
+    """
+    if id_generator is None:
+        id_generator = get_uuid
 
-    # lastname_set = lambda x: set(i.split(',')[0] for i in x)
-    lastname_set = lambda x: set(get_name_with_initials_only(i) for i in x)
+    def lastname_set(x):
+        try:
+            # coauthors.CoauthorSet: precomputed integer keys
+            return x.key_set()
+        except AttributeError:
+            # lastname_set = lambda x: set(i.split(',')[0] for i in x)
+            return set(get_name_with_initials_only(i) for i in x)
 
     debug_str = '{} match for {} and {} on {}.'
     initial_name = True
 
     while len(match) > 0:
-        start_name = match.ix[0]
+        start_name = match.iloc[0]
         # Check: if the start_name is a single initial and has too many
         # publcations, we can only assume that it's several people already,
         # and we don't want to further aggregate it, so we skip the entire
@@ -345,13 +634,13 @@ def process_match(match, author_md, cab_threshold=0.5):
                 and len(match) <= allowed_papers):
             author_md.loc[matches, 'flag'] = 1  # Flag as potential problem
         else:
-            cat_a = set(start_name.categories.keys())
+            cat_a = set(start_name['categories'].keys())
             coauthors_a = lastname_set(start_name['coauthors'])
             initials_a = get_initials(start_name.name)
 
-            for index, m in match.ix[1:].iterrows():
+            for index, m in match.iloc[1:].iterrows():
                 this_coauthors = lastname_set(m['coauthors'])
-                this_cat = set(m.categories.keys())
+                this_cat = set(m['categories'].keys())
                 # Check whether the names are potential matches, by comparing
                 # the initials
                 this_initials = get_initials(m.name)
@@ -391,7 +680,7 @@ def process_match(match, author_md, cab_threshold=0.5):
         # NB if neither a coauthor nor a category match was found,
         # `matches` will still be just the start_name,
         # so it will get a UUID by itself
-        author_md.loc[matches, 'uuid'] = get_uuid()
+        author_md.loc[matches, 'uuid'] = id_generator()
 
         # Remove matches from match dataframe
         match = match.drop(matches, axis=0)
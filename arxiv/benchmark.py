@@ -0,0 +1,219 @@
+"""
+Benchmarks for the arXiv data pipeline
+
+Each benchmarked call runs in a fresh process, so that its peak memory
+use can be measured independently of the others.
+
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import multiprocessing
+import resource
+import time
+import traceback
+
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+import numpy as np
+import pandas as pd
+
+from . import arxiv
+
+
+def _run(queue, func, args, kwargs):
+    try:
+        start = time.time()
+        df = func(*args, **kwargs)
+        seconds = time.time() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        queue.put({'seconds': seconds,
+                   'peak_rss_mb': peak / 1024,  # ru_maxrss is in kB on Linux
+                   'rows': len(df),
+                   'frame_mb': df.memory_usage(deep=True).sum() / 1024 ** 2})
+    except Exception:
+        # Exceptions may not pickle, so send the traceback as text
+        queue.put({'error': traceback.format_exc()})
+
+
+def measure(func, *args, **kwargs):
+    """
+    Call ``func(*args, **kwargs)`` in a child process, and return a
+    dict with the wall time, the peak resident memory of the child,
+    and the number of rows and the in-memory size of the resulting
+    dataframe.
+
+    Raises RuntimeError if the call fails, or if the child process
+    dies without a result (e.g. killed for running out of memory).
+
+    """
+    queue = multiprocessing.Queue()
+    p = multiprocessing.Process(target=_run,
+                                args=(queue, func, args, kwargs))
+    p.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except Empty:
+            if not p.is_alive():
+                try:
+                    result = queue.get(timeout=1)
+                    break
+                except Empty:
+                    p.join()
+                    raise RuntimeError(
+                        'Benchmark process exited with code {} without a '
+                        'result'.format(p.exitcode))
+    p.join()
+    if 'error' in result:
+        raise RuntimeError('Benchmarked call failed:\n' + result['error'])
+    return result
+
+
+def check_loaders(glob_pattern='arxiv/s-*.csv', columns=None,
+                  workers=None):
+    """
+    Raise AssertionError unless ``read_all_arxiv_files`` and
+    ``load_arxiv_files`` return the same rows and values for the files
+    matching ``glob_pattern``. Row order and dtypes (categoricals,
+    narrower years, missing strings as NaN or NA) may differ.
+
+    """
+    expected = arxiv.read_all_arxiv_files(glob_pattern)
+    df = arxiv.load_arxiv_files(glob_pattern, columns=columns,
+                                workers=workers)
+    expected = expected[list(df.columns)]
+    frames = []
+    for d in [expected, df]:
+        d = d.sort_index().astype(object)
+        frames.append(d.where(d.notnull(), None))
+    pd.testing.assert_frame_equal(*frames, check_index_type=False)
+
+
+def compare_loaders(glob_pattern='arxiv/s-*.csv', columns=None,
+                    workers=None, repeat=1):
+    """
+    Compare ``read_all_arxiv_files`` with ``load_arxiv_files`` on the
+    files matching ``glob_pattern``. Returns a dataframe with one row
+    per loader and run.
+
+    Both loaders are first checked to return the same data with
+    ``check_loaders``.
+
+    """
+    check_loaders(glob_pattern, columns, workers)
+    loaders = [('read_all_arxiv_files', arxiv.read_all_arxiv_files,
+                {}),
+               ('load_arxiv_files', arxiv.load_arxiv_files,
+                {'columns': columns, 'workers': workers})]
+    results = []
+    for i in range(repeat):
+        for name, func, kwargs in loaders:
+            r = measure(func, glob_pattern, **kwargs)
+            r['loader'] = name
+            r['run'] = i
+            results.append(r)
+    return pd.DataFrame(results).set_index(['loader', 'run'])
+
+
+def synthetic_papers(n_papers=5000, n_people=500, seed=0):
+    """
+    Return a seeded, synthetic dataframe of papers with ``keyname``,
+    ``forenames`` and ``categories`` columns, for disambiguation
+    benchmarks.
+
+    People share a few common surnames and forenames, so that the
+    "Surname, I" blocks are large, and write their middle name either
+    in full or as an initial ("Wei Feng", "Wei F."). Each person has
+    one or two home categories and a group of regular coauthors.
+
+    """
+    rng = np.random.RandomState(seed)
+    surnames = ['Wang', 'Li', 'Zhang', 'Chen', 'Smith', 'Kim', 'Lee',
+                'Nguyen']
+    forenames = ['Wei', 'Wen', 'Jun', 'Jie', 'John', 'James', 'Jane',
+                 'Mary', 'Ming', 'Anna']
+    middle_names = ['Alan', 'Bo', 'Chris', 'David', 'Emil', 'Feng', 'Hui',
+                    'Lin', 'Marie', 'Rose']
+    categories = ['hep-th', 'hep-ph', 'astro-ph', 'cond-mat', 'math.AG',
+                  'math.NT', 'gr-qc', 'quant-ph', 'cs.LG', 'physics.optics']
+
+    people = []
+    for p in range(n_people):
+        forename = forenames[rng.randint(len(forenames))]
+        middle = middle_names[rng.randint(len(middle_names))]
+        people.append({
+            'surname': surnames[rng.randint(len(surnames))],
+            'forms': ['{} {}'.format(forename, middle),
+                      '{} {}.'.format(forename, middle[0])],
+            'categories': list(rng.choice(categories, rng.randint(1, 3),
+                                          replace=False)),
+            'group': rng.randint(n_people, size=5)})
+
+    rows = []
+    for i in range(n_papers):
+        p = rng.randint(n_people)
+        group = people[p]['group']
+        authors = [p] + [int(a) for a in
+                         rng.choice(group, rng.randint(4), replace=False)
+                         if a != p]
+        keynames = [people[a]['surname'] for a in authors]
+        forms = [people[a]['forms'][rng.randint(2)] for a in authors]
+        rows.append(('|'.join(keynames), '|'.join(forms),
+                     '|'.join(people[p]['categories'])))
+    return pd.DataFrame(rows, columns=['keyname', 'forenames', 'categories'],
+                        index=['p{}'.format(i) for i in range(n_papers)])
+
+
+def compare_disambiguation(author_md, workers=None, **minhash_options):
+    """
+    Run ``disambiguation.disambiguate`` on copies of ``author_md`` with
+    the exact rules and with MinHash/LSH candidate pairs. Returns a
+    dict with the time of both runs and the pairwise precision and
+    recall of the MinHash run against the exact one. Both runs use the
+    same seeded UUID generator.
+
+    """
+    from . import disambiguation
+
+    result = {}
+    uuids = {}
+    for similarity in ['exact', 'minhash']:
+        md = author_md.copy()
+        start = time.time()
+        disambiguation.disambiguate(md, workers=workers,
+                                    id_generator=arxiv.uuid_generator(0),
+                                    similarity=similarity,
+                                    **minhash_options)
+        result[similarity + '_seconds'] = time.time() - start
+        uuids[similarity] = md['uuid'].values
+    precision, recall = disambiguation.pair_precision_recall(
+        uuids['exact'], uuids['minhash'])
+    result['precision'] = precision
+    result['recall'] = recall
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('glob_pattern', type=str,
+                        help='Glob pattern of the s-*.csv files')
+    parser.add_argument('--columns', type=str, nargs='*', default=None,
+                        help='Columns for load_arxiv_files')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for load_arxiv_files')
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    print(compare_loaders(args.glob_pattern, args.columns, args.workers,
+                          args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Compact coauthor relation: a CSR adjacency over author ids, with lazy
+set-like views per author
+
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+try:
+    from collections.abc import Set
+except ImportError:  # Python 2
+    from collections import Set
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from . import arxiv
+
+
+class CoauthorIndex(object):
+    """
+    Coauthor relation between the authors of a paper table, stored as
+    a CSR matrix over author ids instead of one set of name strings
+    per author. Entry (i, j) is the number of papers authors i and j
+    wrote together; the diagonal holds each author's own papers, as
+    authors count as their own coauthors in ``get_author_metadata``.
+
+    Authors are identified by their position in the sorted ``authors``
+    array; names are looked up by binary search, so no extra hash
+    table is needed.
+
+    """
+    def __init__(self, matrix, authors):
+        super(CoauthorIndex, self).__init__()
+        self.matrix = sp.csr_matrix(matrix)
+        self.matrix.sort_indices()
+        self.authors = np.asarray(authors, dtype=object)
+        self._keys = None
+
+    @classmethod
+    def from_table(cls, table):
+        """Build the index from an ``arxiv.get_author_table`` table"""
+        a, authors = pd.factorize(table['author'], sort=True)
+        papers = table['paper'].values
+        n_papers = papers.max() + 1 if len(papers) else 0
+        ones = np.ones(len(a), dtype=np.int32)
+        incidence = sp.csr_matrix((ones, (papers, a)),
+                                  shape=(n_papers, len(authors)))
+        incidence.data[:] = 1  # Authors listed twice on a paper count once
+        matrix = incidence.T.tocsr().dot(incidence)
+        return cls(matrix.astype(np.int32), np.asarray(authors, dtype=object))
+
+    def __len__(self):
+        return len(self.authors)
+
+    def id(self, name):
+        """Return the id of the author ``name`` (KeyError if unknown)"""
+        i = np.searchsorted(self.authors, name)
+        if i < len(self.authors) and self.authors[i] == name:
+            return int(i)
+        raise KeyError(name)
+
+    def coauthor_ids(self, i):
+        """Sorted array of the ids of the coauthors of author id ``i``"""
+        m = self.matrix
+        return m.indices[m.indptr[i]:m.indptr[i + 1]]
+
+    def coauthors(self, name):
+        """Lazy set-like view of the coauthor names of ``name``"""
+        return CoauthorSet(self, self.id(name))
+
+    def views(self):
+        """Views of the coauthors of all authors, in id order"""
+        return [CoauthorSet(self, i) for i in range(len(self.authors))]
+
+    @property
+    def keys(self):
+        """
+        Integer id of the "Surname, I" key of every author, computed
+        on first use. Coauthors with equal keys have equal ids.
+
+        """
+        if self._keys is None:
+            keys = arxiv.names_with_initials_only(self.authors)
+            self._keys = pd.factorize(keys)[0].astype(np.int32)
+        return self._keys
+
+
+class CoauthorSet(Set):
+    """
+    Read-only, set-like view of the coauthors of one author in a
+    ``CoauthorIndex``. Iterating yields names; ``&`` and ``|`` return
+    frozensets of names.
+
+    """
+    __slots__ = ('index', 'i')
+
+    def __init__(self, index, i):
+        self.index = index
+        self.i = i
+
+    @classmethod
+    def _from_iterable(cls, it):
+        return frozenset(it)
+
+    @property
+    def ids(self):
+        return self.index.coauthor_ids(self.i)
+
+    def key_set(self):
+        """
+        Set of the "Surname, I" key ids of the coauthors, the integer
+        equivalent of ``get_name_with_initials_only`` over all names.
+
+        """
+        return set(self.index.keys[self.ids].tolist())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.index.authors[self.ids].tolist())
+
+    def __contains__(self, name):
+        try:
+            j = self.index.id(name)
+        except KeyError:
+            return False
+        ids = self.ids
+        k = np.searchsorted(ids, j)
+        return k < len(ids) and ids[k] == j
+
+    def __repr__(self):
+        return 'CoauthorSet({!r})'.format(sorted(self))
@@ -0,0 +1,506 @@
+"""
+Blocked, parallel author disambiguation
+
+Same rules as ``arxiv.get_name_matches`` and ``arxiv.process_match``,
+but blocks are built once from a "Surname, I" key index, and each
+block is clustered independently (optionally in a process pool) on
+plain Python data instead of dataframes.
+
+With ``similarity='minhash'``, MinHash signatures of the coauthor and
+category sets and locality-sensitive hashing (LSH) propose candidate
+pairs within a block, and the exact rules are only applied to those.
+
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import heapq
+import logging
+import multiprocessing
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import numpy as np
+import pandas as pd
+
+from . import arxiv
+from .names import (get_initials, get_name_with_initials_only, name_forms,
+                    names_with_initials_only)
+
+
+def get_blocks(author_md, block_size=200, subset_keys=None):
+    """
+    Return a tuple ``(singles, blocks)`` of lists of integer positions
+    in ``author_md``, which must be sorted by name (as returned by
+    ``arxiv.get_author_metadata``).
+
+    Names sharing a "Surname, I" key form a block; like the 200-name
+    look-ahead in ``get_name_matches``, blocks longer than
+    ``block_size`` are split. Blocks of a single name go to ``singles``.
+
+    ``subset_keys``: if given, only names with these keys are used.
+
+    """
+    keys = names_with_initials_only(author_md.index)
+    # Start of every run of equal keys
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    if subset_keys is not None:
+        keep = np.isin(keys[starts], list(subset_keys))
+        starts = starts[keep]
+        ends = ends[keep]
+    singles = []
+    blocks = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        for i in range(start, end, block_size):
+            block = list(range(i, min(i + block_size, end)))
+            if len(block) > 1:
+                blocks.append(block)
+            else:
+                singles.append(i)
+    return (singles, blocks)
+
+
+def _coauthor_keys(coauthors):
+    """
+    What ``process_match`` compares coauthors on: integer key ids for a
+    ``coauthors.CoauthorSet``, "Surname, I" strings for a plain set.
+
+    """
+    try:
+        return coauthors.index.keys[coauthors.ids]
+    except AttributeError:
+        return coauthors
+
+
+def _key_set(keys):
+    if isinstance(keys, np.ndarray):
+        return set(keys.tolist())
+    return set(get_name_with_initials_only(i) for i in keys)
+
+
+# Mersenne prime for the MinHash hash functions (a * x + b) % _PRIME
+_PRIME = (1 << 31) - 1
+
+
+def minhash_signatures(sets, num_perm=64, seed=1):
+    """
+    Return the MinHash signatures of a list of ``sets`` of hashable
+    items, as an array of shape ``(len(sets), num_perm)``. Two sets
+    agree on each signature entry with probability equal to their
+    Jaccard similarity. Empty sets get ``_PRIME`` everywhere.
+
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _PRIME, size=num_perm).astype(np.int64)
+    b = rng.randint(0, _PRIME, size=num_perm).astype(np.int64)
+    lengths = np.array([len(s) for s in sets], dtype=np.int64)
+    # Map the items to dense integers first, so that any hashable works
+    items = pd.factorize(pd.Series([v for s in sets for v in s],
+                                   dtype=object))[0].astype(np.int64)
+    signatures = np.full((len(sets), num_perm), _PRIME, dtype=np.int64)
+    nonempty = lengths > 0
+    if nonempty.any():
+        hashes = (np.outer(items, a) + b) % _PRIME
+        starts = (np.cumsum(lengths) - lengths)[nonempty]
+        signatures[nonempty] = np.minimum.reduceat(hashes, starts, axis=0)
+    return signatures
+
+
+def lsh_buckets(signatures, bands=32):
+    """
+    Split ``signatures`` into ``bands`` equal slices and return, for
+    every row, the set of ``(band, bucket)`` pairs it falls in, where
+    rows with equal slices share a bucket. Rows that share at least one
+    pair are LSH candidate pairs. Rows of empty sets get no buckets.
+
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    nonempty = signatures[:, 0] < _PRIME
+    buckets = [set() for i in range(n)]
+    if not nonempty.any():
+        return buckets
+    for band in range(bands):
+        part = signatures[nonempty, band * rows:(band + 1) * rows]
+        ids = np.unique(part, axis=0, return_inverse=True)[1].ravel()
+        for i, bucket in zip(np.flatnonzero(nonempty).tolist(), ids.tolist()):
+            buckets[i].add((band, bucket))
+    return buckets
+
+
+def bucket_index(buckets):
+    """
+    Inverted index of ``lsh_buckets`` output: a dict mapping every
+    bucket to the sorted list of rows in it.
+
+    """
+    index = {}
+    for i, row_buckets in enumerate(buckets):
+        for bucket in row_buckets:
+            index.setdefault(bucket, []).append(i)
+    return index
+
+
+def _lsh_candidates(start, matches, buckets, index, assigned):
+    """
+    Yield, in increasing order, the unassigned rows after ``start``
+    that share a bucket with a row in ``matches``. ``matches`` may grow
+    while iterating; rows sharing a bucket with a new member are only
+    yielded if they come after the last row yielded, as a name is
+    compared with the cluster once.
+
+    """
+    todo = []
+    seen = set([start])
+    done = 0
+    last = start
+    while True:
+        for m in matches[done:]:
+            for bucket in buckets[m]:
+                for k in index[bucket]:
+                    if k > last and k not in seen and not assigned[k]:
+                        seen.add(k)
+                        heapq.heappush(todo, k)
+        done = len(matches)
+        if not todo:
+            return
+        last = heapq.heappop(todo)
+        yield last
+
+
+def cluster_block(block, cab_threshold=0.5, similarity='exact',
+                  num_perm=64, bands=32, seed=1, forms=None):
+    """
+    Cluster one block of names with the rules of ``process_match``.
+
+    ``block`` is a list of ``(name, categories, coauthor_keys)``
+    tuples, in name order. Returns a list of ``(members, flagged)``
+    tuples, one per person found, where ``members`` are positions in
+    ``block``, in the order ``process_match`` assigns UUIDs.
+
+    ``similarity``: 'exact' compares every pair of names like
+    ``process_match``. 'minhash' only compares a name with the current
+    cluster if LSH on the coauthor or category signatures (``num_perm``
+    hash functions in ``bands`` bands) paired it with a cluster member.
+    The candidates are looked up in an inverted index of the buckets,
+    so names that share no bucket with the cluster are never visited.
+
+    ``forms``: optional list of ``(initials, forename, single_initial)``
+    per name, taken from ``names.name_forms`` instead of splitting the
+    names here.
+
+    """
+    debug_str = '{} match for {} and {} on {}.'
+    names = [b[0] for b in block]
+    cats = [set(b[1]) for b in block]
+    coauthors = [_key_set(b[2]) for b in block]
+    if similarity == 'minhash':
+        coauthor_buckets = lsh_buckets(
+            minhash_signatures(coauthors, num_perm, seed), bands)
+        cat_buckets = lsh_buckets(
+            minhash_signatures(cats, num_perm, seed), bands)
+        buckets = [set(('coauthors',) + b for b in co)
+                   | set(('categories',) + b for b in ca)
+                   for co, ca in zip(coauthor_buckets, cat_buckets)]
+        index = bucket_index(buckets)
+    elif similarity == 'exact':
+        buckets = None
+    else:
+        raise ValueError('Unknown similarity: {}'.format(similarity))
+    if forms is None:
+        forms = [(get_initials(n), n.split(',')[1].strip('.'),
+                  len(n.split(',')[1].strip().replace('.', '')) == 1)
+                 for n in names]
+    initials = [f[0] for f in forms]
+    firstnames = [f[1] for f in forms]
+    single_initials = [f[2] for f in forms]
+
+    clusters = []
+    n = len(block)
+    assigned = [False] * n
+    remaining = n
+    start = 0
+    initial_name = True
+
+    while remaining > 0:
+        while assigned[start]:
+            start += 1
+        matches = [start]
+        flagged = False
+        allowed_papers = max(10, remaining)
+        if (initial_name and single_initials[start]
+                and remaining <= allowed_papers):
+            flagged = True
+        else:
+            cat_a = cats[start]
+            coauthors_a = coauthors[start]
+            initials_a = initials[start]
+            firstname_a = firstnames[start]
+            if buckets is None:
+                candidates = (j for j in range(start + 1, n)
+                              if not assigned[j])
+            else:
+                candidates = _lsh_candidates(start, matches, buckets,
+                                             index, assigned)
+            for j in candidates:
+                this_initials = initials[j]
+                compare_len = max(len(this_initials), len(initials_a))
+                initials_match = (this_initials[0:compare_len]
+                                  == initials_a[0:compare_len])
+                firstname_b = firstnames[j]
+                firstnames_contain = (firstname_a.startswith(firstname_b)
+                                      or firstname_b.startswith(firstname_a))
+                if initials_match and firstnames_contain:
+                    m_coauthors = coauthors_a & coauthors[j]
+                    if len(m_coauthors) > 1:
+                        matches.append(j)
+                        logging.debug(debug_str.format('Coauthor',
+                                                       names[start],
+                                                       names[j],
+                                                       m_coauthors))
+                        coauthors_a = coauthors_a | coauthors[j]
+                        cat_a = cat_a | cats[j]
+                    else:
+                        m_cats = cat_a & cats[j]
+                        if cat_a and cats[j]:
+                            cab = len(m_cats) * max(1.0 / len(cat_a),
+                                                    1.0 / len(cats[j]))
+                        else:
+                            cab = 0
+                        if cab >= cab_threshold:
+                            matches.append(j)
+                            logging.debug(debug_str.format('Category',
+                                                           names[start],
+                                                           names[j],
+                                                           m_cats))
+                            coauthors_a = coauthors_a | coauthors[j]
+                            cat_a = cat_a | cats[j]
+        clusters.append((matches, flagged))
+        for m in matches:
+            assigned[m] = True
+        remaining -= len(matches)
+        initial_name = False
+
+    return clusters
+
+
+def _cluster_job(job):
+    block, cab_threshold, options = job
+    return cluster_block(block, cab_threshold, **options)
+
+
+def _cluster_blocks(author_md, blocks, cab_threshold, workers, options):
+    """Run ``cluster_block`` on ``blocks`` of positions in ``author_md``"""
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    names = author_md.index.tolist()
+    categories = author_md['categories'].tolist()
+    coauthors = author_md['coauthors'].tolist()
+    forms = name_forms(author_md.index)
+    forms = list(zip(forms['initials'].tolist(), forms['forename'].tolist(),
+                     forms['single_initial'].tolist()))
+    jobs = [([(names[i], list(categories[i].keys()),
+               _coauthor_keys(coauthors[i])) for i in block],
+             cab_threshold, dict(options, forms=[forms[i] for i in block]))
+            for block in blocks]
+
+    if workers > 1 and len(jobs) > 1:
+        pool = multiprocessing.Pool(workers)
+        try:
+            chunksize = max(1, len(jobs) // (workers * 16))
+            return pool.map(_cluster_job, jobs, chunksize)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        return [_cluster_job(j) for j in jobs]
+
+
+def disambiguate(author_md, cab_threshold=0.5, workers=None,
+                 id_generator=None, block_size=200, similarity='exact',
+                 **minhash_options):
+    """
+    Find author names that point to the same person, and store a
+    ``uuid`` per person (and a ``flag`` for single-initial names that
+    may stand for several people) in ``author_md``, in-place.
+
+    ``author_md`` must be sorted by name, as returned by
+    ``arxiv.get_author_metadata``. With the same ``id_generator``
+    (e.g. ``arxiv.uuid_generator(seed)``), the UUIDs are the same as
+    from ``get_name_matches`` followed by ``process_match`` on every
+    match, because they are drawn in the same order.
+
+    ``workers``: number of processes clustering blocks in parallel.
+    Defaults to the number of CPUs, 1 clusters in this process.
+
+    ``similarity``: 'exact' or 'minhash', see ``cluster_block``, which
+    also takes the ``num_perm``, ``bands`` and ``seed`` options.
+
+    """
+    if id_generator is None:
+        id_generator = arxiv.get_uuid
+
+    singles, blocks = get_blocks(author_md, block_size)
+    options = dict(minhash_options, similarity=similarity)
+    results = _cluster_blocks(author_md, blocks, cab_threshold, workers,
+                              options)
+
+    # Draw UUIDs in the same order as get_name_matches + process_match:
+    # first all single names, then the clusters of each block
+    uuids = np.empty(len(author_md), dtype=object)
+    flags = np.full(len(author_md), np.nan)
+    for i in singles:
+        uuids[i] = id_generator()
+    for block, clusters in zip(blocks, results):
+        for members, flagged in clusters:
+            this_uuid = id_generator()
+            for m in members:
+                uuids[block[m]] = this_uuid
+                if flagged:
+                    flags[block[m]] = 1
+    author_md['uuid'] = uuids
+    author_md['flag'] = flags
+    return author_md
+
+
+class DisambiguationState(object):
+    """
+    What an incremental disambiguation run needs from the previous one:
+    the UUID and flag of every name, and a fingerprint of the records
+    in every "Surname, I" block.
+
+    """
+    def __init__(self):
+        super(DisambiguationState, self).__init__()
+        self.uuids = {}
+        self.flags = {}
+        self.fingerprints = {}
+
+    def save(self, path):
+        """Save the state to ``path``, e.g. next to the data"""
+        with open(path, 'wb') as f:
+            pickle.dump(self.__dict__, f, protocol=2)
+
+    @classmethod
+    def load(cls, path):
+        """Load a state saved with ``save``"""
+        state = cls()
+        with open(path, 'rb') as f:
+            state.__dict__.update(pickle.load(f))
+        return state
+
+
+def block_fingerprints(author_md):
+    """
+    Return a dict with a fingerprint per "Surname, I" key, which
+    changes whenever a name with that key is added or removed, or its
+    paper count or number of categories changes (i.e. it has new
+    papers).
+
+    """
+    keys = names_with_initials_only(author_md.index)
+    records = pd.DataFrame({
+        'name': np.asarray(author_md.index, dtype=object),
+        'count': author_md['count'].values,
+        'categories': [len(c) for c in author_md['categories']]})
+    hashes = pd.util.hash_pandas_object(records, index=False).values
+    # Sum of the record hashes (wrapping around), independent of order
+    fingerprints = pd.Series(hashes, dtype=np.uint64).groupby(keys).sum()
+    return dict(zip(fingerprints.index.tolist(), fingerprints.tolist()))
+
+
+def disambiguate_incremental(author_md, state=None, cab_threshold=0.5,
+                             workers=None, id_generator=None,
+                             block_size=200, similarity='exact',
+                             **minhash_options):
+    """
+    Like ``disambiguate``, but only reclusters the "Surname, I" blocks
+    whose records changed since the run that produced ``state`` (a
+    ``DisambiguationState``, or None for a first, full run). Returns
+    ``(author_md, state)`` with the updated state to save for the next
+    run.
+
+    Names in unchanged blocks keep their UUID. In a reclustered block,
+    each person found takes the UUID most of its names already had,
+    unless another person of the same run took it first; people with
+    only new names get new UUIDs.
+
+    """
+    if id_generator is None:
+        id_generator = arxiv.get_uuid
+    if state is None:
+        state = DisambiguationState()
+
+    fingerprints = block_fingerprints(author_md)
+    changed = set(k for k, f in fingerprints.items()
+                  if state.fingerprints.get(k) != f)
+    logging.debug('Reclustering {} of {} blocks'.format(len(changed),
+                                                        len(fingerprints)))
+
+    names = author_md.index.tolist()
+    uuids = np.array([state.uuids.get(n) for n in names], dtype=object)
+    flags = np.array([state.flags.get(n, np.nan) for n in names],
+                     dtype=float)
+
+    singles, blocks = get_blocks(author_md, block_size, subset_keys=changed)
+    options = dict(minhash_options, similarity=similarity)
+    results = _cluster_blocks(author_md, blocks, cab_threshold, workers,
+                              options)
+
+    clusters = [([i], False) for i in singles]
+    for block, block_clusters in zip(blocks, results):
+        for members, flagged in block_clusters:
+            clusters.append(([block[m] for m in members], flagged))
+    old_uuids = uuids.copy()
+    used = set()
+    for members, flagged in clusters:
+        previous = pd.Series(old_uuids[members]).dropna()
+        previous = previous[~previous.isin(used)]
+        if len(previous):
+            # Most common previous UUID, the first one on ties
+            counts = previous.value_counts(sort=False)
+            this_uuid = counts.index[counts.values.argmax()]
+        else:
+            this_uuid = id_generator()
+        used.add(this_uuid)
+        uuids[members] = this_uuid
+        flags[members] = 1 if flagged else np.nan
+
+    author_md['uuid'] = uuids
+    author_md['flag'] = flags
+
+    new_state = DisambiguationState()
+    new_state.uuids = dict(zip(names, uuids.tolist()))
+    new_state.flags = dict((n, f) for n, f in zip(names, flags.tolist())
+                           if f == 1)
+    new_state.fingerprints = fingerprints
+    return (author_md, new_state)
+
+
+def pair_precision_recall(reference, predicted):
+    """
+    Compare two clusterings given as equally long arrays of cluster
+    labels (e.g. the ``uuid`` columns of an exact and an approximate
+    run). Returns ``(precision, recall)`` over pairs of names: the
+    share of predicted same-person pairs that are in the reference,
+    and the share of reference pairs that were predicted.
+
+    """
+    labels = pd.DataFrame({'reference': np.asarray(reference),
+                           'predicted': np.asarray(predicted)})
+
+    def _pairs(sizes):
+        sizes = sizes.values.astype(np.int64)
+        return (sizes * (sizes - 1) // 2).sum()
+
+    both = _pairs(labels.groupby(['reference', 'predicted']).size())
+    predicted_pairs = _pairs(labels.groupby('predicted').size())
+    reference_pairs = _pairs(labels.groupby('reference').size())
+    precision = both / predicted_pairs if predicted_pairs else 1.0
+    recall = both / reference_pairs if reference_pairs else 1.0
+    return (precision, recall)
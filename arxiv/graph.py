@@ -3,13 +3,21 @@ Functions to build a graph
 
 """
 
+import glob
+import logging
+import multiprocessing
+
 import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
 
 from . import arxiv
+from . import matrices
 
 
 def get_adjacency_and_weights(df, what='authors', author_initials_only=False,
-                              subset_categories=None):
+                              subset_categories=None, vocabulary=None):
     """
     Returns a tuple of two things:
 
@@ -32,86 +40,375 @@ def get_adjacency_and_weights(df, what='authors', author_initials_only=False,
     ``subset_categories`` : iterable of categories, if given, only
         those categories are used to build the adjacency list.
 
+    ``vocabulary`` : a ``vocabulary.Vocabulary`` for the items. If
+        given, nodes are the interned integer ids instead of names.
+
     """
-    result = {}
-    weights = {}
-    for index, row in df.iterrows():
-        if what == 'authors':
-            items = arxiv.get_authors(row, author_initials_only,
-                                      subset_categories)
-        elif what == 'categories':
-            items = arxiv.get_categories(row, subset_categories)
-        if items:  # Skip this row if items is None
-            # Add to node weights dict (`weights`)
-            for i in items:
-                if i in weights:
-                    weights[i] += 1
-                else:
-                    weights[i] = 1
-            # Add to adjacency list (`result`)
-            lead = items[0]
-            if lead not in result:
-                result[lead] = {}
-                for follow in items[1:]:
-                    result[lead][follow] = {'weight': 1}
-            else:
-                for follow in items[1:]:
-                    if follow not in result[lead]:
-                        result[lead][follow] = {'weight': 1}
-                    else:
-                        result[lead][follow]['weight'] += 1
+    table, ids, labels = _item_ids(df, what, author_initials_only,
+                                   subset_categories, vocabulary)
+    if vocabulary is not None:
+        decode = lambda i: i.tolist()
+    else:
+        decode = lambda i: labels.take(i).tolist()
+
+    counts = np.bincount(ids, minlength=len(labels))
+    nodes = np.flatnonzero(counts)
+    weights = dict(zip(decode(nodes), counts[nodes].tolist()))
+
+    # Link the first item of each paper (the lead) to all the others
+    star = _star_matrix(table, ids, len(labels), len(df)).tocoo()
+    lead = table['position'].values == 0
+    result = dict((i, {}) for i in decode(np.unique(ids[lead])))
+    for i, j, w in zip(decode(star.row), decode(star.col), star.data.tolist()):
+        result[i][j] = {'weight': w}
     return (result, weights)
 
 
+def _item_ids(df, what, author_initials_only, subset_categories, vocabulary):
+    """
+    Return the long table of ``what`` in ``df``, the integer id of the
+    item in every row and the array of node labels, indexed by id
+    (the vocabulary ids themselves if a vocabulary is given).
+
+    """
+    if what == 'authors':
+        table = arxiv.get_author_table(df, author_initials_only,
+                                       subset_categories)
+        column = 'author'
+    elif what == 'categories':
+        table = arxiv.get_category_table(df, subset_categories)
+        column = 'category'
+    else:
+        raise ValueError('Unknown item type: {}'.format(what))
+    if vocabulary is not None:
+        ids = vocabulary.encode(table[column])
+        labels = np.arange(len(vocabulary))
+    else:
+        ids, labels = pd.factorize(table[column])
+        labels = np.asarray(labels, dtype=object)
+    return (table, ids, labels)
+
+
+def _star_matrix(table, ids, n_items, n_papers):
+    """
+    Lead x follower counts L^T F, where L and F are the paper x item
+    incidence matrices of the first-listed and of the other items
+    """
+    papers = table['paper'].values
+    lead = table['position'].values == 0
+    leads = matrices._incidence(papers[lead], ids[lead], n_papers, n_items)
+    follows = matrices._incidence(papers[~lead], ids[~lead],
+                                  n_papers, n_items)
+    star = leads.T.tocsr().dot(follows)
+    star.sort_indices()
+    return star
+
+
+def cooccurrence_matrix(df, what='authors', how='star', fractional=False,
+                        author_initials_only=False, subset_categories=None,
+                        vocabulary=None):
+    """
+    Returns a tuple of three things:
+
+    (1) a symmetric scipy.sparse CSR matrix of edge weights between
+    items (authors or categories)
+
+    (2) a numpy array of node weights, the total publications for each
+    item (the column sums of the paper x item incidence matrix)
+
+    (3) a numpy array with the label of each row/column, or the
+    vocabulary ids if ``vocabulary`` is given
+
+    Arguments:
+
+    ``how`` : 'star' links the first item of each paper to all the
+        others, like ``get_adjacency_and_weights``; as the matrix is
+        symmetric, a pair that occurs in both directions gets the sum
+        of both counts. 'clique' links all items of each paper to each
+        other, the co-occurrence counts B^T B of the incidence matrix
+        B, without the diagonal.
+
+    ``fractional`` : only with 'clique', weight each paper with n
+        items by 1 / (n - 1) (Newman's collaboration weights), so that
+        each item gets a total edge weight of one per paper.
+
+    ``what``, ``author_initials_only``, ``subset_categories`` and
+    ``vocabulary`` : as for ``get_adjacency_and_weights``.
+
+    """
+    table, ids, labels = _item_ids(df, what, author_initials_only,
+                                   subset_categories, vocabulary)
+    adjacency, weights = _cooccurrence(table, ids, len(labels), len(df),
+                                       how, fractional)
+    return (adjacency, weights, labels)
+
+
+def _cooccurrence(table, ids, n_items, n_papers, how, fractional):
+    """Edge and node weights of the items in ``table``, see above"""
+    incidence = matrices._incidence(table['paper'].values, ids,
+                                    n_papers, n_items)
+    weights = np.asarray(incidence.sum(axis=0)).ravel()
+    if how == 'star':
+        if fractional:
+            raise ValueError('Fractional weights need how=\'clique\'')
+        star = _star_matrix(table, ids, n_items, n_papers)
+        # Self-loops (items listed twice) must not be counted twice
+        loops = sp.diags(star.diagonal(), dtype=star.dtype)
+        adjacency = star + star.T - loops
+    elif how == 'clique':
+        incidence.data[:] = 1  # Items listed twice on a paper count once
+        if fractional:
+            n = np.diff(incidence.indptr)
+            scale = np.zeros(len(n))
+            scale[n > 1] = 1.0 / (n[n > 1] - 1)
+            scaled = sp.diags(scale).dot(incidence)
+            adjacency = incidence.T.tocsr().dot(scaled)
+        else:
+            adjacency = incidence.T.tocsr().dot(incidence)
+        adjacency.setdiag(0)
+    else:
+        raise ValueError('Unknown graph type: {}'.format(how))
+    adjacency = sp.csr_matrix(adjacency)
+    adjacency.eliminate_zeros()
+    adjacency.sort_indices()
+    return (adjacency, weights)
+
+
+def cooccurrence_windows(df, year_range, window=5, what='authors',
+                         how='star', fractional=False,
+                         author_initials_only=False, subset_categories=None,
+                         vocabulary=None):
+    """
+    Returns a tuple of two things:
+
+    (1) a dict with the start years of the sliding windows of
+    ``window`` years within ``year_range`` (as for ``create_graphs``)
+    as keys, and tuples ``(adjacency, weights)`` as from
+    ``cooccurrence_matrix`` as values
+
+    (2) the array of node labels shared by all windows
+
+    The edge and node weights of each year are computed once, in one
+    pass over the papers; each window is then the previous one plus
+    the year entering it minus the year leaving it.
+
+    Other arguments as for ``cooccurrence_matrix``.
+
+    """
+    table, ids, labels = _item_ids(df, what, author_initials_only,
+                                   subset_categories, vocabulary)
+    starts = list(range(year_range[0], year_range[1] - window + 1))
+    if not starts:
+        return ({}, labels)
+    years = table['year'].values
+    order = np.argsort(years, kind='mergesort')
+    bounds = np.searchsorted(years[order], [starts[0], starts[-1] + window])
+    yearly = {}
+    for year, rows in _group_rows(years, order[bounds[0]:bounds[1]]):
+        yearly[year] = _cooccurrence(table.iloc[rows], ids[rows],
+                                     len(labels), len(df), how, fractional)
+    empty = (sp.csr_matrix((len(labels), len(labels)),
+                           dtype=np.float64 if fractional else np.int64),
+             np.zeros(len(labels), dtype=np.int64))
+
+    windows = {}
+    adjacency, weights = empty
+    for year in range(starts[0], starts[0] + window):
+        a, w = yearly.get(year, empty)
+        adjacency = adjacency + a
+        weights = weights + w
+    windows[starts[0]] = (_cleaned(adjacency), weights)
+    for start in starts[1:]:
+        entering, w_in = yearly.get(start + window - 1, empty)
+        leaving, w_out = yearly.get(start - 1, empty)
+        adjacency = adjacency + entering - leaving
+        weights = weights + w_in - w_out
+        windows[start] = (_cleaned(adjacency), weights)
+    return (windows, labels)
+
+
+def _group_rows(years, rows):
+    """Yield ``(year, rows)`` for runs of equal years in sorted ``rows``"""
+    sorted_years = years[rows]
+    cuts = np.flatnonzero(np.diff(sorted_years)) + 1
+    for part in np.split(rows, cuts):
+        if len(part):
+            yield (int(years[part[0]]), np.sort(part))
+
+
+def _cleaned(adjacency):
+    """
+    Copy of a summed window matrix without the entries that dropped to
+    zero, or to rounding noise for fractional weights
+    """
+    adjacency = sp.csr_matrix(adjacency, copy=True)
+    if adjacency.dtype.kind == 'f':
+        adjacency.data[np.abs(adjacency.data) < 1e-9] = 0
+    adjacency.eliminate_zeros()
+    adjacency.sort_indices()
+    return adjacency
+
+
+def stream_cooccurrence(glob_pattern='arxiv/s-*.csv', what='authors',
+                        how='star', fractional=False,
+                        author_initials_only=False, subset_categories=None,
+                        vocabulary=None, years=None, chunksize=100000):
+    """
+    Like ``cooccurrence_matrix``, but read the arXiv files matching
+    ``glob_pattern`` in chunks of ``chunksize`` rows and add the edge
+    and node weights of each chunk to running totals, so the corpus is
+    never loaded as a whole: memory is bounded by the chunk size and
+    the size of the graph.
+
+    Items are interned with ``vocabulary`` (a new
+    ``vocabulary.Vocabulary`` if None), which grows as new items are
+    read. Returns ``(adjacency, weights, labels)``, where the labels
+    are the vocabulary ids if a vocabulary was given, else the names.
+
+    ``years``: if given, a tuple ``(first_year, last_year)``; only
+    papers from these years (inclusive) are used.
+
+    Pass the result to ``cooccurrence_graph`` or
+    ``cooccurrence_csrgraph`` to get a graph.
+
+    """
+    from ..vocabulary import Vocabulary
+
+    given = vocabulary is not None
+    if not given:
+        vocabulary = Vocabulary()
+    adjacency = sp.csr_matrix((0, 0), dtype=np.float64 if fractional
+                              else np.int64)
+    weights = np.zeros(0, dtype=np.int64)
+    for f in sorted(glob.glob(glob_pattern)):
+        logging.debug('Streaming file: {}'.format(f))
+        header = pd.read_csv(f, nrows=0, encoding='utf-8').columns
+        usecols = [c for c in ('id', 'keyname', 'forenames', 'categories')
+                   if c in header]
+        # Force strings so that str('01') doesn't become int(1)
+        chunks = pd.read_csv(f, usecols=usecols, dtype={'id': object},
+                             encoding='utf-8', chunksize=chunksize)
+        for chunk in chunks:
+            chunk = chunk.set_index('id')
+            chunk['year'] = arxiv.year_array(chunk.index)
+            if years is not None:
+                chunk = chunk[(chunk['year'] >= years[0]) &
+                              (chunk['year'] <= years[1])]
+            table, ids, labels = _item_ids(chunk, what, author_initials_only,
+                                           subset_categories, vocabulary)
+            a, w = _cooccurrence(table, ids, len(labels), len(chunk),
+                                 how, fractional)
+            adjacency = _grown(adjacency, len(labels)) + a
+            weights = np.concatenate(
+                [weights, np.zeros(len(labels) - len(weights),
+                                   dtype=weights.dtype)]) + w
+    if given:
+        labels = np.arange(len(vocabulary))
+    else:
+        labels = vocabulary.label_array()
+    # Also covers vocabulary items that are not in these files
+    adjacency = _grown(adjacency, len(labels))
+    weights = np.concatenate([weights, np.zeros(len(labels) - len(weights),
+                                                dtype=weights.dtype)])
+    return (adjacency, weights, labels)
+
+
+def _grown(matrix, n):
+    """Square CSR ``matrix`` padded with empty rows and columns to n x n"""
+    padding = np.repeat(matrix.indptr[-1], n - matrix.shape[0])
+    indptr = np.concatenate([matrix.indptr, padding])
+    return sp.csr_matrix((matrix.data, matrix.indices, indptr), shape=(n, n))
+
+
+def cooccurrence_graph(adjacency, weights, labels):
+    """
+    Build a networkx graph from the output of ``cooccurrence_matrix``,
+    with a ``weight`` attribute on nodes and edges. Items without
+    publications are left out.
+
+    """
+    G = nx.Graph()
+    nodes = np.flatnonzero(weights)
+    G.add_nodes_from((l, {'weight': w}) for l, w in
+                     zip(labels[nodes].tolist(), weights[nodes].tolist()))
+    upper = sp.triu(adjacency).tocoo()
+    G.add_weighted_edges_from(zip(labels[upper.row].tolist(),
+                                  labels[upper.col].tolist(),
+                                  upper.data.tolist()))
+    return G
+
+
+def cooccurrence_csrgraph(adjacency, weights, labels):
+    """
+    Like ``cooccurrence_graph``, but return a compact
+    ``csrgraph.CSRGraph``
+    """
+    from ..csrgraph import CSRGraph
+
+    nodes = np.flatnonzero(weights)
+    return CSRGraph.from_matrix(adjacency[nodes][:, nodes], labels[nodes],
+                                weights[nodes])
+
+
 def get_adjacency_and_weights_bipartite(df, author_initials_only=False,
                                         subset_categories=None,
                                         toplevel=False):
-    result = {}
-    weights = {}
-    authorlist = []
-    for index, row in df.iterrows():
-        auths = arxiv.get_authors(row, author_initials_only,
-                                  subset_categories)
-        cats = arxiv.get_categories(row, subset_categories, toplevel)
-        if auths and cats:  # Skip this row if items is None
-            # Add to node weights dict (`weights`)
-            for a in auths:
-                if a in weights:
-                    weights[a] += 1
-                else:
-                    weights[a] = 1
-                    authorlist.append(a)
-            for c in cats:
-                if c in weights:
-                    weights[c] += 1
-                else:
-                    weights[c] = 1
-            # Add to adjacency list (`result`)
-            for a in auths:
-                if a not in result:
-                    result[a] = {}
-                    for c in cats:
-                        result[a][c] = {'weight': 1}
-            else:
-                for c in cats:
-                    if c not in result[a]:
-                        result[a][c] = {'weight': 1}
-                    else:
-                        result[a][c]['weight'] += 1
+    """
+    Returns a tuple of three things, for a bipartite author-category
+    graph:
+
+    (1) an adjacency list as a dict of dicts, linking each author to
+    the categories of their papers, with the number of papers as weight
+
+    (2) a dict of node weights for authors and categories
+
+    (3) the sorted list of authors
+
+    Built from the sparse matrix of ``matrices.bipartite_matrix``,
+    which is also the better interface for large data.
+
+    """
+    bipartite, author_weights, cat_weights = matrices.bipartite_matrix(
+        df, author_initials_only, subset_categories, toplevel)
+    authors = np.flatnonzero(author_weights)
+    cats = np.flatnonzero(cat_weights)
+    weights = dict(zip(bipartite.rows[authors].tolist(),
+                       author_weights[authors].tolist()))
+    weights.update(zip(bipartite.columns[cats].tolist(),
+                       cat_weights[cats].tolist()))
+    authorlist = bipartite.rows[authors].tolist()
+    result = dict((a, {}) for a in authorlist)
+    coo = bipartite.matrix.tocoo()
+    for a, c, w in zip(bipartite.rows[coo.row].tolist(),
+                       bipartite.columns[coo.col].tolist(),
+                       coo.data.tolist()):
+        result[a][c] = {'weight': w}
     return (result, weights, authorlist)
 
 
-def create_graph(df, what, initials_only):
+def create_graph(df, what, initials_only, compact=False):
+    """
+    Build the graph of ``what`` ('authors' or 'categories') in ``df``
+    as a networkx graph, or with ``compact`` as a ``csrgraph.CSRGraph``
+    from ``cooccurrence_matrix``, where a pair linked in both
+    directions gets the sum of both weights.
+
+    """
+    if compact:
+        return cooccurrence_csrgraph(*cooccurrence_matrix(
+            df, what, author_initials_only=initials_only))
     r = get_adjacency_and_weights(df, what=what,
                                   author_initials_only=initials_only)
     adjacency, weights = r
     G = nx.from_dict_of_dicts(adjacency)
-    nx.set_node_attributes(G, 'weight', weights)
+    # Keywords, as networkx 2 swapped the order of name and values
+    nx.set_node_attributes(G, name='weight', values=weights)
     return G
 
 
 def create_graphs(df, what='authors', year_range=None, window=5,
-                  initials_only=False):
+                  initials_only=False, sliding=False, how='star',
+                  workers=1, compact=False):
     """
     Returns either a single graph (if year_range is None) or a dict of graphs
     over the sliding window length of ``window`` years, with start years as
@@ -127,12 +424,65 @@ def create_graphs(df, what='authors', year_range=None, window=5,
 
     ``window``: width of the moving window (in years)
 
+    ``sliding``: build the windows incrementally from yearly sparse
+    matrices with ``cooccurrence_windows``, which processes every paper
+    once instead of once per window. Edge weights then follow
+    ``cooccurrence_matrix`` with the given ``how`` ('star' or 'clique').
+
+    ``workers``: number of processes building windows in parallel.
+    ``df`` is sent to each process once. ``sliding`` builds the windows
+    one after another, so it can't be combined with more than one
+    worker (ValueError).
+
+    ``compact``: return ``csrgraph.CSRGraph`` objects instead of
+    networkx graphs, see ``create_graph``.
+
     """
+    if sliding and workers > 1:
+        raise ValueError('sliding windows are built in one process, '
+                         'use workers=1')
     if year_range is not None:
         graphs = {}
-        for year in range(year_range[0], year_range[1] - window + 1):
+        if sliding:
+            windows, labels = cooccurrence_windows(
+                df, year_range, window, what=what, how=how,
+                author_initials_only=initials_only)
+            convert = cooccurrence_csrgraph if compact else cooccurrence_graph
+            for year, (adjacency, weights) in windows.items():
+                graphs[year] = convert(adjacency, weights, labels)
+            return graphs
+        years = list(range(year_range[0], year_range[1] - window + 1))
+        if workers > 1 and len(years) > 1:
+            pool = multiprocessing.Pool(
+                min(workers, len(years)), initializer=_init_window_worker,
+                initargs=(df, what, window, initials_only, compact))
+            try:
+                return dict(pool.map(_window_graph_job, years))
+            finally:
+                pool.close()
+                pool.join()
+        for year in years:
             graph_df = df[(df.year >= year) & (df.year < year + window)]
-            graphs[year] = create_graph(graph_df, what, initials_only)
+            graphs[year] = create_graph(graph_df, what, initials_only,
+                                        compact)
         return graphs
     else:
-        return create_graph(df, what)
+        return create_graph(df, what, initials_only, compact)
+
+
+# Input of create_graphs shared by the window worker processes
+_window_input = {}
+
+
+def _init_window_worker(df, what, window, initials_only, compact):
+    _window_input.update(df=df, what=what, window=window,
+                         initials_only=initials_only, compact=compact)
+
+
+def _window_graph_job(year):
+    df = _window_input['df']
+    end = year + _window_input['window']
+    graph_df = df[(df.year >= year) & (df.year < end)]
+    return (year, create_graph(graph_df, _window_input['what'],
+                               _window_input['initials_only'],
+                               _window_input['compact']))
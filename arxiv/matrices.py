@@ -0,0 +1,240 @@
+"""
+Sparse count matrices (author x year, author x category) built from
+the long paper tables of ``arxiv.get_author_table``
+
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from . import arxiv
+
+
+class CountMatrix(object):
+    """
+    A scipy.sparse CSR matrix of counts, with an array of row labels
+    (e.g. author names) and an array of sorted column labels (e.g.
+    years or categories).
+
+    """
+    def __init__(self, matrix, rows, columns):
+        super(CountMatrix, self).__init__()
+        self.matrix = sp.csr_matrix(matrix)
+        self.matrix.sum_duplicates()  # Also sorts the column indices
+        self.rows = np.asarray(rows)
+        self.columns = np.asarray(columns)
+
+    @classmethod
+    def from_pairs(cls, rows, columns, weights=None):
+        """
+        Count the (row, column) pairs given as two equally long arrays
+        of labels, optionally weighted by ``weights``.
+
+        """
+        r, row_labels = pd.factorize(np.asarray(rows), sort=True)
+        c, column_labels = pd.factorize(np.asarray(columns), sort=True)
+        if weights is None:
+            weights = np.ones(len(r), dtype=np.int32)
+        matrix = sp.coo_matrix((weights, (r, c)),
+                               shape=(len(row_labels), len(column_labels)))
+        return cls(matrix.tocsr(), np.asarray(row_labels),
+                   np.asarray(column_labels))
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def __repr__(self):
+        return '<CountMatrix {} x {}, {} non-zero>'.format(
+            self.shape[0], self.shape[1], self.matrix.nnz)
+
+    def _subset(self, row_mask=None, column_mask=None):
+        matrix = self.matrix
+        rows = self.rows
+        columns = self.columns
+        if row_mask is not None:
+            matrix = matrix[row_mask]
+            rows = rows[row_mask]
+        if column_mask is not None:
+            matrix = matrix[:, column_mask]
+            columns = columns[column_mask]
+        return CountMatrix(matrix, rows, columns)
+
+    def select_rows(self, labels):
+        """Only keep the rows with the given labels"""
+        return self._subset(row_mask=np.isin(self.rows, list(labels)))
+
+    def select_columns(self, labels):
+        """Only keep the columns with the given labels"""
+        return self._subset(column_mask=np.isin(self.columns, list(labels)))
+
+    def columns_between(self, first, last):
+        """
+        Only keep the columns with labels from ``first`` to ``last``
+        (inclusive), e.g. a range of years.
+
+        """
+        start = np.searchsorted(self.columns, first, side='left')
+        stop = np.searchsorted(self.columns, last, side='right')
+        return self._subset(column_mask=slice(start, stop))
+
+    def aggregate_columns(self, groups):
+        """
+        Sum the columns with equal labels in ``groups`` (one label per
+        column), e.g. categories into their top-level categories.
+
+        """
+        indicator, labels = _group_indicator(groups)
+        return CountMatrix(self.matrix.dot(indicator), self.rows, labels)
+
+    def row_projection(self, binary=False):
+        """
+        One-mode projection on the rows: a CountMatrix of rows x rows
+        with the sums of the products of their counts over all columns
+        (M M^T), e.g. authors weighted by shared categories, without
+        the diagonal. With ``binary``, count shared columns instead.
+
+        """
+        return _projection(self.matrix, self.rows, binary)
+
+    def column_projection(self, binary=False):
+        """Like ``row_projection``, for the columns (M^T M)"""
+        return _projection(self.matrix.T.tocsr(), self.columns, binary)
+
+    def drop_empty_rows(self):
+        """Remove rows without any counts"""
+        return self._subset(row_mask=np.diff(self.matrix.indptr) > 0)
+
+    def totals(self, axis=1):
+        """Sums per row (``axis=1``) or per column (``axis=0``)"""
+        totals = np.asarray(self.matrix.sum(axis=axis)).ravel()
+        index = self.rows if axis == 1 else self.columns
+        return pd.Series(totals, index=index)
+
+    def span(self):
+        """
+        Return a pandas DataFrame with the labels of the first and last
+        non-empty column of each non-empty row, e.g. the first and last
+        year in which an author published.
+
+        """
+        m = self.matrix
+        counts = np.diff(m.indptr)
+        nonempty = counts > 0
+        starts = m.indptr[:-1][nonempty]
+        ends = m.indptr[1:][nonempty] - 1
+        return pd.DataFrame({'first': self.columns[m.indices[starts]],
+                             'last': self.columns[m.indices[ends]]},
+                            index=self.rows[nonempty],
+                            columns=['first', 'last'])
+
+    def to_frame(self):
+        """Return a pandas DataFrame with sparse columns"""
+        return pd.DataFrame.sparse.from_spmatrix(self.matrix,
+                                                 index=self.rows,
+                                                 columns=self.columns)
+
+    def to_dict(self):
+        """
+        Return a dict of dicts ``{row: {column: count}}`` leaving out
+        zeros, like ``arxiv.get_author_year_data``.
+
+        """
+        coo = self.matrix.tocoo()
+        counts = pd.Series(coo.data,
+                           index=pd.MultiIndex.from_arrays(
+                               [self.rows[coo.row], self.columns[coo.col]]))
+        return arxiv._nested_counts(counts[counts != 0])
+
+
+def author_year_matrix(df, initials_only=False):
+    """Return a CountMatrix of papers per author (rows) and year"""
+    table = arxiv.get_author_table(df, initials_only=initials_only)
+    return CountMatrix.from_pairs(table['author'].values,
+                                  table['year'].values)
+
+
+def author_category_matrix(df, initials_only=False, toplevel=False,
+                           subset_categories=None):
+    """
+    Return a CountMatrix of papers per author (rows) and category,
+    with the same counts as the ``categories`` dicts of
+    ``arxiv.get_author_metadata``.
+
+    """
+    return bipartite_matrix(df, initials_only, subset_categories,
+                            toplevel)[0]
+
+
+def bipartite_matrix(df, initials_only=False, subset_categories=None,
+                     toplevel=False):
+    """
+    Return a tuple of the author x category CountMatrix and two numpy
+    arrays with the number of papers of each author (row) and the
+    number of times each category (column) was used, counting only
+    papers with both authors and categories.
+
+    ``subset_categories``: only use these categories, and the papers
+    with at least one of them.
+
+    ``toplevel``: sum subcategories into top-level categories (e.g.
+    'math.AG' into 'math'), as a column aggregation.
+
+    """
+    authors = arxiv.get_author_table(df, initials_only=initials_only,
+                                     subset_categories=subset_categories)
+    cats = arxiv.get_category_table(df, subset_categories=subset_categories)
+    a, author_labels = pd.factorize(authors['author'], sort=True)
+    c, cat_labels = pd.factorize(cats['category'], sort=True)
+    # author x category = (paper x author)^T (paper x category)
+    papers_authors = _incidence(authors['paper'].values, a,
+                                len(df), len(author_labels))
+    papers_cats = _incidence(cats['paper'].values, c,
+                             len(df), len(cat_labels))
+    cat_labels = np.asarray(cat_labels)
+    if toplevel:
+        groups = pd.Series(cat_labels, dtype=object).str.split('.').str[0]
+        indicator, cat_labels = _group_indicator(groups.values)
+        papers_cats = papers_cats.dot(indicator)
+    both = (np.diff(papers_authors.indptr) > 0) & \
+        (np.diff(papers_cats.indptr) > 0)
+    keep = sp.diags(both.astype(np.int32), dtype=np.int32)
+    papers_authors = keep.dot(papers_authors)
+    papers_cats = keep.dot(papers_cats)
+    matrix = papers_authors.T.tocsr().dot(papers_cats)
+    result = CountMatrix(matrix, np.asarray(author_labels), cat_labels)
+    author_weights = np.asarray(papers_authors.sum(axis=0)).ravel()
+    cat_weights = np.asarray(papers_cats.sum(axis=0)).ravel()
+    return (result, author_weights, cat_weights)
+
+
+def _group_indicator(groups):
+    """
+    Sparse 0/1 matrix of items (rows) x sorted distinct ``groups``
+    (columns), and the group labels
+    """
+    g, labels = pd.factorize(np.asarray(groups), sort=True)
+    ones = np.ones(len(g), dtype=np.int32)
+    indicator = sp.csr_matrix((ones, (np.arange(len(g)), g)),
+                              shape=(len(g), len(labels)))
+    return (indicator, np.asarray(labels))
+
+
+def _projection(matrix, labels, binary):
+    if binary:
+        matrix = matrix.copy()
+        matrix.data[:] = 1
+    product = sp.csr_matrix(matrix.dot(matrix.T))
+    product.setdiag(0)
+    product.eliminate_zeros()
+    return CountMatrix(product, labels, labels)
+
+
+def _incidence(papers, items, n_papers, n_items):
+    """CSR matrix with the number of times each item occurs per paper"""
+    ones = np.ones(len(papers), dtype=np.int32)
+    return sp.csr_matrix((ones, (papers, items)), shape=(n_papers, n_items))
@@ -0,0 +1,168 @@
+"""
+Normalization of the arXiv author names ("Surname, Forenames")
+
+The vectorized functions only work on the distinct values of their
+input, with pandas string methods, and remember the results in a
+module-level cache, so the same forenames are not split and joined
+again for every paper, table and disambiguation run.
+
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+import pandas as pd
+
+# {kind: {value: normalized value}}
+_cache = {}
+
+
+def clear_cache():
+    """Forget all normalized names, e.g. to free memory"""
+    _cache.clear()
+
+
+def unified_name(name, initials_only=True):
+    """
+    Clean up a `name` string. If `initials_only` is False, full forenames
+    will be used.
+
+    """
+    if len(name) <= 1:
+        return name
+    try:
+        if initials_only:
+            l = [i[0] for i in name.rstrip(' .').split(' ')]
+        else:
+            l = [i for i in name.rstrip(' .').split(' ')]
+    except IndexError:
+        return name
+    initials = []
+    for i in l:
+        try:
+            initials.append(i.strip('-').strip('.'))
+        except IndexError:
+            pass
+    return ''.join(initials)
+
+
+def get_name_with_initials_only(name):
+    n, f = name.split(',')
+    return ', '.join((n, f.strip()[0]))
+
+
+def get_initials(name):
+    return ''.join([i[0:1] for i in name.split(',')[1].strip().split(' ')])
+
+
+def cached_unified_name(name, initials_only=True):
+    """``unified_name`` through the cache, for code working per name"""
+    cache = _cache.setdefault(('unified', initials_only), {})
+    try:
+        return cache[name]
+    except KeyError:
+        result = cache[name] = unified_name(name, initials_only)
+        return result
+
+
+def _memoized(kind, values, compute):
+    """
+    Apply ``compute``, a function from a Series of strings to an
+    equally long Series, to the distinct ``values`` that are not in the
+    cache yet, and return the results for all ``values`` as a numpy
+    object array. Missing values stay NaN.
+
+    """
+    codes, uniques = pd.factorize(pd.Series(np.asarray(values, dtype=object)))
+    cache = _cache.setdefault(kind, {})
+    missing = [u for u in uniques if u not in cache]
+    if missing:
+        computed = compute(pd.Series(missing, dtype=object))
+        cache.update(zip(missing, computed.tolist()))
+    results = np.empty(len(uniques), dtype=object)
+    results[:] = [cache[u] for u in uniques]
+    if len(results) == 0:
+        return np.full(len(codes), np.nan, dtype=object)
+    return np.where(codes >= 0, results.take(codes, mode='clip'), np.nan)
+
+
+def _unified(forenames, initials_only):
+    parts = forenames.str.rstrip(' .').str.split(' ').explode()
+    keep = forenames.str.len() > 1
+    if initials_only:
+        # unified_name returns the name unchanged on an empty part
+        keep &= ~(parts.str.len() == 0).groupby(level=0).any()
+        parts = parts.str[0:1]
+    parts = parts.str.strip('-').str.strip('.')
+    return parts.groupby(level=0).agg(''.join).where(keep, forenames)
+
+
+def unified_names(forenames, initials_only=True):
+    """Vectorized ``unified_name`` for an array of forenames"""
+    return _memoized(('unified', initials_only), forenames,
+                     lambda s: _unified(s, initials_only))
+
+
+def _forenames(names):
+    """The part after the first comma, like ``name.split(',')[1]``"""
+    return names.str.split(',').str[1]
+
+
+def names_with_initials_only(names):
+    """
+    Vectorized ``get_name_with_initials_only`` for an array of names,
+    returning a numpy object array. Names with empty forenames give
+    "Surname, " instead of raising IndexError.
+
+    """
+    def compute(names):
+        parts = names.str.split(',', n=1)
+        return parts.str[0] + ', ' + parts.str[1].str.strip().str[0:1]
+    return _memoized('key', names, compute)
+
+
+def initials(names):
+    """Vectorized ``get_initials`` for an array of names"""
+    def compute(names):
+        parts = _forenames(names).str.strip().str.split(' ').explode()
+        return parts.str[0:1].groupby(level=0).agg(''.join)
+    return _memoized('initials', names, compute)
+
+
+def name_forms(names):
+    """
+    Return a pandas DataFrame indexed by ``names`` with their
+    normalized forms:
+        * full: surname and ``unified_name`` of the full forenames
+        * initials_only: surname and ``unified_name`` of the initials
+        * key: "Surname, I" from ``get_name_with_initials_only``
+        * initials: all initials, from ``get_initials``
+        * forename: forenames without surrounding dots, as compared by
+          ``process_match``
+        * single_initial: whether the forenames are one initial, the
+          names ``process_match`` flags
+
+    """
+    index = pd.Index(np.asarray(names, dtype=object))
+    s = pd.Series(index.values)
+    surnames = s.str.split(',', n=1).str[0].str.replace(',', '', regex=False)
+    forenames = _forenames(s)
+
+    def with_surname(initials_only):
+        unified = pd.Series(unified_names(forenames.str.strip(),
+                                          initials_only))
+        return (surnames + ', ' + unified).values
+
+    single = _memoized('single_initial', s, lambda n: _forenames(n).str.strip()
+                       .str.replace('.', '', regex=False).str.len() == 1)
+    return pd.DataFrame({
+        'full': with_surname(False),
+        'initials_only': with_surname(True),
+        'key': names_with_initials_only(s),
+        'initials': initials(s),
+        'forename': forenames.str.strip('.').values,
+        'single_initial': single.astype(bool)},
+        index=index,
+        columns=['full', 'initials_only', 'key', 'initials', 'forename',
+                 'single_initial'])
@@ -0,0 +1,212 @@
+"""
+Compact, undirected weighted graphs stored as CSR arrays, shared by the
+arXiv and APS graph builders
+
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+
+class CSRGraph(object):
+    """
+    An undirected weighted graph as the CSR arrays of its symmetric
+    adjacency matrix: the neighbors of node ``i`` are
+    ``indices[indptr[i]:indptr[i + 1]]``, with edge weights in the same
+    positions of ``weights``. ``labels`` and ``node_weights`` hold the
+    name and weight of each node. Self-loops are stored once.
+
+    This takes a few bytes per edge instead of the hundreds of a
+    networkx graph, pickles cheaply and can be saved as ``.npz``;
+    convert it with ``to_networkx`` or ``to_igraph`` to run algorithms.
+
+    ``node_attribute`` is the name of the node weights in the converted
+    graphs, e.g. 'weight' or 'numPapers'.
+
+    """
+    def __init__(self, indptr, indices, weights, labels, node_weights=None,
+                 node_attribute='weight'):
+        super(CSRGraph, self).__init__()
+        self.indptr = np.asarray(indptr)
+        self.indices = np.asarray(indices)
+        self.weights = np.asarray(weights)
+        self.labels = _label_array(labels)
+        if node_weights is None:
+            node_weights = np.zeros(len(self.labels), dtype=np.int64)
+        self.node_weights = np.asarray(node_weights)
+        self.node_attribute = node_attribute
+
+    @classmethod
+    def from_matrix(cls, matrix, labels, node_weights=None,
+                    node_attribute='weight'):
+        """Build the graph from a symmetric scipy.sparse matrix"""
+        import scipy.sparse as sp
+
+        matrix = sp.csr_matrix(matrix)
+        matrix.eliminate_zeros()
+        matrix.sort_indices()
+        return cls(matrix.indptr, matrix.indices, matrix.data, labels,
+                   node_weights, node_attribute)
+
+    @classmethod
+    def from_dict_of_dicts(cls, adjacency, node_weights=None,
+                           node_attribute='weight'):
+        """
+        Build the graph from an adjacency dict of dicts of
+        ``{'weight': w}`` dicts, with the same edges and weights as
+        ``networkx.from_dict_of_dicts`` (where ``u -> v`` and ``v -> u``
+        both occur, the one seen last wins), and an optional dict of
+        node weights.
+
+        """
+        import scipy.sparse as sp
+
+        labels = []
+        ids = {}
+
+        def node_id(n):
+            try:
+                return ids[n]
+            except KeyError:
+                ids[n] = len(labels)
+                labels.append(n)
+                return ids[n]
+
+        edges = {}
+        for u, neighbors in adjacency.items():
+            i = node_id(u)
+            for v, data in neighbors.items():
+                j = node_id(v)
+                edges[(min(i, j), max(i, j))] = data.get('weight', 1)
+        if node_weights is not None:
+            for n in node_weights:
+                node_id(n)
+        if edges:
+            rows, columns = np.array(list(edges.keys())).T
+            data = np.array(list(edges.values()))
+        else:
+            rows = columns = data = np.zeros(0, dtype=np.int64)
+        upper = sp.coo_matrix((data, (rows, columns)),
+                              shape=(len(labels), len(labels))).tocsr()
+        lower = sp.triu(upper, k=1).T
+        weights = None
+        if node_weights is not None:
+            weights = np.array([node_weights.get(n, 0) for n in labels])
+        return cls.from_matrix(upper + lower, labels, weights,
+                               node_attribute)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return '<CSRGraph {} nodes, {} edges>'.format(
+            self.number_of_nodes(), self.number_of_edges())
+
+    def number_of_nodes(self):
+        return len(self.labels)
+
+    def number_of_edges(self):
+        loops = np.count_nonzero(self.indices == self._rows())
+        return (len(self.indices) + loops) // 2
+
+    def _rows(self):
+        """Row (source node) of every stored entry"""
+        return np.repeat(np.arange(len(self.labels)), np.diff(self.indptr))
+
+    def degree(self):
+        """Number of neighbors of every node, as an array"""
+        return np.diff(self.indptr)
+
+    def neighbors(self, i):
+        """Array of the neighbor ids of node id ``i``"""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def matrix(self):
+        """The adjacency matrix as a scipy.sparse CSR matrix"""
+        import scipy.sparse as sp
+
+        n = len(self.labels)
+        return sp.csr_matrix((self.weights, self.indices, self.indptr),
+                             shape=(n, n))
+
+    def edges(self):
+        """
+        Return the arrays ``(sources, targets, weights)`` of all edges,
+        each once, with ``sources <= targets``
+        """
+        rows = self._rows()
+        upper = rows <= self.indices
+        return (rows[upper], self.indices[upper], self.weights[upper])
+
+    def to_networkx(self):
+        """Convert to a networkx Graph with node and edge weights"""
+        import networkx as nx
+
+        G = nx.Graph()
+        labels = self.labels.tolist()
+        G.add_nodes_from((l, {self.node_attribute: w}) for l, w in
+                         zip(labels, self.node_weights.tolist()))
+        sources, targets, weights = self.edges()
+        G.add_weighted_edges_from((labels[i], labels[j], w) for i, j, w in
+                                  zip(sources.tolist(), targets.tolist(),
+                                      weights.tolist()))
+        return G
+
+    def to_igraph(self):
+        """
+        Convert to a python-igraph Graph, with the labels as the
+        ``name`` vertex attribute
+        """
+        import igraph
+
+        sources, targets, weights = self.edges()
+        g = igraph.Graph(n=len(self.labels),
+                         edges=list(zip(sources.tolist(), targets.tolist())),
+                         directed=False)
+        g.vs['name'] = self.labels.tolist()
+        g.vs[self.node_attribute] = self.node_weights.tolist()
+        g.es['weight'] = weights.tolist()
+        return g
+
+    def save(self, path):
+        """
+        Save the graph to ``path`` as an uncompressed ``.npz`` file.
+        Labels other than numbers and strings (e.g. the name tuples of
+        the APS data) are pickled.
+
+        """
+        np.savez(path, indptr=self.indptr, indices=self.indices,
+                 weights=self.weights, labels=self.labels,
+                 node_weights=self.node_weights,
+                 node_attribute=np.array(self.node_attribute))
+
+    @classmethod
+    def load(cls, path):
+        """Load a graph saved with ``save``"""
+        with np.load(path, allow_pickle=True) as f:
+            return cls(f['indptr'], f['indices'], f['weights'], f['labels'],
+                       f['node_weights'], f['node_attribute'].item())
+
+
+def _label_array(labels):
+    """
+    Labels as a numpy array; tuples stay single objects, and strings
+    and numbers get a plain (non-object) dtype where possible.
+
+    """
+    if isinstance(labels, np.ndarray) and labels.dtype != object:
+        return labels
+    result = np.empty(len(labels), dtype=object)
+    for i, l in enumerate(labels):
+        result[i] = l
+    types = set(type(l) for l in result)
+    if len(types) == 1 and tuple not in types:
+        try:
+            plain = np.array(result.tolist())
+        except (TypeError, ValueError):
+            return result
+        if plain.dtype != object and plain.ndim == 1:
+            return plain
+    return result
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+import random
+
+import pandas as pd
+import pytest
+
+PACS_POOL = ['45.10.Db', '45.20.-d', '03.65.-w', '03.67.Ac', '98.80.Es', '05.45.Pq', '4.1', 'xx.10']
+NAMES = [('John', [], 'Smith'), ('Mary', [], 'Jones'), ('Wei', [], 'Wang'), ('Ann', [], 'Lee'),
+	('John', ['Quincy'], 'Adams'), ('Hua', ['Li', 'Ming'], 'Zhang')]
+
+
+def articleXML(doi, year, authors, pacs):
+	'''An <article> element of the APS metadata xml file.'''
+	authorXML = ''.join('<author><givenname>{}</givenname>{}<surname>{}</surname></author>'.format(
+		g, ''.join('<middlename>{}</middlename>'.format(m) for m in middles), s) for g, middles, s in authors)
+	pacsXML = ''.join('<pacscode>{}</pacscode>'.format(p) for p in pacs)
+	return ('<article doi="{}"><journal jcode="PR">Physical Review</journal><authgrp>{}</authgrp>'
+		'<history><received date="{}-03-01"/></history><pacs>{}</pacs></article>').format(doi, authorXML, year, pacsXML)
+
+
+@pytest.fixture
+def articles():
+	'''Random (doi, year, authors, pacs) articles from 1980 to 1995, some without PACS codes.'''
+	rng = random.Random(0)
+	result = []
+	for i in range(200):
+		authors = rng.sample(NAMES, rng.randint(1, 3))
+		pacs = [rng.choice(PACS_POOL) for j in range(rng.randint(0 if i % 20 == 0 else 1, 3))]
+		result.append(('10.1103/PhysRev.{}'.format(i), rng.randint(1980, 1995), authors, pacs))
+	return result
+
+
+@pytest.fixture
+def xmlFile(articles, tmpdir):
+	path = tmpdir.join('aps.xml')
+	path.write('<?xml version="1.0"?>\n<articles>{}</articles>'.format(''.join(articleXML(*a) for a in articles)))
+	return str(path)
+
+
+@pytest.fixture
+def xmlFrame(xmlFile):
+	'''The articles with authors and PACS codes as xmltodict parses them (the data frame of the old xml2pickle).'''
+	import xmltodict
+	with open(xmlFile, 'rb') as f:
+		df = pd.DataFrame(xmltodict.parse(f, dict_constructor=OrderedDict)['articles']['article'])
+	return df.dropna(subset=['authgrp', 'pacs']).reset_index(drop=True)
+
+
+@pytest.fixture
+def articleFrame(xmlFile, tmpdir):
+	'''The same articles, streamed through parseAPS.xml2parquet and read back with readArticles.'''
+	from ...aps import parseAPS
+	path = str(tmpdir.join('aps.parquet'))
+	parseAPS.xml2parquet(xmlFile, path, batchSize=50)
+	return parseAPS.readArticles(path)
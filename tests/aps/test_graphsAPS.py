@@ -0,0 +1,41 @@
+from ...aps import graphsAPS
+
+
+def windowRecount(yearItems, yearKey, diam):
+	'''The adjacency and node weights of one window, counted again from the rows.'''
+	adjList = {}
+	nodeWeights = {}
+	for [year, items] in yearItems:
+		if yearKey - diam <= year <= yearKey + diam:
+			graphsAPS.addItems(adjList, nodeWeights, items)
+	return adjList, nodeWeights
+
+
+def testSlidingWindowsEqualRecount(xmlFrame):
+	for what in ('authors', 'pacs'):
+		yearItems = graphsAPS.getYearItems(xmlFrame, what=what)
+		for window, startYear, endYear in ((5, 1982, 1993), (1, 1979, 1996), (4, 1985, 1990), (3, 1994, 1999)):
+			resultsDict, nodeWeights = graphsAPS.getDynamicNetwork(xmlFrame, what=what, startYear=startYear,
+				endYear=endYear, window=window)
+			assert sorted(resultsDict) == list(range(startYear, endYear + 1))
+			for yearKey in resultsDict:
+				adjList, weights = windowRecount(yearItems, yearKey, window // 2)
+				assert resultsDict[yearKey] == adjList
+				assert nodeWeights[yearKey] == weights
+
+
+def testRepeatedItemsCountEveryTime():
+	buckets = graphsAPS.getYearBuckets([[1990, ['a', 'b', 'b']], [1990, ['a', 'b']]])
+	edges, leads, nodeWeights = buckets[1990]
+	assert edges == {('a', 'b'): 3}
+	assert leads == {'a': 2}
+	assert nodeWeights == {'a': 2, 'b': 3}
+
+
+def testWorkersEqualSerial(xmlFrame):
+	serial = graphsAPS.makeDynamicGraphs(xmlFrame, startYear=1984, endYear=1990, window=3)
+	parallel = graphsAPS.makeDynamicGraphs(xmlFrame, startYear=1984, endYear=1990, window=3, workers=2)
+	assert sorted(serial) == sorted(parallel)
+	for year in serial:
+		assert sorted(serial[year].nodes(data=True)) == sorted(parallel[year].nodes(data=True))
+		assert set(map(frozenset, serial[year].edges())) == set(map(frozenset, parallel[year].edges()))
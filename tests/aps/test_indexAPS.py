@@ -0,0 +1,85 @@
+import itertools
+
+import pandas as pd
+
+from ...aps import graphsAPS, indexAPS, pacsAPS, parseAPS
+
+
+def rowFilter(df, subsetPACS, subsetYears, pacsLevel):
+	'''The rows APSIndex.rows should select, checked row by row.'''
+	result = []
+	for i, (index, row) in enumerate(df.iterrows()):
+		if subsetYears and parseAPS.getYear(row) not in subsetYears:
+			continue
+		codes = parseAPS.convertPACS(pacsAPS.rowPACS(row), pacsLevel)
+		if subsetPACS and not set(codes) & set(subsetPACS):
+			continue
+		result.append(i)
+	return result
+
+
+def testRowsEqualRowFilter(xmlFrame):
+	index = indexAPS.APSIndex.build(xmlFrame)
+	assert len(index) == len(xmlFrame)
+	pacsSubsets = {1: [None, [4], [0, 9]], 2: [None, [45], [3, 98, 77]], 3: [None, ['45.10.Db', '98.80.Es']]}
+	yearSubsets = [None, [1980], range(1985, 1991), [2020]]
+	for level, subsets in pacsSubsets.items():
+		for subsetPACS, subsetYears in itertools.product(subsets, yearSubsets):
+			rows = index.rows(subsetPACS=subsetPACS, subsetYears=subsetYears, pacsLevel=level)
+			assert rows.tolist() == rowFilter(xmlFrame, subsetPACS, subsetYears, level)
+
+
+def testSaveAndLoad(xmlFrame, tmpdir):
+	index = indexAPS.APSIndex.build(xmlFrame)
+	path = str(tmpdir.join('index.pkl'))
+	index.save(path)
+	loaded = indexAPS.APSIndex.load(path)
+	assert loaded.years.tolist() == index.years.tolist()
+	assert loaded.rows([45], range(1985, 1991)).tolist() == index.rows([45], range(1985, 1991)).tolist()
+
+
+def graphData(G):
+	if G is None:
+		return None
+	return (sorted(G.nodes(data=True)),
+		sorted((tuple(sorted((u, v))), d['weight']) for u, v, d in G.edges(data=True)))
+
+
+def testMakeGraphWithIndex(xmlFrame, articleFrame):
+	for df in (xmlFrame, articleFrame):
+		index = indexAPS.APSIndex.build(df)
+		for subsetPACS, subsetYears in itertools.product([None, [45], [3, 98]], [None, range(1985, 1991)]):
+			for what in (['authors'], ['pacs']):
+				expected = graphsAPS.makeGraph(df, subsetPACS=subsetPACS, subsetYears=subsetYears, what=what)
+				G = graphsAPS.makeGraph(df, subsetPACS=subsetPACS, subsetYears=subsetYears, what=what, index=index)
+				assert graphData(G) == graphData(expected)
+
+
+def testDOIIndexSkipsMissingDOIs(xmlFile, tmpdir):
+	df = parseAPS.readXML(xmlFile, dropIncomplete=False)
+	df.loc[3, 'doi'] = None
+	df.loc[7, 'doi'] = float('nan')
+	df.loc[11, 'doi'] = ''
+	df.loc[20, 'doi'] = df.loc[5, 'doi']  # a duplicate: the last row wins
+	index = indexAPS.DOIIndex.build(df)
+	expected = dict((d, i) for d, i in parseAPS.dois2ilocs(df).items() if not pd.isnull(d) and d)
+	assert len(index) == len(expected)
+	assert index.dois.dtype != object
+	dois = sorted(expected) + ['10.1103/Unknown', None]
+	assert index.lookup(dois).tolist() == [expected[d] for d in sorted(expected)] + [-1, -1]
+	path = str(tmpdir.join('dois.npz'))
+	index.save(path)
+	assert indexAPS.DOIIndex.load(path).lookup(dois).tolist() == index.lookup(dois).tolist()
+	assert len(indexAPS.DOIIndex.build(df.iloc[:0])) == 0
+
+
+def testDOIIndexRowsArePositions(xmlFile):
+	df = parseAPS.readXML(xmlFile, dropIncomplete=False)
+	df.index = ['row{}'.format(i) for i in range(len(df) - 1, -1, -1)]
+	index = indexAPS.DOIIndex.build(df)
+	labels = parseAPS.dois2ilocs(df)
+	dois = df['doi'].tolist()
+	rows = index.lookup(dois)
+	assert rows.tolist() == list(range(len(df)))
+	assert df['doi'].iloc[rows].tolist() == dois
+	assert df.index[rows].tolist() == [labels[d] for d in dois]
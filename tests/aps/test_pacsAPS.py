@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+
+from ...aps import pacsAPS, parseAPS, processAPSXML
+
+
+def baselineConvertPACS(pacsList, pacsLevel=2):
+	'''parseAPS.convertPACS before the codec, with level 1 as the tens digit of level 2
+	(the old convertPACS took the first of the last two characters instead, so 4.1 went to 4).'''
+	if type(pacsList) is not list:
+		pacsList = [pacsList]
+	if pacsLevel in (1, 2):
+		newList = []
+		for p in pacsList:
+			try:
+				value = int(p.split(".")[0][-2:2])
+			except:
+				continue
+			newList.append(value // 10 if pacsLevel == 1 else value)
+		return list(set(newList))
+	return pacsList
+
+
+CODES = ['45.10.Db', '4.1', '', 'xx.1', '03.65.-w', '98.80.Es', '1', '05', '  ', '45', 'a5.3', '45.10.Db']
+
+
+def testConvertEqualsBaseline():
+	rng = random.Random(1)
+	codec = pacsAPS.PACSCodec()
+	for i in range(500):
+		codes = [rng.choice(CODES) for j in range(rng.randint(0, 5))]
+		for level in (1, 2, 3):
+			assert sorted(codec.convert(list(codes), level)) == sorted(baselineConvertPACS(list(codes), level))
+			assert sorted(parseAPS.convertPACS(list(codes), level)) == sorted(baselineConvertPACS(list(codes), level))
+	assert parseAPS.convertPACS('45.10.Db') == [45]
+
+
+def testCodecParsesEachCodeOnce():
+	codec = pacsAPS.PACSCodec()
+	assert codec.encode(['45.10.Db', '03.65.-w', '45.10.Db']) == [0, 1, 0]
+	assert len(codec) == 2
+	assert codec.levels(1).tolist() == [4, 0]
+	assert codec.levels(2).tolist() == [45, 3]
+	codec.add('xx')
+	assert codec.levels(2).tolist() == [45, 3, -1]
+
+
+def testTablePaperCodesAndPostings():
+	rng = random.Random(2)
+	lists = [[rng.choice(CODES) for j in range(rng.randint(1, 4))] for i in range(100)]
+	table = pacsAPS.PACSTable.fromLists(lists, pacsAPS.PACSCodec())
+	for level in (1, 2, 3):
+		postings = table.postings(level)
+		expected = {}
+		for i, codes in enumerate(lists):
+			assert sorted(table.paperCodes(i, level)) == sorted(baselineConvertPACS(codes, level))
+			for c in set(baselineConvertPACS(codes, level)):
+				expected.setdefault(c, []).append(i)
+		assert sorted(postings) == sorted(expected)
+		for c in expected:
+			assert postings[c].tolist() == expected[c]
+			assert postings[c].dtype == np.int32
+
+
+def testLevelOneConvention(xmlFile, xmlFrame):
+	codec = pacsAPS.PACSCodec()
+	assert sorted(codec.convert(['45.10.Db', '45.20.-d', '05.45.Pq', '98.80.Es'], 1)) == [0, 4, 9]
+	assert codec.convert(['4.1'], 1) == [0]
+	assert codec.convert(['4.1'], 2) == [4]
+	for level in (1, 2, 3):
+		G = processAPSXML.pacsXML(xmlFile, pacsLevel=level)
+		expected = {}
+		for index, row in xmlFrame.iterrows():
+			codes = sorted(set(parseAPS.convertPACS(pacsAPS.rowPACS(row), level)), key=str)
+			for x in range(len(codes)):
+				for y in range(x):
+					edge = frozenset((codes[x], codes[y]))
+					expected[edge] = expected.get(edge, 0) + 1
+		assert dict((frozenset((u, v)), d['weight']) for u, v, d in G.edges(data=True)) == expected
@@ -0,0 +1,88 @@
+import pandas as pd
+
+from ...aps import graphsAPS, parseAPS, processAPSXML
+
+
+def graphData(G):
+	return (sorted(G.nodes(data=True)),
+		sorted((tuple(sorted((u, v))), d['weight']) for u, v, d in G.edges(data=True)))
+
+
+def testReadXMLEqualsParquet(articles, xmlFile, articleFrame):
+	df = parseAPS.readXML(xmlFile)
+	assert list(df.columns) == list(articleFrame.columns)
+	assert df['doi'].tolist() == articleFrame['doi'].tolist()
+	assert df['year'].tolist() == articleFrame['year'].tolist()
+	assert df['authors'].tolist() == articleFrame['authors'].tolist()
+	assert df['pacs'].tolist() == articleFrame['pacs'].tolist()
+	assert len(df) == len([a for a in articles if a[3]])
+	assert len(parseAPS.readXML(xmlFile, dropIncomplete=False)) == len(articles)
+
+
+def testAuthorKeysAgree(tmpdir):
+	import xmltodict
+	xml = ('<articles><article doi="10.1103/PhysRev.1"><authgrp>'
+		'<author><givenname>Hua</givenname><middlename>Li</middlename><middlename>Ming</middlename>'
+		'<surname>Zhang</surname></author>'
+		'<author><givenname>John</givenname><middlename>Quincy</middlename><surname>Adams</surname>'
+		'<suffix>Jr.</suffix></author>'
+		'<author><surname>Curie</surname></author></authgrp>'
+		'<history><received date="1990-03-01"/></history><pacs><pacscode>45.10.Db</pacscode></pacs>'
+		'</article></articles>')
+	path = tmpdir.join('one.xml')
+	path.write(xml)
+	expected = [('Hua', ('Li', 'Ming'), 'Zhang', '-'), ('John', 'Quincy', 'Adams', 'Jr.'), ('-', '-', 'Curie', '-')]
+	initials = [('H', 'L', 'Zhang', '-'), ('J', 'Q', 'Adams', 'Jr.'), ('-', '-', 'Curie', '-')]
+
+	authgrp = xmltodict.parse(xml)['articles']['article']['authgrp']
+	assert parseAPS.processAuthors(authgrp) == expected
+	assert parseAPS.processAuthors(authgrp, authorInitialsOnly=True) == initials
+	assert processAPSXML.processAuthors(authgrp) == expected
+	xmlFrame = pd.DataFrame([xmltodict.parse(xml)['articles']['article']])
+	parquet = str(tmpdir.join('one.parquet'))
+	parseAPS.xml2parquet(str(path), parquet)
+	for df in (xmlFrame, parseAPS.readXML(str(path)), parseAPS.readArticles(parquet)):
+		row = df.iloc[0]
+		assert parseAPS.rowAuthors(row) == expected
+		assert parseAPS.rowAuthors(row, authorInitialsOnly=True) == initials
+		parseAPS.normalizeAuthors(df)
+		assert df['authorList'].tolist() == [expected]
+		assert df['authorListInitials'].tolist() == [initials]
+
+
+def testGetYear(xmlFrame, articleFrame):
+	xmlYears = [parseAPS.getYear(row) for index, row in xmlFrame.iterrows()]
+	assert [parseAPS.getYear(row) for index, row in articleFrame.iterrows()] == xmlYears
+
+
+def testDynamicGraphsOnArticleFrame(xmlFrame, articleFrame):
+	for what in ('authors', 'pacs'):
+		expected = graphsAPS.makeDynamicGraphs(xmlFrame, what=what, startYear=1982, endYear=1993, window=5)
+		graphs = graphsAPS.makeDynamicGraphs(articleFrame, what=what, startYear=1982, endYear=1993, window=5)
+		assert sorted(graphs) == sorted(expected)
+		for year in graphs:
+			assert graphData(graphs[year]) == graphData(expected[year])
+
+
+def testMakeGraphSubsetYearsOnArticleFrame(xmlFrame, articleFrame):
+	years = range(1985, 1990)
+	G = graphsAPS.makeGraph(articleFrame, what=['pacs'], subsetYears=years)
+	assert graphData(G) == graphData(graphsAPS.makeGraph(xmlFrame, what=['pacs'], subsetYears=years))
+	G = graphsAPS.makeGraph(articleFrame, subsetYears=years)
+	assert graphData(G) == graphData(graphsAPS.makeGraph(xmlFrame, subsetYears=years))
+
+
+def testProcessAPSXMLReaders(articles, xmlFile):
+	withPACS = [a for a in articles if a[3]]
+	G = processAPSXML.pacsXML(xmlFile)
+	assert set(G.nodes()) >= set(c for a in withPACS for c in parseAPS.convertPACS(a[3]) if len(set(parseAPS.convertPACS(a[3]))) > 1)
+	G = processAPSXML.authors2Subjects(xmlFile)
+	assert set(a[2] for a in G.nodes() if type(a) is tuple) == set(s for a in withPACS for g, m, s in a[2])
+	graphs = processAPSXML.coAuthorsXML(xmlFile, pacsCodes=[-1, 45], years=range(1985, 1990))
+	papers = dict((a[2], 0) for a in withPACS for a in a[2])
+	for doi, year, authors, pacs in withPACS:
+		if 1985 <= year < 1990:
+			for g, m, s in authors:
+				papers[s] += 1
+	weights = dict((au[2], d['numPapers']) for au, d in graphs[0].nodes(data=True))
+	assert weights == dict((s, n) for s, n in papers.items() if n)
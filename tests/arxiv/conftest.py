@@ -0,0 +1,64 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ...arxiv import arxiv
+
+# id, keyname, forenames, categories, doi
+PAPERS = [
+    ('hep-th/9901001', 'Smith|Jones|Brown', 'John A.|Mary|Bob',
+     'hep-th|math.AG', '10.1/1'),
+    ('hep-th/9905002', 'Smith|Jones|Brown', 'John Andrew|Mary|Bob',
+     'hep-th', '10.1/2'),
+    ('hep-th/0003003', 'Smith|Lee', 'John|Ann', 'hep-th', None),
+    ('cond-mat/0104004', 'Smith|Cooper', 'Jane|Alice', 'cond-mat', '10.1/4'),
+    ('cond-mat/0206005', 'Smith|Cooper', 'J.|Alice',
+     'cond-mat|cond-mat.str-el', None),
+    ('0704.0006', 'Wang|Li|Zhang', 'Wei|Ming|Hua', 'astro-ph', '10.1/6'),
+    ('0801.0007', 'Wang|Li', 'W.|Ming', 'astro-ph.CO', '10.1/7'),
+    # An author listed twice
+    ('0905.0008', 'Wang|Zhang|Wang', 'Wen|Hua L.|Wen', 'astro-ph|gr-qc',
+     '10.1/8'),
+    ('1002.0009', 'Zhang|Doe', 'Hua Li|John', 'astro-ph', None),
+    ('1103.0010', 'Doe', 'Jane', 'math.AG', '10.1/10'),
+    # No authors
+    ('1201.0011', None, None, 'math.AG', None),
+    # Fewer forenames than surnames, and a comma in a forename
+    ('1302.0012', 'van der Berg|Li|Kim', 'Jan-Willem, Jr.|Ming',
+     'hep-ph|hep-th', '10.1/12'),
+]
+
+METRICS = ['till_published', '2013 IPP', '2013 SJR', '2013 SNIP',
+           'Publication IPP', 'Publication SJR', 'Publication SNIP']
+
+
+def make_papers(papers=PAPERS):
+    """A small cleaned arXiv dataframe, as from ``read_all_arxiv_files``"""
+    df = pd.DataFrame([p[1:] for p in papers],
+                      columns=['keyname', 'forenames', 'categories', 'doi'],
+                      index=pd.Index([p[0] for p in papers], name='id'))
+    for i, m in enumerate(METRICS):
+        values = np.arange(len(df), dtype=float) * (i + 1) / 2
+        values[(np.arange(len(df)) + i) % 4 == 0] = np.nan
+        df[m] = values
+    df['year'] = arxiv.year_array(df.index)
+    return df
+
+
+@pytest.fixture
+def papers():
+    return make_papers()
+
+
+@pytest.fixture
+def csv_files(papers, tmpdir):
+    """``papers`` split into two cleaned files, as the scraper writes them"""
+    data = papers.drop('year', axis=1)
+    for name, part in [('s-1.csv', data.iloc[:6]),
+                       ('s-2.csv', data.iloc[6:])]:
+        part.to_csv(str(tmpdir.join(name)), encoding='utf-8')
+    return str(tmpdir.join('s-*.csv'))
@@ -0,0 +1,142 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import glob
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ...arxiv import arxiv
+from .conftest import METRICS
+
+
+def _add_paper(author_counter, author, item):
+    author_counter.setdefault(author, {})
+    author_counter[author][item] = author_counter[author].get(item, 0) + 1
+
+
+def baseline_author_data(df):
+    """The row loops of the old get_author_series, get_author_year_data,
+    get_author_metadata and get_all_authors"""
+    counts = {}
+    years = {}
+    cats = {}
+    coauthors = {}
+    for index, row in df.iterrows():
+        authors = arxiv.get_authors(row)
+        if authors:
+            for a in authors:
+                counts[a] = counts.get(a, 0) + 1
+                _add_paper(years, a, row['year'])
+                for f in row['categories'].split('|'):
+                    _add_paper(cats, a, f)
+                coauthors.setdefault(a, set()).update(authors)
+    return counts, years, cats, coauthors
+
+
+def test_author_table_equals_get_authors(papers):
+    for kwargs in [{}, {'unify_names': True},
+                   {'unify_names': True, 'initials_only': True}]:
+        table = arxiv.get_author_table(papers, **kwargs)
+        assert table['id'].tolist() == papers.index[table['paper']].tolist()
+        assert table['year'].tolist() == papers['year'].values[
+            table['paper']].tolist()
+        rows = {}
+        for paper, author in zip(table['paper'], table['author']):
+            rows.setdefault(paper, []).append(author)
+        for i, (index, row) in enumerate(papers.iterrows()):
+            authors = arxiv.get_authors(row, **kwargs)
+            assert rows.get(i) == authors
+
+
+def test_author_table_subset_categories(papers):
+    table = arxiv.get_author_table(papers, subset_categories=['math.AG'])
+    expected = [a for index, row in papers.iterrows()
+                if 'math.AG' in row['categories'].split('|')
+                for a in (arxiv.get_authors(row) or [])]
+    assert table['author'].tolist() == expected
+
+
+def test_category_table_equals_get_categories(papers):
+    for kwargs in [{}, {'toplevel': True},
+                   {'subset_categories': ['hep-th', 'astro-ph']}]:
+        table = arxiv.get_category_table(papers, **kwargs)
+        rows = {}
+        for paper, cat in zip(table['paper'], table['category']):
+            rows.setdefault(paper, []).append(cat)
+        for i, (index, row) in enumerate(papers.iterrows()):
+            assert rows.get(i, []) == arxiv.get_categories(row, **kwargs)
+
+
+def test_author_functions_equal_row_loops(papers):
+    counts, years, cats, coauthors = baseline_author_data(papers)
+    series = arxiv.get_author_series(papers)
+    assert series.to_dict() == counts
+    assert list(series.index) == sorted(counts)
+    assert arxiv.get_author_year_data(papers) == years
+    assert arxiv.get_all_authors(papers) == set(counts)
+    md = arxiv.get_author_metadata(papers)
+    assert md['count'].to_dict() == counts
+    assert md['categories'].to_dict() == cats
+    assert md['coauthors'].to_dict() == coauthors
+
+
+def test_read_all_arxiv_files_cache(papers, csv_files, tmpdir):
+    cache_dir = str(tmpdir.mkdir('cache'))
+    plain = arxiv.read_all_arxiv_files(csv_files)
+    assert (plain.loc[papers.index, 'year'].tolist() ==
+            papers['year'].tolist())
+
+    cold = arxiv.read_all_arxiv_files(csv_files, cache_dir=cache_dir)
+    assert len(glob.glob(os.path.join(cache_dir, '*'))) == 1
+    warm = arxiv.read_all_arxiv_files(csv_files, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(cold, warm)
+    # Same values; missing strings are NaN in one and NA in the other
+    pd.testing.assert_frame_equal(
+        plain.astype(object).where(plain.notnull(), None),
+        warm.astype(object).where(warm.notnull(), None),
+        check_index_type=False)
+    assert (arxiv.get_author_table(warm).values.tolist() ==
+            arxiv.get_author_table(plain).values.tolist())
+
+    # Touching a file invalidates the snapshot, the old one is removed
+    first = glob.glob(csv_files)[0]
+    os.utime(first, (0, 0))
+    arxiv.read_all_arxiv_files(csv_files, cache_dir=cache_dir)
+    snapshots = glob.glob(os.path.join(cache_dir, '*'))
+    assert snapshots == [arxiv.snapshot_path(glob.glob(csv_files), cache_dir)]
+
+
+def baseline_extended_info(df, initials_only=False):
+    """The row loop of the old get_author_series(extended_info=True)"""
+    published = {}
+    values = dict((m, {}) for m in METRICS)
+    for index, row in df.iterrows():
+        authors = arxiv.get_authors(row, initials_only=initials_only)
+        if authors:
+            for a in authors:
+                if not pd.isnull(row['doi']):
+                    published[a] = published.get(a, 0) + 1
+                for m in METRICS:
+                    values[m].setdefault(a, []).append(row[m])
+    result = pd.DataFrame({'total': arxiv.get_author_series(
+        df, initials_only=initials_only)})
+    result['published'] = pd.Series(published)
+    result['published'] = result['published'].fillna(0)
+    for m in METRICS:
+        result[m] = pd.Series(values[m]).map(np.nanmean)
+    return result
+
+
+def test_extended_author_series_equals_row_loop(papers):
+    for initials_only in [False, True]:
+        with np.errstate(all='ignore'), warnings.catch_warnings():
+            # np.nanmean warns about authors with only NaN values
+            warnings.simplefilter('ignore', RuntimeWarning)
+            expected = baseline_extended_info(papers, initials_only)
+        result = arxiv.get_author_series(papers, initials_only=initials_only,
+                                         extended_info=True)
+        pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,34 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pandas as pd
+import pytest
+
+from ...arxiv import arxiv
+from ...arxiv import benchmark
+
+
+def test_check_loaders(csv_files):
+    benchmark.check_loaders(csv_files, workers=1)
+    benchmark.check_loaders(csv_files, columns=['keyname', 'categories'],
+                            workers=2)
+
+
+def test_check_loaders_fails_on_different_data(csv_files, monkeypatch):
+    read = arxiv.read_all_arxiv_files
+
+    def read_and_change(glob_pattern):
+        df = read(glob_pattern)
+        df.iloc[0, df.columns.get_loc('keyname')] = 'Other'
+        return df
+
+    monkeypatch.setattr(arxiv, 'read_all_arxiv_files', read_and_change)
+    with pytest.raises(AssertionError):
+        benchmark.check_loaders(csv_files, workers=1)
+
+
+def test_compare_loaders(csv_files):
+    results = benchmark.compare_loaders(csv_files, workers=1)
+    assert isinstance(results, pd.DataFrame)
+    assert results['rows'].tolist() == [12, 12]
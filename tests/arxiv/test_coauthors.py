@@ -0,0 +1,41 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pytest
+
+from ...arxiv import arxiv
+from ...arxiv import coauthors
+
+
+def test_compact_coauthors_equal_sets(papers):
+    md = arxiv.get_author_metadata(papers)
+    compact = arxiv.get_author_metadata(papers, compact_coauthors=True)
+    assert list(compact.index) == list(md.index)
+    for a, expected in md['coauthors'].items():
+        view = compact.loc[a, 'coauthors']
+        assert isinstance(view, coauthors.CoauthorSet)
+        assert view == expected
+        assert set(view) == expected
+        assert len(view) == len(expected)
+        for b in md.index:
+            assert (b in view) == (b in expected)
+            other = md.loc[b, 'coauthors']
+            assert view & compact.loc[b, 'coauthors'] == expected & other
+        assert 'Nobody, N.' not in view
+
+
+def test_key_sets(papers):
+    table = arxiv.get_author_table(papers)
+    index = coauthors.CoauthorIndex.from_table(table)
+    for a in index.authors:
+        names = index.coauthors(a)
+        keys = set(arxiv.get_name_with_initials_only(n) for n in names)
+        # Equal key ids for equal keys, different ids otherwise
+        ids = dict((arxiv.get_name_with_initials_only(n),
+                    index.keys[index.id(n)]) for n in names)
+        assert set(ids) == keys
+        assert len(set(ids.values())) == len(ids)
+        assert names.key_set() == set(ids.values())
+    with pytest.raises(KeyError):
+        index.id('Nobody, N.')
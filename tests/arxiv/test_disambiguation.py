@@ -0,0 +1,144 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+import pandas as pd
+
+from ...arxiv import arxiv
+from ...arxiv import benchmark
+from ...arxiv import disambiguation
+
+
+def _papers(extra=()):
+    rows = [
+        ('Smith|Jones|Brown', 'John A.|Mary|Bob', 'hep-th|math.AG'),
+        ('Smith|Jones|Brown', 'John Andrew|Mary|Bob', 'hep-th'),
+        ('Smith|Lee', 'John|Ann', 'hep-th'),
+        ('Smith|Cooper', 'Jane|Alice', 'cond-mat'),
+        ('Smith|Cooper', 'J.|Alice', 'cond-mat'),
+        ('Wang|Li|Zhang', 'Wei|Ming|Hua', 'astro-ph'),
+        ('Wang|Li', 'W.|Ming', 'astro-ph'),
+        ('Wang|Zhang', 'Wen|Hua L.', 'astro-ph|gr-qc'),
+        ('Zhang|Doe', 'Hua Li|John', 'astro-ph'),
+        ('Doe', 'Jane', 'math.AG'),
+    ] + list(extra)
+    return pd.DataFrame(rows, columns=['keyname', 'forenames', 'categories'],
+                        index=['p{}'.format(i) for i in range(len(rows))])
+
+
+def _author_md(df):
+    return arxiv.get_author_metadata(df).sort_index()
+
+
+def _process_all_matches(author_md, id_generator):
+    """The old pipeline: get_name_matches, then process_match on each"""
+    for match in arxiv.get_name_matches(author_md, id_generator):
+        arxiv.process_match(match, author_md, id_generator=id_generator)
+    return author_md
+
+
+def test_disambiguate_equals_process_match(papers):
+    extra = [('Smith|Lee', 'J.|Ann', 'hep-th'),
+             ('Smith|Lee|Cooper', 'Jo|Ann|Alice', 'hep-th|cond-mat')]
+    for df in [_papers(), _papers(extra), papers]:
+        for compact in [False, True]:
+            md = arxiv.get_author_metadata(
+                df, compact_coauthors=compact).sort_index()
+            expected = _process_all_matches(md.copy(),
+                                            arxiv.uuid_generator(0))
+            result = disambiguation.disambiguate(
+                md.copy(), workers=1, id_generator=arxiv.uuid_generator(0))
+            assert result['uuid'].tolist() == expected['uuid'].tolist()
+            flags = expected.get('flag', pd.Series(np.nan, md.index))
+            np.testing.assert_array_equal(result['flag'].values,
+                                          flags.values.astype(float))
+
+
+def test_incremental_first_run_equals_full_run():
+    md = _author_md(_papers())
+    full = disambiguation.disambiguate(
+        md.copy(), workers=1, id_generator=arxiv.uuid_generator(0))
+    incremental, state = disambiguation.disambiguate_incremental(
+        md.copy(), workers=1, id_generator=arxiv.uuid_generator(0))
+    assert full['uuid'].tolist() == incremental['uuid'].tolist()
+    np.testing.assert_array_equal(full['flag'].values,
+                                  incremental['flag'].values)
+    assert set(state.uuids) == set(md.index)
+    # Matched on coauthors and on categories
+    assert (full.loc['Smith, John A.', 'uuid']
+            == full.loc['Smith, John Andrew', 'uuid'])
+    assert full.loc['Zhang, Hua L.', 'uuid'] == full.loc['Zhang, Hua Li', 'uuid']
+
+
+def test_incremental_rerun_keeps_uuids():
+    md = _author_md(_papers())
+    first, state = disambiguation.disambiguate_incremental(
+        md.copy(), workers=1, id_generator=arxiv.uuid_generator(0))
+    second, _ = disambiguation.disambiguate_incremental(
+        md.copy(), state, workers=1, id_generator=arxiv.uuid_generator(1))
+    assert first['uuid'].tolist() == second['uuid'].tolist()
+
+
+def test_incremental_update_equals_full_clustering():
+    md = _author_md(_papers())
+    first, state = disambiguation.disambiguate_incremental(
+        md.copy(), workers=1, id_generator=arxiv.uuid_generator(0))
+
+    new = _author_md(_papers([('Smith|Lee', 'J.|Ann', 'hep-th')]))
+    updated, _ = disambiguation.disambiguate_incremental(
+        new.copy(), state, workers=1, id_generator=arxiv.uuid_generator(1))
+    full = disambiguation.disambiguate(
+        new.copy(), workers=1, id_generator=arxiv.uuid_generator(2))
+
+    precision, recall = disambiguation.pair_precision_recall(
+        full['uuid'].values, updated['uuid'].values)
+    assert (precision, recall) == (1.0, 1.0)
+    # The new paper only touches the "Smith, J" and "Lee, A" blocks
+    for name in ['Wang, Wei', 'Wang, W.', 'Cooper, Alice', 'Doe, Jane']:
+        assert updated.loc[name, 'uuid'] == first.loc[name, 'uuid']
+
+
+def _all_pairs_candidates(start, matches, buckets, assigned):
+    """Candidates found by checking every later row against the cluster"""
+    for j in range(start + 1, len(buckets)):
+        if not assigned[j] and any(not buckets[m].isdisjoint(buckets[j])
+                                   for m in matches):
+            yield j
+
+
+def test_lsh_candidates_equal_all_pairs():
+    rng = np.random.RandomState(0)
+    buckets = [set(rng.choice(12, rng.randint(3), replace=False).tolist())
+               for i in range(40)]
+    index = disambiguation.bucket_index(buckets)
+    assert sorted(index) == sorted(set().union(*buckets))
+    for start in range(0, 40, 3):
+        assigned = (rng.rand(40) < 0.2).tolist()
+        assigned[start] = False
+        found = []
+        for candidates in [_all_pairs_candidates, disambiguation._lsh_candidates]:
+            matches = [start]
+            args = (start, matches, buckets, index, assigned)
+            if candidates is _all_pairs_candidates:
+                args = (start, matches, buckets, assigned)
+            visited = []
+            for j in candidates(*args):
+                visited.append(j)
+                # The cluster grows while iterating
+                if j % 2:
+                    matches.append(j)
+            found.append(visited)
+        assert found[0] == found[1]
+
+
+def test_minhash_on_synthetic_corpus():
+    df = benchmark.synthetic_papers(n_papers=2000, n_people=200, seed=0)
+    assert df.equals(benchmark.synthetic_papers(2000, 200, seed=0))
+    md = _author_md(df)
+    result = benchmark.compare_disambiguation(md, workers=1)
+    assert result['precision'] >= 0.95
+    assert result['recall'] >= 0.95
+    exact = disambiguation.disambiguate(md.copy(), workers=2,
+                                        id_generator=arxiv.uuid_generator(0))
+    assert exact['uuid'].nunique() < len(md)
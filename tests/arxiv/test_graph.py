@@ -0,0 +1,267 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import itertools
+
+import numpy as np
+import pytest
+
+from ...arxiv import arxiv
+from ...arxiv import graph
+from ...vocabulary import Vocabulary
+from .conftest import PAPERS, make_papers
+
+
+def _items(row, what, initials_only=False, subset_categories=None):
+    if what == 'categories':
+        return arxiv.get_categories(row, subset_categories)
+    # get_authors fails with subset_categories (``authors`` is never set
+    # for papers in the subset), so filter the papers here
+    if subset_categories and not arxiv.get_categories(row,
+                                                      subset_categories):
+        return None
+    return arxiv.get_authors(row, initials_only)
+
+
+def baseline_adjacency(df, what='authors', initials_only=False,
+                       subset_categories=None):
+    """The row loop of the old get_adjacency_and_weights"""
+    result = {}
+    weights = {}
+    for index, row in df.iterrows():
+        items = _items(row, what, initials_only, subset_categories)
+        if items:
+            for i in items:
+                weights[i] = weights.get(i, 0) + 1
+            lead = items[0]
+            result.setdefault(lead, {})
+            for follow in items[1:]:
+                result[lead].setdefault(follow, {'weight': 0})
+                result[lead][follow]['weight'] += 1
+    return (result, weights)
+
+
+def _dense(adjacency, labels):
+    """{(label, label): weight} of the non-zero entries of a matrix"""
+    coo = adjacency.tocoo()
+    return dict(((labels[i], labels[j]), w)
+                for i, j, w in zip(coo.row, coo.col, coo.data.tolist()))
+
+
+OPTIONS = [('authors', {}),
+           ('authors', {'author_initials_only': True}),
+           ('authors', {'subset_categories': ['hep-th', 'astro-ph']}),
+           ('categories', {}),
+           ('categories', {'subset_categories': ['hep-th', 'math.AG']})]
+
+
+def _baseline_kwargs(kwargs):
+    return {'initials_only': kwargs.get('author_initials_only', False),
+            'subset_categories': kwargs.get('subset_categories')}
+
+
+def test_adjacency_equals_row_loop(papers):
+    for what, kwargs in OPTIONS:
+        expected = baseline_adjacency(papers, what,
+                                      **_baseline_kwargs(kwargs))
+        assert graph.get_adjacency_and_weights(papers, what,
+                                               **kwargs) == expected
+
+
+def test_adjacency_with_vocabulary(papers):
+    vocabulary = Vocabulary()
+    adjacency, weights = graph.get_adjacency_and_weights(
+        papers, vocabulary=vocabulary)
+    expected_adjacency, expected_weights = baseline_adjacency(papers)
+    decode = lambda i: vocabulary.decode([i])[0]
+    assert dict((decode(i), w) for i, w in weights.items()) == \
+        expected_weights
+    assert dict((decode(i), dict((decode(j), d) for j, d in a.items()))
+                for i, a in adjacency.items()) == expected_adjacency
+
+
+def test_star_matrix_sums_both_directions():
+    # Jones leads Smith here, Smith leads Jones in the first paper
+    papers = make_papers(PAPERS + [('1304.0013', 'Jones|Smith',
+                                    'Mary|John A.', 'math.AG|hep-th',
+                                    None)])
+    adjacency, weights, labels = graph.cooccurrence_matrix(papers)
+    assert _dense(adjacency, labels)[('Jones, Mary', 'Smith, John A.')] == 2
+    for what, kwargs in OPTIONS:
+        adjacency, weights, labels = graph.cooccurrence_matrix(
+            papers, what, **kwargs)
+        expected_adjacency, expected_weights = baseline_adjacency(
+            papers, what, **_baseline_kwargs(kwargs))
+        assert (adjacency != adjacency.T).nnz == 0
+        assert dict((l, w) for l, w in zip(labels, weights.tolist())
+                    if w) == expected_weights
+        # A pair linked in both directions (u leads v and v leads u)
+        # gets the sum of both, unlike from_dict_of_dicts
+        expected = {}
+        for u, a in expected_adjacency.items():
+            for v, d in a.items():
+                expected[(u, v)] = expected.get((u, v), 0) + d['weight']
+                if u != v:
+                    expected[(v, u)] = expected.get((v, u), 0) + d['weight']
+        assert _dense(adjacency, labels) == expected
+
+
+def _clique_counts(df, what, fractional=False):
+    expected = {}
+    for index, row in df.iterrows():
+        items = _items(row, what)
+        if not items:
+            continue
+        items = sorted(set(items))
+        for u, v in itertools.permutations(items, 2):
+            w = 1 / (len(items) - 1) if fractional else 1
+            expected[(u, v)] = expected.get((u, v), 0) + w
+    return expected
+
+
+def test_clique_matrix(papers):
+    for what in ['authors', 'categories']:
+        adjacency, weights, labels = graph.cooccurrence_matrix(
+            papers, what, how='clique')
+        assert _dense(adjacency, labels) == _clique_counts(papers, what)
+
+        adjacency, weights, labels = graph.cooccurrence_matrix(
+            papers, what, how='clique', fractional=True)
+        result = _dense(adjacency, labels)
+        expected = _clique_counts(papers, what, fractional=True)
+        assert sorted(result) == sorted(expected)
+        for k in expected:
+            assert result[k] == pytest.approx(expected[k])
+
+
+def test_cooccurrence_graph(papers):
+    adjacency, weights, labels = graph.cooccurrence_matrix(papers,
+                                                           how='clique')
+    G = graph.cooccurrence_graph(adjacency, weights, labels)
+    expected_adjacency, expected_weights = baseline_adjacency(papers)
+    assert dict(G.nodes(data='weight')) == expected_weights
+    expected = _clique_counts(papers, 'authors')
+    assert G.number_of_edges() == len(expected) // 2
+    for u, v, w in G.edges(data='weight'):
+        assert w == expected[(u, v)]
+
+
+def test_unknown_options(papers):
+    with pytest.raises(ValueError):
+        graph.cooccurrence_matrix(papers, what='papers')
+    with pytest.raises(ValueError):
+        graph.cooccurrence_matrix(papers, how='ring')
+    with pytest.raises(ValueError):
+        graph.cooccurrence_matrix(papers, fractional=True)
+
+
+def _window(df, start, window):
+    return df[(df['year'] >= start) & (df['year'] < start + window)]
+
+
+def _nonzero_weights(weights, labels):
+    return dict((l, w) for l, w in zip(labels, weights.tolist()) if w)
+
+
+def test_windows_equal_matrix_per_window(papers):
+    for how, fractional in [('star', False), ('clique', False),
+                            ('clique', True)]:
+        for what in ['authors', 'categories']:
+            windows, labels = graph.cooccurrence_windows(
+                papers, (1997, 2014), window=4, what=what, how=how,
+                fractional=fractional)
+            assert sorted(windows) == list(range(1997, 2011))
+            for start, (adjacency, weights) in windows.items():
+                expected = graph.cooccurrence_matrix(
+                    _window(papers, start, 4), what, how=how,
+                    fractional=fractional)
+                assert (_nonzero_weights(weights, labels) ==
+                        _nonzero_weights(expected[1], expected[2]))
+                result = _dense(adjacency, labels)
+                expected = _dense(expected[0], expected[2])
+                assert sorted(result) == sorted(expected)
+                for k in expected:
+                    assert result[k] == pytest.approx(expected[k])
+
+
+def test_windows_shorter_than_range(papers):
+    windows, labels = graph.cooccurrence_windows(papers, (2000, 2003),
+                                                 window=5)
+    assert windows == {}
+
+
+def _graph_data(G):
+    return (dict(G.nodes(data='weight')),
+            dict((frozenset((u, v)), w) for u, v, w in G.edges(data='weight')))
+
+
+def test_sliding_graphs(papers):
+    graphs = graph.create_graphs(papers, year_range=(1997, 2014), window=4,
+                                 sliding=True)
+    assert sorted(graphs) == list(range(1997, 2011))
+    for start, G in graphs.items():
+        expected = graph.cooccurrence_graph(*graph.cooccurrence_matrix(
+            _window(papers, start, 4)))
+        assert _graph_data(G) == _graph_data(expected)
+
+
+def test_workers_equal_serial(papers):
+    for compact in [False, True]:
+        serial = graph.create_graphs(papers, year_range=(1997, 2014),
+                                     window=4, compact=compact)
+        parallel = graph.create_graphs(papers, year_range=(1997, 2014),
+                                       window=4, workers=2, compact=compact)
+        assert sorted(serial) == sorted(parallel) == list(range(1997, 2011))
+        for start in serial:
+            G = serial[start]
+            H = parallel[start]
+            if compact:
+                G = G.to_networkx()
+                H = H.to_networkx()
+            assert _graph_data(G) == _graph_data(H)
+
+
+def test_create_graph_node_weights(papers):
+    G = graph.create_graphs(papers)
+    adjacency, weights = baseline_adjacency(papers)
+    assert dict(G.nodes(data='weight')) == weights
+
+
+def test_sliding_with_workers(papers):
+    with pytest.raises(ValueError):
+        graph.create_graphs(papers, year_range=(1997, 2014), sliding=True,
+                            workers=2)
+
+
+def test_stream_equals_matrix(csv_files):
+    df = arxiv.read_all_arxiv_files(csv_files)
+    for what, how, fractional in [('authors', 'star', False),
+                                  ('authors', 'clique', True),
+                                  ('categories', 'clique', False)]:
+        expected = graph.cooccurrence_matrix(df, what, how=how,
+                                             fractional=fractional)
+        for chunksize in [2, 100]:
+            adjacency, weights, labels = graph.stream_cooccurrence(
+                csv_files, what, how=how, fractional=fractional,
+                chunksize=chunksize)
+            assert (_nonzero_weights(weights, labels) ==
+                    _nonzero_weights(expected[1], expected[2]))
+            result = _dense(adjacency, labels)
+            assert sorted(result) == sorted(_dense(expected[0], expected[2]))
+            for k, w in _dense(expected[0], expected[2]).items():
+                assert result[k] == pytest.approx(w)
+
+
+def test_stream_years_and_vocabulary(csv_files):
+    df = arxiv.read_all_arxiv_files(csv_files)
+    vocabulary = Vocabulary()
+    adjacency, weights, labels = graph.stream_cooccurrence(
+        csv_files, vocabulary=vocabulary, years=(2000, 2009), chunksize=3)
+    assert labels.tolist() == list(range(len(vocabulary)))
+    expected = graph.cooccurrence_matrix(
+        df[(df['year'] >= 2000) & (df['year'] <= 2009)])
+    names = vocabulary.label_array()
+    assert (_nonzero_weights(weights, names) ==
+            _nonzero_weights(expected[1], expected[2]))
+    assert _dense(adjacency, names) == _dense(expected[0], expected[2])
@@ -0,0 +1,127 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from ...arxiv import arxiv
+from ...arxiv import graph
+from ...arxiv import matrices
+from .test_arxiv import baseline_author_data
+
+
+def test_author_year_matrix_equals_year_data(papers):
+    counts, years, cats, coauthors = baseline_author_data(papers)
+    m = matrices.author_year_matrix(papers)
+    assert m.to_dict() == years
+    assert arxiv.get_author_year_data(papers, sparse=True).to_dict() == years
+    assert list(m.rows) == sorted(years)
+    per_year = {}
+    for a, d in years.items():
+        for y, c in d.items():
+            per_year[y] = per_year.get(y, 0) + c
+    assert list(m.columns) == sorted(per_year)
+    assert m.totals().to_dict() == counts
+    assert m.totals(axis=0).to_dict() == per_year
+
+def test_author_category_matrix_equals_metadata(papers):
+    counts, years, cats, coauthors = baseline_author_data(papers)
+    assert matrices.author_category_matrix(papers).to_dict() == cats
+
+
+def test_count_matrix_slicing(papers):
+    counts, years, cats, coauthors = baseline_author_data(papers)
+    m = matrices.author_year_matrix(papers)
+
+    def expected(keep_year, keep_author=lambda a: True):
+        result = {}
+        for a, d in years.items():
+            d = dict((y, c) for y, c in d.items() if keep_year(y))
+            if d and keep_author(a):
+                result[a] = d
+        return result
+
+    between = m.columns_between(2000, 2009)
+    assert list(between.columns) == [2000, 2001, 2002, 2007, 2008, 2009]
+    assert between.to_dict() == expected(lambda y: 2000 <= y <= 2009)
+    assert between.shape[0] == m.shape[0]
+    assert between.drop_empty_rows().shape[0] == len(between.to_dict())
+    assert (m.select_columns([1999, 2013]).to_dict() ==
+            expected(lambda y: y in (1999, 2013)))
+    assert (m.select_rows(['Smith, J.', 'Doe, J.']).to_dict() ==
+            expected(lambda y: True, lambda a: a in ('Smith, J.', 'Doe, J.')))
+
+    span = m.span()
+    for a, d in years.items():
+        assert span.loc[a].tolist() == [min(d), max(d)]
+    assert (m.to_frame().sparse.to_dense().values ==
+            m.matrix.toarray()).all()
+    assert np.issubdtype(m.matrix.dtype, np.integer)
+
+
+def baseline_bipartite(df, subset_categories=None, toplevel=False):
+    """The row loop of the old get_adjacency_and_weights_bipartite, with
+    the category weights of every author added (not only the last)"""
+    result = {}
+    weights = {}
+    for index, row in df.iterrows():
+        cats = arxiv.get_categories(row, subset_categories, toplevel)
+        if subset_categories and not cats:
+            continue
+        auths = arxiv.get_authors(row)
+        if auths and cats:
+            for a in auths:
+                weights[a] = weights.get(a, 0) + 1
+            for c in cats:
+                weights[c] = weights.get(c, 0) + 1
+            for a in auths:
+                result.setdefault(a, {})
+                for c in cats:
+                    result[a].setdefault(c, {'weight': 0})
+                    result[a][c]['weight'] += 1
+    return (result, weights, sorted(result))
+
+
+def test_bipartite_equals_row_loop(papers):
+    for kwargs in [{}, {'toplevel': True},
+                   {'subset_categories': ['hep-th', 'astro-ph']}]:
+        expected = baseline_bipartite(papers, **kwargs)
+        assert graph.get_adjacency_and_weights_bipartite(
+            papers, **kwargs) == expected
+        m, author_weights, cat_weights = matrices.bipartite_matrix(
+            papers, **kwargs)
+        assert m.to_dict() == dict(
+            (a, dict((c, d['weight']) for c, d in cats.items()))
+            for a, cats in expected[0].items())
+        weights = dict(zip(m.rows, author_weights.tolist()))
+        weights.update(zip(m.columns, cat_weights.tolist()))
+        assert dict((k, w) for k, w in weights.items() if w) == expected[1]
+
+
+def test_aggregate_columns(papers):
+    m = matrices.author_category_matrix(papers)
+    top = m.aggregate_columns([c.split('.')[0] for c in m.columns])
+    assert top.to_dict() == matrices.author_category_matrix(
+        papers, toplevel=True).to_dict()
+
+
+def _brute_projection(matrix, binary):
+    dense = matrix.toarray()
+    if binary:
+        dense = (dense > 0).astype(int)
+    product = dense.dot(dense.T)
+    np.fill_diagonal(product, 0)
+    return product
+
+
+def test_projections(papers):
+    m = matrices.author_category_matrix(papers)
+    for binary in [False, True]:
+        rows = m.row_projection(binary)
+        assert list(rows.rows) == list(rows.columns) == list(m.rows)
+        assert (rows.matrix.toarray() ==
+                _brute_projection(m.matrix, binary)).all()
+        columns = m.column_projection(binary)
+        assert list(columns.rows) == list(m.columns)
+        assert (columns.matrix.toarray() ==
+                _brute_projection(m.matrix.T, binary)).all()
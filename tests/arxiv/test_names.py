@@ -0,0 +1,57 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import numpy as np
+
+from ...arxiv import names
+
+FORENAMES = ['', 'J', 'J.', 'John', 'John A.', 'John Andrew', 'J. A.',
+             'Jean-Paul', '-Jean', 'J.-P.', 'Hua Li', 'John  A.', 'A. B. C.',
+             'Jan-Willem Jr.', ' ', 'John']
+
+NAMES = ['Smith, John', 'Smith, John A.', 'Smith, J.', 'Smith, J. A.',
+         'Smith, Jean-Paul', 'Zhang, Hua Li', 'Zhang, Hua  L.',
+         'van der Berg, Jan-Willem Jr.', 'Doe, A. B. C.', 'Smith, John']
+
+
+def test_unified_names_equal_unified_name():
+    for initials_only in [True, False]:
+        names.clear_cache()
+        for i in range(2):  # Computed, then from the cache
+            result = names.unified_names(FORENAMES, initials_only)
+            assert result.tolist() == [
+                names.unified_name(f, initials_only) for f in FORENAMES]
+            assert [names.cached_unified_name(f, initials_only)
+                    for f in FORENAMES] == result.tolist()
+
+
+def test_missing_values_stay_missing():
+    result = names.unified_names(['John A.', None, np.nan])
+    assert result[0] == 'JA'
+    assert all(x != x for x in result[1:])  # NaN
+    assert len(names.unified_names([])) == 0
+
+
+def test_keys_and_initials_equal_row_functions():
+    assert names.names_with_initials_only(NAMES).tolist() == [
+        names.get_name_with_initials_only(n) for n in NAMES]
+    assert names.initials(NAMES).tolist() == [
+        names.get_initials(n) for n in NAMES]
+
+
+def test_name_forms():
+    forms = names.name_forms(NAMES)
+    assert forms.index.tolist() == NAMES
+    for n, row in forms.iterrows():
+        surname, forename = n.split(',', 1)
+        assert row['full'] == '{}, {}'.format(
+            surname, names.unified_name(forename.strip(), False))
+        assert row['initials_only'] == '{}, {}'.format(
+            surname, names.unified_name(forename.strip(), True))
+        assert row['key'] == names.get_name_with_initials_only(n)
+        assert row['initials'] == names.get_initials(n)
+        # As process_match splits them
+        assert row['forename'] == n.split(',')[1].strip('.')
+        assert row['single_initial'] == (
+            len(n.split(',')[1].strip().replace('.', '')) == 1)
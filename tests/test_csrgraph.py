@@ -0,0 +1,80 @@
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import networkx as nx
+import numpy as np
+
+from ..csrgraph import CSRGraph
+
+# b -> a after a -> b: the later weight wins, as in networkx
+ADJACENCY = {'a': {'b': {'weight': 2}, 'c': {'weight': 1}},
+             'b': {'a': {'weight': 5}, 'b': {'weight': 1}},
+             'd': {}}
+NODE_WEIGHTS = {'a': 3, 'b': 4, 'c': 1, 'd': 1, 'e': 2}
+
+
+def _graph_data(G, attribute='weight'):
+    nodes = dict((n, d.get(attribute)) for n, d in G.nodes(data=True))
+    edges = dict((frozenset((u, v)), d['weight'])
+                 for u, v, d in G.edges(data=True))
+    return (nodes, edges)
+
+
+def _networkx(adjacency, node_weights):
+    G = nx.from_dict_of_dicts(adjacency)
+    G.add_nodes_from(node_weights)
+    nx.set_node_attributes(G, name='weight', values=node_weights)
+    return G
+
+
+def test_from_dict_of_dicts_equals_networkx():
+    g = CSRGraph.from_dict_of_dicts(ADJACENCY, NODE_WEIGHTS)
+    G = _networkx(ADJACENCY, NODE_WEIGHTS)
+    assert _graph_data(g.to_networkx()) == _graph_data(G)
+    assert g.number_of_nodes() == G.number_of_nodes() == 5
+    assert g.number_of_edges() == G.number_of_edges() == 3
+    labels = g.labels.tolist()
+    degrees = dict(zip(labels, g.degree().tolist()))
+    assert degrees == {'a': 2, 'b': 2, 'c': 1, 'd': 0, 'e': 0}
+    a = labels.index('a')
+    assert sorted(labels[j] for j in g.neighbors(a)) == ['b', 'c']
+
+
+def test_matrix_and_edges():
+    g = CSRGraph.from_dict_of_dicts(ADJACENCY)
+    m = g.matrix().toarray()
+    assert (m == m.T).all()
+    g2 = CSRGraph.from_matrix(g.matrix(), g.labels)
+    assert _graph_data(g2.to_networkx()) == _graph_data(g.to_networkx())
+    sources, targets, weights = g.edges()
+    assert (sources <= targets).all()
+    assert len(weights) == g.number_of_edges()
+
+
+def test_save_and_load(tmpdir):
+    for labels, attribute in [(['a', 'b', 'c'], 'weight'),
+                              ([('Smith', 'J.'), ('Doe', 'J.'),
+                                ('Li', 'M.')], 'numPapers')]:
+        adjacency = {labels[0]: {labels[1]: {'weight': 2}},
+                     labels[2]: {labels[0]: {'weight': 1}}}
+        g = CSRGraph.from_dict_of_dicts(adjacency, dict(zip(labels,
+                                                            [1, 2, 3])),
+                                        node_attribute=attribute)
+        path = str(tmpdir.join('graph.npz'))
+        g.save(path)
+        loaded = CSRGraph.load(path)
+        assert loaded.node_attribute == attribute
+        assert loaded.labels.tolist() == g.labels.tolist()
+        for name in ['indptr', 'indices', 'weights', 'node_weights']:
+            np.testing.assert_array_equal(getattr(loaded, name),
+                                          getattr(g, name))
+        assert (_graph_data(loaded.to_networkx(), attribute) ==
+                _graph_data(g.to_networkx(), attribute))
+
+
+def test_empty_graph():
+    g = CSRGraph.from_dict_of_dicts({}, {'a': 1})
+    assert g.number_of_nodes() == 1
+    assert g.number_of_edges() == 0
+    assert _graph_data(g.to_networkx()) == ({'a': 1}, {})
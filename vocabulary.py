@@ -0,0 +1,119 @@
+"""
+Interning of labels (author names, categories, PACS codes) as dense
+integer ids, shared by the arXiv and APS pipelines
+
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import numpy as np
+import pandas as pd
+
+
+class Vocabulary(object):
+    """
+    Maps each distinct label to a dense int32 id, in order of first
+    appearance. Labels can be any hashable object, e.g. name strings
+    or the (given, middle, surname, suffix) tuples of the APS data.
+
+    Builders work on the ids and only translate them back to labels
+    with ``decode`` when producing output.
+
+    """
+    def __init__(self, labels=None):
+        super(Vocabulary, self).__init__()
+        self.labels = []
+        self.ids = {}
+        if labels is not None:
+            self.encode(labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self.ids
+
+    def add(self, label):
+        """Return the id of ``label``, adding it if it is new"""
+        try:
+            return self.ids[label]
+        except KeyError:
+            i = len(self.labels)
+            self.ids[label] = i
+            self.labels.append(label)
+            return i
+
+    def encode(self, labels):
+        """
+        Return the ids of all ``labels`` as an int32 numpy array,
+        adding new labels. Missing values (NaN/None) get the id -1.
+
+        Only the distinct labels are looked up, so this is cheap for
+        long, repetitive arrays such as the author column of
+        ``arxiv.get_author_table``.
+
+        """
+        codes, uniques = pd.factorize(_as_series(labels))
+        ids = np.array([self.add(u) for u in uniques], dtype=np.int32)
+        return np.where(codes >= 0, ids.take(codes, mode='clip'),
+                        -1).astype(np.int32)
+
+    def encode_list(self, labels):
+        """Like ``encode`` for a short list, returning a list of ids"""
+        return [self.add(l) for l in labels]
+
+    def lookup(self, labels):
+        """
+        Like ``encode``, but without adding new labels: unknown labels
+        get the id -1.
+
+        """
+        codes, uniques = pd.factorize(_as_series(labels))
+        ids = np.array([self.ids.get(u, -1) for u in uniques],
+                       dtype=np.int32)
+        return np.where(codes >= 0, ids.take(codes, mode='clip'),
+                        -1).astype(np.int32)
+
+    def decode(self, ids):
+        """Return the labels of an iterable of ``ids`` as a list"""
+        labels = self.labels
+        return [labels[i] for i in ids]
+
+    def label_array(self):
+        """All labels as a numpy object array, indexed by id"""
+        result = np.empty(len(self.labels), dtype=object)
+        for i, l in enumerate(self.labels):
+            result[i] = l
+        return result
+
+    def save(self, path):
+        """Save the vocabulary to ``path``, e.g. next to the data"""
+        with open(path, 'wb') as f:
+            pickle.dump(self.labels, f, protocol=2)
+
+    @classmethod
+    def load(cls, path):
+        """Load a vocabulary saved with ``save``"""
+        with open(path, 'rb') as f:
+            labels = pickle.load(f)
+        vocabulary = cls()
+        vocabulary.labels = labels
+        vocabulary.ids = dict((l, i) for i, l in enumerate(labels))
+        return vocabulary
+
+
+def _as_series(labels):
+    """
+    Labels as a pandas Series. Going through a Series keeps tuples as
+    single objects rather than turning them into array dimensions.
+
+    """
+    if isinstance(labels, pd.Series):
+        return labels
+    return pd.Series(list(labels), dtype=object)